@@ -25,6 +25,7 @@ import time
 import urllib.request
 import imghdr
 import sys, time, os
+from collections import OrderedDict
 
 #core imports
 from .servicesDefs import GRIDS, SOURCES
@@ -37,6 +38,7 @@ from ..proj.srs import SRS
 
 from ..settings import getSetting
 USER_AGENT = getSetting('user_agent')
+TILES_CACHE_SIZE = getSetting('tiles_cache_size') or 256 #in megabytes
 
 
 class TileMatrix():
@@ -319,6 +321,58 @@ class BBoxRequest():
 
 
 
+class DecodedTilesCache():
+	"""
+	In memory LRU cache of decoded tiles (NpImage objects)
+	Avoid requesting the cache database and decoding again the same png/jpeg blobs
+	each time the map viewer redraw the same area
+	Keys are (mapKey, x, y, z) tuples, where mapKey identify source, layer and grid.
+	Total size of cached arrays is limited to maxSize bytes
+	"""
+
+	def __init__(self, maxSize):
+		self.maxSize = maxSize
+		self.size = 0
+		self.tiles = OrderedDict()
+		self.lock = threading.Lock()
+
+	def get(self, key):
+		with self.lock:
+			img = self.tiles.get(key)
+			if img is not None:
+				self.tiles.move_to_end(key)
+			return img
+
+	def put(self, key, img):
+		nbytes = img.data.nbytes
+		if nbytes > self.maxSize:
+			return
+		with self.lock:
+			old = self.tiles.pop(key, None)
+			if old is not None:
+				self.size -= old.data.nbytes
+			self.tiles[key] = img
+			self.size += nbytes
+			#evict least recently used tiles
+			while self.size > self.maxSize:
+				k, old = self.tiles.popitem(last=False)
+				self.size -= old.data.nbytes
+
+	def remove(self, key):
+		with self.lock:
+			old = self.tiles.pop(key, None)
+			if old is not None:
+				self.size -= old.data.nbytes
+
+	def clear(self):
+		with self.lock:
+			self.tiles.clear()
+			self.size = 0
+
+#shared by all map services instances, so it survive to a restart of the map viewer
+decodedTiles = DecodedTilesCache(TILES_CACHE_SIZE * 1024**2)
+
+
 class MapService():
 	"""
 	Represent a tile service from source
@@ -446,19 +500,19 @@ class MapService():
 			self.dstTms = None
 
 
-	def getCache(self, laykey, useDstGrid):
-		'''Return existing cache for requested layer or built it if not exists'''
+	def getMapKey(self, laykey, useDstGrid):
 		if useDstGrid:
-			if self.dstGridKey is not None:
-				grdkey = self.dstGridKey
-				tm = self.dstTms
-			else:
+			if self.dstGridKey is None:
 				raise ValueError('No destination grid defined')
+			grdkey = self.dstGridKey
 		else:
 			grdkey = self.srcGridKey
-			tm = self.srcTms
+		return self.srckey + '_' + laykey + '_' + grdkey
 
-		mapKey = self.srckey + '_' + laykey + '_' + grdkey
+	def getCache(self, laykey, useDstGrid):
+		'''Return existing cache for requested layer or built it if not exists'''
+		tm = self.getTM(useDstGrid)
+		mapKey = self.getMapKey(laykey, useDstGrid)
 		cache = self.caches.get(mapKey)
 		if cache is None:
 			dbPath = os.path.join(self.cacheFolder, mapKey + ".gpkg")
@@ -685,12 +739,16 @@ class MapService():
 			return not any([t.is_alive() for t in threads])
 
 		def putInCache(tilesData, jobs, cache):
+			mapKey = self.getMapKey(laykey, toDstGrid)
 			while True:
 				if tilesData.full() or \
 				( (finished() or not self.running) and not tilesData.empty()):
 					data = [tilesData.get() for i in range(tilesData.qsize())]
 					with self.lock:
 						cache.putTiles(data)
+					#expired tiles have been downloaded again, forget their old decoded image
+					for col, row, zoom, _ in data:
+						decodedTiles.remove((mapKey, col, row, zoom))
 				if finished() and tilesData.empty():
 					break
 				if not self.running:
@@ -812,8 +870,16 @@ class MapService():
 		cols, rows = rq.cols, rq.rows
 		rqTiles = rq.tiles #[(x,y,z)]
 
+		#Tiles already decoded in memory don't need to be requested from the cache database
+		mapKey = self.getMapKey(laykey, toDstGrid)
+		decoded = {}
+		for tile in rqTiles:
+			img = decodedTiles.get((mapKey,) + tile)
+			if img is not None:
+				decoded[tile] = img
+
 		##method 1) Seed the cache with all required tiles
-		self.seedCache(laykey, bbox, zoom, toDstGrid=toDstGrid, nbThread=nbThread, buffSize=5000)
+		self.seedTiles(laykey, [tile for tile in rqTiles if tile not in decoded], toDstGrid=toDstGrid, nbThread=nbThread, buffSize=5000)
 		cache = self.getCache(laykey, toDstGrid)
 
 		if not self.running:
@@ -844,7 +910,8 @@ class MapService():
 			chunkTiles = rqTiles[i:i+chunkSize]
 
 			##method 1) Get cached tiles
-			tiles = cache.getTiles(chunkTiles) #[(x,y,z,data)]
+			tiles = cache.getTiles([tile for tile in chunkTiles if tile not in decoded]) #[(x,y,z,data)]
+			tiles.extend([tile + (decoded[tile],) for tile in chunkTiles if tile in decoded])
 
 			##method 2) Get tiles from www or cache (all tiles must fit in memory)
 			#tiles = self.getTiles(laykey, chunkTiles, toDstGrid, nbThread, cpt)
@@ -859,12 +926,15 @@ class MapService():
 					return None
 
 				col, row, z, data = tile
-				if data is None:
+				if isinstance(data, NpImage):
+					img = data
+				elif data is None:
 					#create an empty tile
 					img = NpImage.new(tileSize, tileSize, bkgColor=(128,128,128,255))
 				else:
 					try:
 						img = NpImage(data)
+						decodedTiles.put((mapKey, col, row, z), img)
 					except Exception as e:
 						print(str(e))
 						#create an empty tile if we are unable to get a valid stream
@@ -20,6 +20,8 @@
 
 import math
 
+import numpy as np
+
 from .srs import SRS
 from .utm import UTM, UTM_EPSG_CODES
 from .ellps import GRS80
@@ -54,6 +56,22 @@ def lonLatToWebMerc(lon, lat):
 	y = lat * k
 	return x, y
 
+#Vectorized versions, take and return numpy arrays of coordinates
+
+def webMercToLonLatArr(xs, ys):
+	k = GRS80.perimeter/360
+	lons = np.asarray(xs, dtype=float) / k
+	lats = np.asarray(ys, dtype=float) / k
+	lats = 180 / math.pi * (2 * np.arctan( np.exp( lats * math.pi / 180.0)) - math.pi / 2.0)
+	return lons, lats
+
+def lonLatToWebMercArr(lons, lats):
+	k = GRS80.perimeter/360
+	xs = np.asarray(lons, dtype=float) * k
+	lats = np.log( np.tan((90 + np.asarray(lats, dtype=float)) * math.pi / 360.0 )) / (math.pi / 180.0)
+	ys = lats * k
+	return xs, ys
+
 
 ######################################
 # Raster reproj using GDAL
@@ -279,16 +297,44 @@ class Reproj():
 			return EPSGIO.reprojPts(self.crs1, self.crs2, pts)
 
 		elif self.iproj == 'BUILTIN':
-			#Web Mercator
-			if self.crs1 == 4326 and self.crs2 == 3857:
-				return [lonLatToWebMerc(*pt) for pt in pts]
-			elif self.crs1 == 3857 and self.crs2 == 4326:
-				return [webMercToLonLat(*pt) for pt in pts]
-			#UTM
-			if self.crs1 == 4326 and self.crs2 in UTM_EPSG_CODES:
-				return [self.utm.lonlat_to_utm(*pt) for pt in pts]
-			elif self.crs1 in UTM_EPSG_CODES and self.crs2 == 4326:
-				return [self.utm.utm_to_lonlat(*pt) for pt in pts]
+			xs, ys = self._builtinArr(*zip(*pts))
+			return list(zip(xs.tolist(), ys.tolist()))
+
+	def _builtinArr(self, xs, ys):
+		#Web Mercator
+		if self.crs1 == 4326 and self.crs2 == 3857:
+			return lonLatToWebMercArr(xs, ys)
+		elif self.crs1 == 3857 and self.crs2 == 4326:
+			return webMercToLonLatArr(xs, ys)
+		#UTM
+		if self.crs1 == 4326 and self.crs2 in UTM_EPSG_CODES:
+			return self.utm.lonlat_to_utm_arr(xs, ys)
+		elif self.crs1 in UTM_EPSG_CODES and self.crs2 == 4326:
+			return self.utm.utm_to_lonlat_arr(xs, ys)
+
+	def ptsArr(self, pts):
+		'''
+		Reproject a whole array of points in one call
+		pts : numpy array (or array like) of shape (n, 2)
+		return a (n, 2) float numpy array
+		'''
+		pts = np.asarray(pts, dtype=float)
+		if pts.ndim != 2 or pts.shape[1] != 2:
+			raise ReprojError('Points must be an array of shape (n, 2)')
+
+		if len(pts) == 0 or self.iproj == 'NO_REPROJ':
+			return pts.copy()
+
+		if self.iproj == 'BUILTIN':
+			xs, ys = self._builtinArr(pts[:,0], pts[:,1])
+			return np.column_stack((xs, ys))
+
+		elif self.iproj == 'PYPROJ':
+			xs, ys = pyproj.transform(self.crs1, self.crs2, pts[:,0], pts[:,1])
+			return np.column_stack((xs, ys))
+
+		else:
+			return np.array(self.pts(pts.tolist()), dtype=float)
 
 	def pt(self, x, y):
 		if x is None or y is None:
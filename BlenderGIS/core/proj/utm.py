@@ -10,6 +10,8 @@
 
 import math
 
+import numpy as np
+
 
 K0 = 0.9996
 
@@ -232,5 +234,116 @@ class UTM():
 		return easting, northing
 
 
+	#Vectorized versions, take and return numpy arrays of coordinates
+
+	def utm_to_lonlat_arr(self, eastings, northings):
+
+		x = np.asarray(eastings, dtype=float)
+		y = np.asarray(northings, dtype=float)
+
+		if np.any((x < 100000) | (x >= 1000000)):
+			raise OutOfRangeError('easting out of range (must be between 100.000 m and 999.999 m)')
+		if np.any((y < 0) | (y > 10000000)):
+			raise OutOfRangeError('northing out of range (must be between 0 m and 10.000.000 m)')
 
+		x = x - 500000
+
+		if not self.northern:
+			y = y - 10000000
+
+		m = y / K0
+		mu = m / (R * M1)
 
+		p_rad = (mu +
+				 P2 * np.sin(2 * mu) +
+				 P3 * np.sin(4 * mu) +
+				 P4 * np.sin(6 * mu) +
+				 P5 * np.sin(8 * mu))
+
+		p_sin = np.sin(p_rad)
+		p_sin2 = p_sin * p_sin
+
+		p_cos = np.cos(p_rad)
+
+		p_tan = p_sin / p_cos
+		p_tan2 = p_tan * p_tan
+		p_tan4 = p_tan2 * p_tan2
+
+		ep_sin = 1 - E * p_sin2
+		ep_sin_sqrt = np.sqrt(1 - E * p_sin2)
+
+		n = R / ep_sin_sqrt
+		r = (1 - E) / ep_sin
+
+		c = _E * p_cos**2
+		c2 = c * c
+
+		d = x / (n * K0)
+		d2 = d * d
+		d3 = d2 * d
+		d4 = d3 * d
+		d5 = d4 * d
+		d6 = d5 * d
+
+		latitude = (p_rad - (p_tan / r) *
+					(d2 / 2 -
+					 d4 / 24 * (5 + 3 * p_tan2 + 10 * c - 4 * c2 - 9 * E_P2)) +
+					 d6 / 720 * (61 + 90 * p_tan2 + 298 * c + 45 * p_tan4 - 252 * E_P2 - 3 * c2))
+
+		longitude = (d -
+					 d3 / 6 * (1 + 2 * p_tan2 + c) +
+					 d5 / 120 * (5 - 2 * c + 28 * p_tan2 - 3 * c2 + 8 * E_P2 + 24 * p_tan4)) / p_cos
+
+		return (np.degrees(longitude) + zone_number_to_central_longitude(self.zone_number),
+				np.degrees(latitude))
+
+
+	def lonlat_to_utm_arr(self, longitudes, latitudes):
+
+		longitude = np.asarray(longitudes, dtype=float)
+		latitude = np.asarray(latitudes, dtype=float)
+
+		if np.any((latitude < -80.0) | (latitude > 84.0)):
+			raise OutOfRangeError('latitude out of range (must be between 80 deg S and 84 deg N)')
+		if np.any((longitude < -180.0) | (longitude > 180.0)):
+			raise OutOfRangeError('longitude out of range (must be between 180 deg W and 180 deg E)')
+
+		lat_rad = np.radians(latitude)
+		lat_sin = np.sin(lat_rad)
+		lat_cos = np.cos(lat_rad)
+
+		lat_tan = lat_sin / lat_cos
+		lat_tan2 = lat_tan * lat_tan
+		lat_tan4 = lat_tan2 * lat_tan2
+
+		lon_rad = np.radians(longitude)
+		central_lon = zone_number_to_central_longitude(self.zone_number)
+		central_lon_rad = math.radians(central_lon)
+
+		n = R / np.sqrt(1 - E * lat_sin**2)
+		c = E_P2 * lat_cos**2
+
+		a = lat_cos * (lon_rad - central_lon_rad)
+		a2 = a * a
+		a3 = a2 * a
+		a4 = a3 * a
+		a5 = a4 * a
+		a6 = a5 * a
+
+		m = R * (M1 * lat_rad -
+				 M2 * np.sin(2 * lat_rad) +
+				 M3 * np.sin(4 * lat_rad) -
+				 M4 * np.sin(6 * lat_rad))
+
+		easting = K0 * n * (a +
+							a3 / 6 * (1 - lat_tan2 + c) +
+							a5 / 120 * (5 - 18 * lat_tan2 + lat_tan4 + 72 * c - 58 * E_P2)) + 500000
+
+		northing = K0 * (m + n * lat_tan * (a2 / 2 +
+											a4 / 24 * (5 - lat_tan2 + 9 * c + 4 * c**2) +
+											a6 / 720 * (61 - 58 * lat_tan2 + lat_tan4 + 600 * c - 330 * E_P2)))
+
+		if not self.northern:
+			northing = northing + 10000000
+
+		return easting, northing
@@ -87,7 +87,7 @@ class IMPORT_GEORAST(Operator, ImportHelper):
 			('BKG', 'As background', "Place raster as background image"),
 			('MESH', 'On mesh', "UV map raster on an existing mesh"),
 			('DEM', 'As DEM', "Use DEM raster GRID to wrap an existing mesh"),
-			('DEM_RAW', 'Raw DEM', "Import a DEM as pixels points cloud")]
+			('DEM_RAW', 'Raw DEM', "Import a DEM as a mesh grid (or points cloud) of pixels")]
 			)
 	#
 	objectsLst = EnumProperty(attr="obj_list", name="Objects", description="Choose object to edit", items=listObjects)
@@ -120,6 +120,8 @@ class IMPORT_GEORAST(Operator, ImportHelper):
 			)
 	#
 	step = IntProperty(name = "Step", default=1, description="Pixel step", min=1)
+	#
+	buildFaces = BoolProperty(name="Build faces", default=False, description="Build a grid mesh instead of a points cloud")
 
 	def draw(self, context):
 		#Function used by blender to draw the panel.
@@ -152,6 +154,7 @@ class IMPORT_GEORAST(Operator, ImportHelper):
 			layout.prop(self, 'fillNodata')
 		#
 		if self.importMode == 'DEM_RAW':
+			layout.prop(self, 'buildFaces')
 			layout.prop(self, 'step')
 			layout.prop(self, 'clip')
 			if self.clip:
@@ -399,7 +402,7 @@ class IMPORT_GEORAST(Operator, ImportHelper):
 				if rprj:
 					dx, dy = rprjToScene.pt(dx, dy)
 				geoscn.setOriginPrj(dx, dy)
-			mesh = grid.exportAsMesh(dx, dy, self.step, reproj=rprjToScene)
+			mesh = grid.exportAsMesh(dx, dy, self.step, buildFaces=self.buildFaces, reproj=rprjToScene)
 			obj = placeObj(mesh, name)
 			grid.unload()
 
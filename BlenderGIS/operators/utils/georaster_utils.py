@@ -187,41 +187,88 @@ class bpyGeoRaster(GeoRaster):
 			return False
 
 
-	def exportAsMesh(self, dx=0, dy=0, step=1, subset=False, reproj=None):
+	def exportAsMesh(self, dx=0, dy=0, step=1, buildFaces=False, subset=False, reproj=None):
+		'''
+		Build a mesh from raster values, one vertex per pixel located at the pixel origin corner (x0 + pxSize * px),
+		ordered column by column. Nodata pixels are excluded
+		step : pixel step used to decimate the grid
+		buildFaces : if True quad faces (uv mapped to the raster) are created between neighbouring pixels,
+		nodata pixels leave holes in the grid. Default is a point cloud
+		'''
 		if subset and self.subBoxGeo is None:
 			subset = False
 
 		img = self.readAsNpArray(subset=subset)
-		#TODO raise error if multiband
 		data = img.data
-		x0, y0 = self.origin
-
-		#Avoid using bmesh because it's very slow with large mesh
-		#use from_pydata instead
-		#bm = bmesh.new()
-		verts = []
-		for px in range(0, self.size.x, step):
-			for py in range(0, self.size.y, step):
-				x = x0 + (self.pxSize.x * px)
-				y = y0 +(self.pxSize.y * py)
-
-				if reproj is not None:
-					x, y = reproj.pt(x, y)
-
-				#shift
-				x -= dx
-				y -= dy
-
-				z = data[py, px]
-				if z != self.noData:
-					#bm.verts.new((x, y, z))
-					verts.append((x, y, z))
+		if data.ndim == 3:
+			#TODO raise error if multiband
+			data = data[:, :, 0]
+		georef = img.georef if img.georef is not None else self.georef
+		x0, y0 = georef.origin
+		pxSizeX, pxSizeY = georef.pxSize
+		imgH, imgW = data.shape
+
+		#Decimated grid of pixels indices
+		data = data[::step, ::step]
+		h, w = data.shape
+		pxs = np.arange(w) * step
+		pys = np.arange(h) * step
+
+		#Mask nodata pixels
+		valid = ~np.ma.getmaskarray(data)
+		z = np.ma.getdata(data)
+		if self.noData is not None:
+			valid &= z != self.noData
+
+		#Vertices coordinates, transposed arrays give the vertices column by column
+		xs, ys = np.meshgrid(x0 + pxSizeX * pxs, y0 + pxSizeY * pys)
+		pts = np.column_stack((xs.T[valid.T], ys.T[valid.T]))
+		if reproj is not None:
+			pts = reproj.ptsArr(pts)
+		verts = np.empty((len(pts), 3), dtype=np.float32)
+		verts[:,0] = pts[:,0] - dx
+		verts[:,1] = pts[:,1] - dy
+		verts[:,2] = z.T[valid.T]
 
 		mesh = bpy.data.meshes.new("DEM")
-		#bm.to_mesh(mesh)
-		#bm.free()
-		mesh.from_pydata(verts, [], [])
-		mesh.update()
+		mesh.vertices.add(len(verts))
+		mesh.vertices.foreach_set("co", verts.ravel())
+
+		if buildFaces and h > 1 and w > 1:
+			#Vertex index of each grid node (-1 for nodata)
+			idx = np.full((h, w), -1, dtype=np.int32)
+			idx.T[valid.T] = np.arange(len(verts), dtype=np.int32)
+			#Quads corners, from bottom left anticlockwise (rows are counting from top)
+			corners = np.stack((idx[1:, :-1], idx[1:, 1:], idx[:-1, 1:], idx[:-1, :-1]), axis=-1)
+			if pxSizeX * pxSizeY > 0:
+				#y axis is not flipped, reverse winding to keep faces up
+				corners = corners[..., ::-1]
+			keep = np.all(corners >= 0, axis=-1)
+			faces = corners[keep]
+			nbFaces = len(faces)
+
+			if nbFaces > 0:
+				mesh.loops.add(nbFaces * 4)
+				mesh.loops.foreach_set("vertex_index", faces.ravel())
+				mesh.polygons.add(nbFaces)
+				mesh.polygons.foreach_set("loop_start", np.arange(0, nbFaces * 4, 4, dtype=np.int32))
+				mesh.polygons.foreach_set("loop_total", np.full(nbFaces, 4, dtype=np.int32))
+
+				#UV coords of each loop : pourcent from image origin (bottom left) at pixels centers
+				us = (pxs + 0.5) / imgW
+				vs = (imgH - pys - 0.5) / imgH
+				uu, vv = np.meshgrid(us, vs)
+				uvIdx = np.arange(h * w, dtype=np.int32).reshape(h, w)
+				uvCorners = np.stack((uvIdx[1:, :-1], uvIdx[1:, 1:], uvIdx[:-1, 1:], uvIdx[:-1, :-1]), axis=-1)
+				if pxSizeX * pxSizeY > 0:
+					uvCorners = uvCorners[..., ::-1]
+				loopsIdx = uvCorners[keep].ravel()
+				uvs = np.column_stack((uu.ravel()[loopsIdx], vv.ravel()[loopsIdx])).astype(np.float32)
+				mesh.uv_textures.new('demUVmap')
+				mesh.uv_layers.active.data.foreach_set("uv", uvs.ravel())
+
+		mesh.update(calc_edges=True)
+		mesh.validate()
 
 		return mesh
 
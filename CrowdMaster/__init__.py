@@ -358,6 +358,9 @@ class SCENE_PT_CrowdMaster(Panel):
         row.prop(scene, "cm_sim_start_frame")
         row.prop(scene, "cm_sim_end_frame")
 
+        row = layout.row()
+        row.prop(scene, "cm_sim_bake_keyframes")
+
         row = layout.row()
         row.separator()
 
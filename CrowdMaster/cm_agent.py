@@ -26,6 +26,7 @@ import mathutils
 
 from . import cm_timings
 from .cm_compileBrain import compileBrain
+from .cm_keyframes import KeyframeBuffer
 
 logger = logging.getLogger("CrowdMaster")
 
@@ -104,12 +105,25 @@ class Agent:
         self.shapeKeys = {}
         self.lastShapeKeys = set()
 
+        """Samples that are written to F-curves at the end when baking"""
+        self.keyframes = None
+        scene = bpy.context.scene
+        if scene.cm_sim_bake_keyframes and not freezeAnimation:
+            self.keyframes = KeyframeBuffer(scene.cm_sim_start_frame,
+                                            scene.cm_sim_end_frame)
+
         """Clear out the nla"""
         if not freezeAnimation:
             objs[blenderid].animation_data_clear()
-            objs[blenderid].keyframe_insert(data_path="location", frame=1)
-            objs[blenderid].keyframe_insert(
-                data_path="rotation_euler", frame=1)
+            if self.keyframes is None:
+                objs[blenderid].keyframe_insert(data_path="location", frame=1)
+                objs[blenderid].keyframe_insert(
+                    data_path="rotation_euler", frame=1)
+            else:
+                self.keyframes.addTransform(objs[blenderid],
+                                            scene.frame_current,
+                                            objs[blenderid].location,
+                                            objs[blenderid].rotation_euler)
 
         # Keyframe everything so agent return to the same position.
         if self.geoGroup is None or self.geoGroup == "":
@@ -125,13 +139,15 @@ class Agent:
                             bone.keyframe_insert("rotation_axis_angle")
                         else:
                             bone.keyframe_insert("rotation_euler")
-                obj.keyframe_insert("location")
-                if obj.rotation_mode == "QUATERNION":
-                    obj.keyframe_insert("rotation_quaternion")
-                elif obj.rotation_mode == "AXIS_ANGLE":
-                    obj.keyframe_insert("rotation_axis_angle")
-                else:
-                    obj.keyframe_insert("rotation_euler")
+                if self.keyframes is None:
+                    # The agent's own transform is sampled when baking
+                    obj.keyframe_insert("location")
+                    if obj.rotation_mode == "QUATERNION":
+                        obj.keyframe_insert("rotation_quaternion")
+                    elif obj.rotation_mode == "AXIS_ANGLE":
+                        obj.keyframe_insert("rotation_axis_angle")
+                    else:
+                        obj.keyframe_insert("rotation_euler")
         else:
             # ie. auto generated agent
             for obj in bpy.data.groups[self.geoGroup].objects:
@@ -144,6 +160,8 @@ class Agent:
                             bone.keyframe_insert("rotation_axis_angle")
                         else:
                             bone.keyframe_insert("rotation_euler")
+                if self.keyframes is not None and obj.name == self.id:
+                    continue
                 obj.keyframe_insert("location")
                 if obj.rotation_mode == "QUATERNION":
                     obj.keyframe_insert("rotation_quaternion")
@@ -229,7 +247,9 @@ class Agent:
         obj = bpy.data.objects[self.id]
         preferences = bpy.context.user_preferences.addons[__package__].preferences
 
-        self.access = copy.deepcopy(self.external)
+        # Tag values are numbers so copying the dictionaries is enough
+        self.access = {"id": self.external["id"],
+                       "tags": dict(self.external["tags"])}
 
         if self.freezeAnimation:
             return
@@ -260,7 +280,11 @@ class Agent:
                         sk = cobj.data.shape_keys.key_blocks.get(skNm)
                         if sk is not None:
                             skVal = self.shapeKeys[skNm]
-                            if abs(sk.value - skVal) > 0.000001:
+                            if self.keyframes is not None:
+                                self.keyframes.addShapeKey(
+                                    cobj.data.shape_keys, sk, thisFrame, skVal)
+                                sk.value = skVal
+                            elif abs(sk.value - skVal) > 0.000001:
                                 if skNm not in self.lastShapeKeys:
                                     sk.keyframe_insert(
                                         data_path="value", frame=lastFrame)
@@ -272,83 +296,90 @@ class Agent:
                                 if skNm in self.lastShapeKeys:
                                     self.lastShapeKeys.remove(skNm)
 
-        if abs(self.arx - obj.rotation_euler[0]) > 0.000001:
-            if not self.arxKey:
+        if self.keyframes is not None:
+            obj.rotation_euler = (self.arx, self.ary, self.arz)
+            obj.location = (self.apx, self.apy, self.apz)
+            self.keyframes.addTransform(obj, thisFrame,
+                                        (self.apx, self.apy, self.apz),
+                                        (self.arx, self.ary, self.arz))
+        else:
+            if abs(self.arx - obj.rotation_euler[0]) > 0.000001:
+                if not self.arxKey:
+                    obj.keyframe_insert(data_path="rotation_euler",
+                                        index=0,
+                                        frame=lastFrame)
+                    self.arxKey = True
+                obj.rotation_euler[0] = self.arx
                 obj.keyframe_insert(data_path="rotation_euler",
                                     index=0,
-                                    frame=lastFrame)
-                self.arxKey = True
-            obj.rotation_euler[0] = self.arx
-            obj.keyframe_insert(data_path="rotation_euler",
-                                index=0,
-                                frame=thisFrame)
-        else:
-            self.arxKey = False
-
-        if abs(self.ary - obj.rotation_euler[1]) > 0.000001:
-            if not self.aryKey:
+                                    frame=thisFrame)
+            else:
+                self.arxKey = False
+
+            if abs(self.ary - obj.rotation_euler[1]) > 0.000001:
+                if not self.aryKey:
+                    obj.keyframe_insert(data_path="rotation_euler",
+                                        index=1,
+                                        frame=lastFrame)
+                    self.aryKey = True
+                obj.rotation_euler[1] = self.ary
                 obj.keyframe_insert(data_path="rotation_euler",
                                     index=1,
-                                    frame=lastFrame)
-                self.aryKey = True
-            obj.rotation_euler[1] = self.ary
-            obj.keyframe_insert(data_path="rotation_euler",
-                                index=1,
-                                frame=thisFrame)
-        else:
-            self.aryKey = False
-
-        if abs(self.arz - obj.rotation_euler[2]) > 0.000001:
-            if not self.arzKey:
+                                    frame=thisFrame)
+            else:
+                self.aryKey = False
+
+            if abs(self.arz - obj.rotation_euler[2]) > 0.000001:
+                if not self.arzKey:
+                    obj.keyframe_insert(data_path="rotation_euler",
+                                        index=2,
+                                        frame=lastFrame)
+                    self.arzKey = True
+                obj.rotation_euler[2] = self.arz
                 obj.keyframe_insert(data_path="rotation_euler",
                                     index=2,
-                                    frame=lastFrame)
-                self.arzKey = True
-            obj.rotation_euler[2] = self.arz
-            obj.keyframe_insert(data_path="rotation_euler",
-                                index=2,
-                                frame=thisFrame)
-        else:
-            self.arzKey = False
-
-        if abs(self.apx - obj.location[0]) > 0.000001:
-            if not self.apxKey:
+                                    frame=thisFrame)
+            else:
+                self.arzKey = False
+
+            if abs(self.apx - obj.location[0]) > 0.000001:
+                if not self.apxKey:
+                    obj.keyframe_insert(data_path="location",
+                                        index=0,
+                                        frame=lastFrame)
+                    self.apxKey = True
+                obj.location[0] = self.apx
                 obj.keyframe_insert(data_path="location",
                                     index=0,
-                                    frame=lastFrame)
-                self.apxKey = True
-            obj.location[0] = self.apx
-            obj.keyframe_insert(data_path="location",
-                                index=0,
-                                frame=thisFrame)
-        else:
-            self.apxKey = False
-
-        if abs(self.apy - obj.location[1]) > 0.000001:
-            if not self.apyKey:
+                                    frame=thisFrame)
+            else:
+                self.apxKey = False
+
+            if abs(self.apy - obj.location[1]) > 0.000001:
+                if not self.apyKey:
+                    obj.keyframe_insert(data_path="location",
+                                        index=1,
+                                        frame=lastFrame)
+                    self.apyKey = True
+                obj.location[1] = self.apy
                 obj.keyframe_insert(data_path="location",
                                     index=1,
-                                    frame=lastFrame)
-                self.apyKey = True
-            obj.location[1] = self.apy
-            obj.keyframe_insert(data_path="location",
-                                index=1,
-                                frame=thisFrame)
-        else:
-            self.apyKey = False
-
-        if abs(self.apz - obj.location[2]) > 0.000001:
-            if not self.apzKey:
+                                    frame=thisFrame)
+            else:
+                self.apyKey = False
+
+            if abs(self.apz - obj.location[2]) > 0.000001:
+                if not self.apzKey:
+                    obj.keyframe_insert(data_path="location",
+                                        index=2,
+                                        frame=lastFrame)
+                    self.apzKey = True
+                obj.location[2] = self.apz
                 obj.keyframe_insert(data_path="location",
                                     index=2,
-                                    frame=lastFrame)
-                self.apzKey = True
-            obj.location[2] = self.apz
-            obj.keyframe_insert(data_path="location",
-                                index=2,
-                                frame=thisFrame)
-        else:
-            self.apzKey = False
+                                    frame=thisFrame)
+            else:
+                self.apzKey = False
 
         objs = bpy.context.scene.objects
 
@@ -367,20 +398,18 @@ class Agent:
                         tagVal = tags[tag]
                         if bone in modArm.pose.bones:
                             boneObj = modArm.pose.bones[bone]
-                            if attribute == "RX":
-                                boneObj.rotation_euler[0] = tagVal
-                                boneObj.keyframe_insert(data_path="rotation_euler",
-                                                        index=0,
-                                                        frame=thisFrame)
-                            if attribute == "RY":
-                                boneObj.rotation_euler[1] = tagVal
-                                boneObj.keyframe_insert(data_path="rotation_euler",
-                                                        index=1,
-                                                        frame=thisFrame)
-                            if attribute == "RZ":
-                                boneObj.rotation_euler[2] = tagVal
+                            if attribute not in ("RX", "RY", "RZ"):
+                                continue
+                            index = "XYZ".index(attribute[1])
+                            boneObj.rotation_euler[index] = tagVal
+                            if self.keyframes is not None:
+                                self.keyframes.add(
+                                    "objects", modArm.name,
+                                    boneObj.path_from_id("rotation_euler"),
+                                    index, thisFrame, tagVal)
+                            else:
                                 boneObj.keyframe_insert(data_path="rotation_euler",
-                                                        index=2,
+                                                        index=index,
                                                         frame=thisFrame)
 
         if preferences.show_debug_options and preferences.show_debug_timings:
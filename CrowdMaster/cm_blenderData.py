@@ -48,6 +48,13 @@ bpy.types.Scene.cm_sim_end_frame = IntProperty(
     default=250,
     update=updateEndFrame,
 )
+bpy.types.Scene.cm_sim_bake_keyframes = BoolProperty(
+    name="Bake Keyframes At End",
+    description="Store the agents' transforms and shape keys while "
+                "simulating and write all the keyframes when the simulation "
+                "stops. Much faster for large crowds",
+    default=False,
+)
 
 
 class modifyBoneProperty(PropertyGroup):
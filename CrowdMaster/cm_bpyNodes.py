@@ -192,6 +192,12 @@ class NewInputNode(LogicNode):
     GroundAheadOffset = FloatVectorProperty(name="Ground Ahead Offset",
                                             description="Position relative to the agent to check the ground mesh",
                                             default=(0, 1, 0))
+    GroundHeightField = BoolProperty(name="Use Height Field",
+                                     description="Sample the ground objects on a grid once and look up the ground height in it instead of ray casting every frame. Only for ground that doesn't move",
+                                     default=False)
+    GroundCellSize = FloatProperty(name="Cell Size",
+                                   description="Size of the cells of the height field",
+                                   default=0.5, min=0.01)
 
     NoiseOptions = EnumProperty(name="Noise Options",
                                 items=[("RANDOM", "Random", "", 1),
@@ -288,6 +294,10 @@ class NewInputNode(LogicNode):
             layout.prop(self, "GroundOptions")
             if self.GroundOptions == "ARX" or self.GroundOptions == "ARZ":
                 layout.prop(self, "GroundAheadOffset")
+            row = layout.row(align=True)
+            row.prop(self, "GroundHeightField")
+            if self.GroundHeightField:
+                row.prop(self, "GroundCellSize")
         elif self.InputSource == "NOISE":
             layout.prop(self, "NoiseOptions")
             if self.NoiseOptions == "WAVE":
@@ -349,6 +359,10 @@ class NewInputNode(LogicNode):
             node.settings["GroundGroup"] = self.GroundGroup
             node.settings["GroundOptions"] = self.GroundOptions
             node.settings["GroundAheadOffset"] = self.GroundAheadOffset
+            if self.GroundHeightField:
+                node.settings["GroundCellSize"] = self.GroundCellSize
+            else:
+                node.settings["GroundCellSize"] = 0
         elif self.InputSource == "NOISE":
             node.settings["NoiseOptions"] = self.NoiseOptions
             node.settings["WaveOffset"] = self.WaveOffset
@@ -18,6 +18,7 @@
 # ##### END GPL LICENSE BLOCK #####
 
 from .cm_agentInfoChannels import AgentInfo
+from .cm_batchChannels import AgentBatch
 from .cm_flockChannels import Flock
 from .cm_formationChannels import Formation
 from .cm_groundChannels import Ground
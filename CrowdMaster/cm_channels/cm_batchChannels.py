@@ -0,0 +1,252 @@
+# Copyright 2017 CrowdMaster Developer Team
+#
+# ##### BEGIN GPL LICENSE BLOCK ######
+# This file is part of CrowdMaster.
+#
+# CrowdMaster is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CrowdMaster is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CrowdMaster.  If not, see <http://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+import numpy as np
+
+# Offsets of a grid cell and its 26 neighbours
+NEIGHBOURCELLS = np.array([(x, y, z) for x in (-1, 0, 1)
+                           for y in (-1, 0, 1)
+                           for z in (-1, 0, 1)], dtype=np.int64)
+
+# Number of listener-emitter pairs that are evaluated in one go
+PAIRBLOCKSIZE = 2**20
+
+
+def rotationMatrices(rx, ry, rz):
+    """Return the (n, 3, 3) matrices that are the same as
+    Matrix.Rotation(rx, 4, 'X') * Matrix.Rotation(ry, 4, 'Y') *
+    Matrix.Rotation(rz, 4, 'Z') for each agent"""
+    n = len(rx)
+    cx, sx = np.cos(rx), np.sin(rx)
+    cy, sy = np.cos(ry), np.sin(ry)
+    cz, sz = np.cos(rz), np.sin(rz)
+    x = np.zeros((n, 3, 3))
+    x[:, 0, 0] = 1
+    x[:, 1, 1] = cx
+    x[:, 1, 2] = -sx
+    x[:, 2, 1] = sx
+    x[:, 2, 2] = cx
+    y = np.zeros((n, 3, 3))
+    y[:, 0, 0] = cy
+    y[:, 0, 2] = sy
+    y[:, 1, 1] = 1
+    y[:, 2, 0] = -sy
+    y[:, 2, 2] = cy
+    z = np.zeros((n, 3, 3))
+    z[:, 0, 0] = cz
+    z[:, 0, 1] = -sz
+    z[:, 1, 0] = sz
+    z[:, 1, 1] = cz
+    z[:, 2, 2] = 1
+    return np.matmul(np.matmul(x, y), z)
+
+
+def predictionCertainty(s):
+    """Certainty of a prediction that is s frames in the future"""
+    c = np.minimum(s / 32, 1)
+    cert = (1 - ((-(c**3) / 3 + (c**2) / 2) * 6))**2
+    # https://www.desmos.com/calculator/godi4zejgd
+    return cert
+
+
+class SpatialGrid:
+    """Uniform grid of points for finding all the points that are in range of
+    many query points at once"""
+
+    def __init__(self, points, cellSize):
+        """
+        :param points: (n, 3) array of positions
+        :param cellSize: Size of the cells, the largest query radius"""
+        self.points = points
+        self.cellSize = cellSize if cellSize > 0 else 1.0
+        keys = self._keys(self._cells(points))
+        self.order = np.argsort(keys, kind="mergesort")
+        self.keys = keys[self.order]
+
+    def _cells(self, points):
+        return np.floor(points / self.cellSize).astype(np.int64)
+
+    @staticmethod
+    def _keys(cells):
+        cells = cells + 2**20
+        return (cells[:, 0] * 2**21 + cells[:, 1]) * 2**21 + cells[:, 2]
+
+    def findRange(self, queries, radius):
+        """Find all the points within radius of each of the queries.
+
+        :returns: (query index, point index, distance) arrays sorted by query
+            index and then by distance"""
+        queryCells = self._cells(queries)
+        qInds = []
+        pInds = []
+        for offset in NEIGHBOURCELLS:
+            keys = self._keys(queryCells + offset)
+            lo = np.searchsorted(self.keys, keys, "left")
+            hi = np.searchsorted(self.keys, keys, "right")
+            counts = hi - lo
+            total = counts.sum()
+            if total == 0:
+                continue
+            q = np.repeat(np.arange(len(queries)), counts)
+            ends = np.cumsum(counts)
+            within = np.arange(total) - np.repeat(ends - counts, counts)
+            qInds.append(q)
+            pInds.append(self.order[np.repeat(lo, counts) + within])
+        if len(qInds) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0)
+        q = np.concatenate(qInds)
+        p = np.concatenate(pInds)
+        dist = np.linalg.norm(self.points[p] - queries[q], axis=1)
+        inRange = dist <= radius
+        q, p, dist = q[inRange], p[inRange], dist[inRange]
+        sort = np.lexsort((dist, q))
+        return q[sort], p[sort], dist[sort]
+
+
+class AgentBatch:
+    """The positions, rotations and velocities of all agents taken at the
+    start of a frame so that channels can answer queries for all agents at
+    once"""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.ids = []
+        self.index = {}
+        self.position = np.zeros((0, 3))
+        self.rotation = np.zeros((0, 3))
+        self.velocity = np.zeros((0, 3))
+        self.radius = np.zeros(0)
+        self.matrix = np.zeros((0, 3, 3))
+
+    def newframe(self):
+        """Called at the beginning of each frame before any agent moves"""
+        agents = list(self.sim.agents.values())
+        n = len(agents)
+        self.ids = [ag.id for ag in agents]
+        self.index = {agid: i for i, agid in enumerate(self.ids)}
+        state = np.fromiter((v for ag in agents for v in
+                             (ag.apx, ag.apy, ag.apz,
+                              ag.arx, ag.ary, ag.arz,
+                              ag.globalVelocity[0],
+                              ag.globalVelocity[1],
+                              ag.globalVelocity[2],
+                              ag.radius)),
+                            dtype=np.float64, count=n * 10).reshape((n, 10))
+        self.position = state[:, 0:3]
+        self.rotation = state[:, 3:6]
+        self.velocity = state[:, 6:9]
+        self.radius = state[:, 9]
+        self.matrix = rotationMatrices(state[:, 3], state[:, 4], state[:, 5])
+
+    def indices(self, agentids):
+        """Return the array indices of the agents"""
+        index = self.index
+        return np.fromiter((index[agid] for agid in agentids),
+                           dtype=np.int64, count=len(agentids))
+
+    def toLocal(self, vecs, inds):
+        """Rotate global vectors into the local space of the agents
+        (the same as vec * rotation with mathutils)"""
+        return np.einsum("ij,ijk->ik", vecs, self.matrix[inds])
+
+    def soundRange(self, emitters, vals):
+        """For every agent find the emitters that it can hear.
+
+        :param emitters: Array indices of the emitting agents
+        :param vals: How far the sound of each emitter travels
+        :returns: dict of (listener, emitter, rz, rx, dist) arrays, sorted by
+            listener"""
+        maxVal = vals.max() if len(vals) > 0 else 0
+        grid = SpatialGrid(self.position[emitters], maxVal)
+        listener, e, dist = grid.findRange(self.position, maxVal)
+        emitter = emitters[e]
+        keep = (dist <= vals[e]) & (emitter != listener)
+        listener, e, emitter = listener[keep], e[keep], emitter[keep]
+        dist = dist[keep]
+        target = self.position[emitter] - self.position[listener]
+        relative = self.toLocal(target, listener)
+        return {"listener": listener,
+                "emitter": e,
+                "rz": np.arctan2(relative[:, 0], relative[:, 1]) / np.pi,
+                "rx": np.arctan2(relative[:, 2], relative[:, 1]) / np.pi,
+                "dist": dist}
+
+    def soundPrediction(self, emitters, vals):
+        """For every agent find the emitters that will come within range at
+        their closest approach if both keep their current velocity.
+
+        :returns: dict of (listener, emitter, rz, rx, distProp, cert) arrays,
+            sorted by listener"""
+        n = len(self.ids)
+        results = []
+        if len(emitters) == 0:
+            block = max(1, n)
+        else:
+            block = max(1, PAIRBLOCKSIZE // len(emitters))
+        p2 = self.position[emitters]
+        d2 = self.velocity[emitters]
+        e = np.einsum("ij,ij->i", d2, d2)
+        p2p2 = np.einsum("ij,ij->i", p2, p2)
+        d2p2 = np.einsum("ij,ij->i", d2, p2)
+        for start in range(0, n, block):
+            listeners = np.arange(start, min(start + block, n))
+            p1 = self.position[listeners]
+            d1 = self.velocity[listeners]
+            a = np.einsum("ij,ij->i", d1, d1)[:, None]
+            b = np.dot(d1, d2.T)
+            d = a * e - b * b
+            # c = d1.(p1 - p2), f = d2.(p1 - p2)
+            c = np.einsum("ij,ij->i", d1, p1)[:, None] - np.dot(d1, p2.T)
+            f = np.dot(p1, d2.T) - d2p2
+            with np.errstate(divide="ignore", invalid="ignore"):
+                s = (b * f - c * e) / d
+                # Squared distance at the closest approach without building
+                #  the (listeners, emitters, 3) arrays
+                rr = np.einsum("ij,ij->i", p1, p1)[:, None] + p2p2 - \
+                    2 * np.dot(p1, p2.T)
+                dist2 = rr - 2 * s * (f - c) + s * s * (a + e - 2 * b)
+            candidates = (d != 0) & (dist2 <= (vals * (1 + 1e-6))**2 + 1e-9) \
+                & (emitters[None, :] != listeners[:, None])
+            li, ei = np.nonzero(candidates)
+            if len(li) == 0:
+                continue
+            # Exact values for the candidates
+            s = s[li, ei]
+            t = (a[li, 0] * f[li, ei] - b[li, ei] * c[li, ei]) / d[li, ei]
+            diff = (p2[ei] + s[:, None] * d2[ei]) - \
+                (p1[li] + s[:, None] * d1[li])
+            dist = np.linalg.norm(diff, axis=1)
+            keep = dist <= vals[ei]
+            li, ei, s, t = li[keep], ei[keep], s[keep], t[keep]
+            dist, diff = dist[keep], diff[keep]
+            li = listeners[li]
+            relative = self.toLocal(diff, li)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                distProp = dist / vals[ei]
+            cert = np.where((s < 1) | (t < 1), 0, predictionCertainty(s))
+            results.append((li, ei,
+                            np.arctan2(relative[:, 0], relative[:, 1]) / np.pi,
+                            np.arctan2(relative[:, 2], relative[:, 1]) / np.pi,
+                            distProp, cert))
+        names = ("listener", "emitter", "rz", "rx", "distProp", "cert")
+        if len(results) == 0:
+            return {nm: np.zeros(0) for nm in names}
+        return {nm: np.concatenate(col) for nm, col in zip(names,
+                                                           zip(*results))}
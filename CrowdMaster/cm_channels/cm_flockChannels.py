@@ -21,6 +21,7 @@ import math
 
 import bpy
 import mathutils
+import numpy as np
 from mathutils import Vector
 
 from .cm_masterChannels import MasterChannel as Mc
@@ -52,77 +53,55 @@ class Flock(Mc):
             s *= hash(item) % (10**25) + 1
         return s
 
+    def _neighbours(self, localArea):
+        """Array indices of the user and of the agents in localArea"""
+        batch = self.sim.batch
+        return batch.index[self.userid], batch.indices(localArea)
+
     def calcSeparate(self, localArea):
-        sepVec = Vector([0, 0, 0])
         if len(localArea) == 0:
-            return sepVec
-        agents = self.sim.agents
-        for neighbour in localArea:
-            sepVec.x += agents[self.userid].apx - agents[neighbour].apx
-            sepVec.y += agents[self.userid].apy - agents[neighbour].apy
-            sepVec.z += agents[self.userid].apz - agents[neighbour].apz
-
-        z = mathutils.Matrix.Rotation(agents[self.userid].arz, 4, 'Z')
-        y = mathutils.Matrix.Rotation(agents[self.userid].ary, 4, 'Y')
-        x = mathutils.Matrix.Rotation(agents[self.userid].arx, 4, 'X')
-
-        rotation = x * y * z
-        relative = sepVec * rotation
+            return Vector([0, 0, 0])
+        key = (self.userid, localArea)
+        if key in self.separateCache:
+            return self.separateCache[key]
+        batch = self.sim.batch
+        user, neighbours = self._neighbours(localArea)
+        position = batch.position
+        sepVec = len(neighbours) * position[user] - \
+            position[neighbours].sum(axis=0)
+        relative = Vector(np.dot(sepVec, batch.matrix[user]))
+        self.separateCache[key] = relative
         return relative
 
     def calcAlign(self, localArea):
-        alnVec = Vector([0, 0, 0])
         if len(localArea) == 0:
-            return alnVec
-        agents = self.sim.agents
-        for neighbour in localArea:
-            alnVec.x += agents[neighbour].arx
-            alnVec.y += agents[neighbour].ary
-            alnVec.z += agents[neighbour].arz
-        alnVec /= len(localArea)
-
-        alnVec.x -= agents[self.userid].arx
-        alnVec.y -= agents[self.userid].ary
-        alnVec.z -= agents[self.userid].arz
-
-        alnVec.x %= 2 * math.pi
-        alnVec.y %= 2 * math.pi
-        alnVec.z %= 2 * math.pi
-
-        if alnVec.x < math.pi:
-            alnVec.x = alnVec.x / math.pi
-        else:
-            alnVec.x = -2 + alnVec.x / math.pi
-        if alnVec.y < math.pi:
-            alnVec.y = alnVec.y / math.pi
-        else:
-            alnVec.y = -2 + alnVec.y / math.pi
-        if alnVec.z < math.pi:
-            alnVec.z = alnVec.z / math.pi
-        else:
-            alnVec.z = -2 + alnVec.z / math.pi
+            return Vector([0, 0, 0])
+        key = (self.userid, localArea)
+        if key in self.alignCache:
+            return self.alignCache[key]
+        batch = self.sim.batch
+        user, neighbours = self._neighbours(localArea)
+        rotation = batch.rotation
+        alnVec = rotation[neighbours].mean(axis=0) - rotation[user]
+        alnVec %= 2 * math.pi
+        alnVec /= math.pi
+        alnVec[alnVec >= 1] -= 2
+        alnVec = Vector(alnVec)
+        self.alignCache[key] = alnVec
         return alnVec
 
     def calcCohere(self, localArea):
-        cohVec = Vector([0, 0, 0])
         if len(localArea) == 0:
-            return cohVec
-        agents = self.sim.agents
-        for neighbour in localArea:
-            cohVec.x += agents[neighbour].apx
-            cohVec.y += agents[neighbour].apy
-            cohVec.z += agents[neighbour].apz
-        cohVec /= len(localArea)
-        cohVec.x -= agents[self.userid].apx
-        cohVec.y -= agents[self.userid].apy
-        cohVec.z -= agents[self.userid].apz
-
-        z = mathutils.Matrix.Rotation(agents[self.userid].arz, 4, 'Z')
-        y = mathutils.Matrix.Rotation(agents[self.userid].ary, 4, 'Y')
-        x = mathutils.Matrix.Rotation(agents[self.userid].arx, 4, 'X')
-
-        rotation = x * y * z
-        relative = cohVec * rotation
+            return Vector([0, 0, 0])
+        key = (self.userid, localArea)
+        if key in self.cohereCache:
+            return self.cohereCache[key]
+        batch = self.sim.batch
+        user, neighbours = self._neighbours(localArea)
+        position = batch.position
+        cohVec = position[neighbours].mean(axis=0) - position[user]
+        relative = Vector(np.dot(cohVec, batch.matrix[user]))
+        self.cohereCache[key] = relative
         return relative
 
     @timeChannel()
@@ -135,6 +114,7 @@ class Flock(Mc):
                 inSet.add(i)
         if len(inSet) == 0:
             return None
+        inSet = frozenset(inSet)
         sepVec = self.calcSeparate(inSet)
         return sepVec[0]
 
@@ -148,6 +128,7 @@ class Flock(Mc):
                 inSet.add(i)
         if len(inSet) == 0:
             return None
+        inSet = frozenset(inSet)
         sepVec = self.calcSeparate(inSet)
         return sepVec[1]
 
@@ -161,6 +142,7 @@ class Flock(Mc):
                 inSet.add(i)
         if len(inSet) == 0:
             return None
+        inSet = frozenset(inSet)
         sepVec = self.calcSeparate(inSet)
         return sepVec[2]
 
@@ -174,6 +156,7 @@ class Flock(Mc):
                 inSet.add(i)
         if len(inSet) == 0:
             return None
+        inSet = frozenset(inSet)
         alnVec = self.calcAlign(inSet)
         return alnVec.z
 
@@ -187,6 +170,7 @@ class Flock(Mc):
                 inSet.add(i)
         if len(inSet) == 0:
             return None
+        inSet = frozenset(inSet)
         alnVec = self.calcAlign(inSet)
         return alnVec.x
 
@@ -200,6 +184,7 @@ class Flock(Mc):
                 inSet.add(i)
         if len(inSet) == 0:
             return None
+        inSet = frozenset(inSet)
         cohVec = self.calcCohere(inSet)
         return cohVec[0]
 
@@ -213,6 +198,7 @@ class Flock(Mc):
                 inSet.add(i)
         if len(inSet) == 0:
             return None
+        inSet = frozenset(inSet)
         cohVec = self.calcCohere(inSet)
         return cohVec[1]
 
@@ -226,5 +212,6 @@ class Flock(Mc):
                 inSet.add(i)
         if len(inSet) == 0:
             return None
+        inSet = frozenset(inSet)
         cohVec = self.calcCohere(inSet)
         return cohVec[2]
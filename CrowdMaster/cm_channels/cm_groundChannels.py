@@ -20,6 +20,7 @@
 import math
 
 import bpy
+import numpy as np
 from mathutils import *
 
 from .cm_masterChannels import MasterChannel as Mc
@@ -27,6 +28,86 @@ from .cm_masterChannels import timeChannel
 
 BVHTree = bvhtree.BVHTree
 
+# Number of downward facing surfaces to look through for an overhang
+MAXLAYERS = 8
+
+
+class HeightField:
+    """The height of the top surface of a ground object sampled on a regular
+    grid in world space. Cells that have another upward facing surface below
+    the top one (overhangs) or that are only partly covered by the ground are
+    marked so that the BVH tree is used for agents in them."""
+
+    def __init__(self, gnd, cellSize):
+        sce = bpy.context.scene
+        tree = BVHTree.FromObject(gnd, sce)
+        mw = gnd.matrix_world
+        inverse = mw.inverted()
+        normalMatrix = mw.to_3x3().inverted().transposed()
+
+        corners = np.array([tuple(mw * Vector(c)) for c in gnd.bound_box])
+        low = corners.min(axis=0)
+        high = corners.max(axis=0)
+        self.origin = low[:2]
+        self.cellSize = cellSize
+        nx = int(math.ceil((high[0] - low[0]) / cellSize)) + 1
+        ny = int(math.ceil((high[1] - low[1]) / cellSize)) + 1
+        self.heights = np.full((ny, nx), np.nan)
+        self.overhang = np.zeros((ny, nx), dtype=bool)
+
+        top = high[2] + cellSize
+        down = (inverse.to_3x3() * Vector((0, 0, -1))).normalized()
+        step = down * (cellSize * 0.001)
+        for j in range(ny):
+            y = low[1] + j * cellSize
+            for i in range(nx):
+                x = low[0] + i * cellSize
+                loc = tree.ray_cast(inverse * Vector((x, y, top)), down)[0]
+                if loc is None:
+                    continue
+                self.heights[j, i] = (mw * loc)[2]
+                for layer in range(MAXLAYERS):
+                    loc, norm = tree.ray_cast(loc + step, down)[:2]
+                    if loc is None:
+                        break
+                    if (normalMatrix * norm)[2] > 0:
+                        self.overhang[j, i] = True
+                        break
+
+    def sample(self, points):
+        """Bilinear height and normal of the ground below points.
+
+        :returns: heights, normals, inside (the point is over this ground),
+            useTree (the height field can't be used for the point)"""
+        cs = self.cellSize
+        ny, nx = self.heights.shape
+        u = (points[:, 0] - self.origin[0]) / cs
+        v = (points[:, 1] - self.origin[1]) / cs
+        i = np.floor(u).astype(np.int64)
+        j = np.floor(v).astype(np.int64)
+        inside = (i >= 0) & (j >= 0) & (i < nx - 1) & (j < ny - 1)
+        i = np.clip(i, 0, max(nx - 2, 0))
+        j = np.clip(j, 0, max(ny - 2, 0))
+        fu = (u - i)[:, None]
+        fv = (v - j)[:, None]
+
+        corners = np.stack((self.heights[j, i], self.heights[j, i + 1],
+                            self.heights[j + 1, i], self.heights[j + 1, i + 1]),
+                           axis=1)
+        overhang = self.overhang[j, i] | self.overhang[j, i + 1] | \
+            self.overhang[j + 1, i] | self.overhang[j + 1, i + 1]
+        useTree = inside & (overhang | np.isnan(corners).any(axis=1))
+        inside &= ~useTree
+
+        h00, h10, h01, h11 = (corners[:, k:k + 1] for k in range(4))
+        heights = ((h00 * (1 - fu) + h10 * fu) * (1 - fv) +
+                   (h01 * (1 - fu) + h11 * fu) * fv)[:, 0]
+        dx = ((h10 - h00) * (1 - fv) + (h11 - h01) * fv)[:, 0] / cs
+        dy = ((h01 - h00) * (1 - fu) + (h11 - h10) * fu)[:, 0] / cs
+        normals = np.stack((-dx, -dy, np.ones(len(points))), axis=1)
+        normals /= np.linalg.norm(normals, axis=1)[:, None]
+        return heights, normals, inside, useTree
+
 
 class Ground(Mc):
     """Get data about the ground near the agent"""
@@ -35,6 +116,8 @@ class Ground(Mc):
         Mc.__init__(self, sim)
         self.channels = {}
         self.calced = False
+        # Built once per ground object for the whole simulation
+        self.heightFields = {}
 
     def newframe(self):
         for ch in self.channels.values():
@@ -44,18 +127,30 @@ class Ground(Mc):
         self.calced = False
         Mc.setuser(self, userid)
 
-    def retrieve(self, groundGroup):
-        """Return the vertical distance to the nearest ground object"""
-        if groundGroup not in self.channels:
-            self.channels[groundGroup] = Channel(groundGroup, self)
-        self.channels[groundGroup].newuser(self.userid)
-        return self.channels[groundGroup]
+    def heightField(self, gnd, cellSize):
+        key = (gnd.name, cellSize)
+        if key not in self.heightFields:
+            self.heightFields[key] = HeightField(gnd, cellSize)
+        return self.heightFields[key]
+
+    def retrieve(self, groundGroup, cellSize=0):
+        """Return the vertical distance to the nearest ground object
+
+        :param cellSize: Size of the cells of the height fields, 0 to always
+            use ray casting"""
+        key = (groundGroup, cellSize)
+        if key not in self.channels:
+            self.channels[key] = Channel(groundGroup, self, cellSize)
+        self.channels[key].newuser(self.userid)
+        return self.channels[key]
 
 
 class Channel:
-    def __init__(self, formID, Ground):
+    def __init__(self, formID, Ground, cellSize=0):
         self.Ground = Ground
         self.groupObjects = bpy.data.groups[formID].objects
+        self.cellSize = cellSize
+        self.heightResult = None
 
         self.calcd = False
         self.groundTrees = {}
@@ -75,33 +170,81 @@ class Channel:
         self.store = {}
         self.calcd = False
         self.groundTrees = {}
+        self.heightResult = None
+
+    def getGround(self, gnd):
+        """The BVH tree and transforms of a ground object, built once per
+        frame and shared by all the agents"""
+        if gnd.name not in self.groundTrees:
+            sce = bpy.context.scene
+            inverseTransform = gnd.matrix_world.inverted()
+            direc = Vector((0, 0, 1))
+            direc.rotate(inverseTransform.to_euler())
+            self.groundTrees[gnd.name] = (BVHTree.FromObject(gnd, sce),
+                                          gnd.matrix_world.copy(),
+                                          inverseTransform,
+                                          tuple(-x for x in direc),
+                                          tuple(x for x in direc))
+        return self.groundTrees[gnd.name]
+
+    def calcHeights(self):
+        """Look up the ground under every agent in the height fields at once.
+        Agents that are over an overhang are marked to use the BVH trees."""
+        batch = self.Ground.sim.batch
+        points = batch.position
+        n = len(points)
+        distance = np.full(n, np.nan)
+        location = np.zeros((n, 3))
+        normal = np.zeros((n, 3))
+        useTree = np.zeros(n, dtype=bool)
+        for gnd in self.groupObjects:
+            hf = self.Ground.heightField(gnd, self.cellSize)
+            heights, normals, inside, tree = hf.sample(points)
+            dh = points[:, 2] - heights
+            closer = inside & (np.isnan(distance) |
+                               (np.abs(dh) < np.abs(distance)))
+            distance[closer] = dh[closer]
+            location[closer, :2] = points[closer, :2]
+            location[closer, 2] = heights[closer]
+            normal[closer] = normals[closer]
+            useTree |= tree
+        self.heightResult = (distance, location, normal, useTree)
 
     def calcground(self):
         """Called the first time each agent uses the Ground channel"""
+        if self.cellSize > 0:
+            if self.heightResult is None:
+                self.calcHeights()
+            distance, location, normal, useTree = self.heightResult
+            i = self.Ground.sim.batch.index[self.userid]
+            if not useTree[i]:
+                if np.isnan(distance[i]):
+                    self.store["distance"] = None
+                else:
+                    self.store["location"] = Vector(location[i])
+                    self.store["normal"] = Vector(normal[i])
+                    self.store["index"] = None
+                    self.store["distance"] = float(distance[i])
+                self.calcd = True
+                return
+
         results = []
         s = bpy.context.scene.objects[self.userid]
         for gnd in self.groupObjects:
-            if gnd.name not in self.groundTrees:
-                sce = bpy.context.scene
-                self.groundTrees[gnd.name] = BVHTree.FromObject(gnd, sce)
-            inverseTransform = gnd.matrix_world.inverted()
+            tree, transform, inverseTransform, down, up = self.getGround(gnd)
             point = (inverseTransform * s.location.to_4d()).to_3d()
-            direc = Vector((0, 0, 1))
-            direc.rotate(inverseTransform.to_euler())
-            calcd = self.groundTrees[gnd.name].ray_cast(point,
-                                                        tuple(-x for x in direc))
+            calcd = tree.ray_cast(point, down)
             if calcd[0]:
                 loc, norm, ind, dist = calcd
-                loc = gnd.matrix_world * loc
-                norm = gnd.matrix_world * norm
+                loc = transform * loc
+                norm = transform * norm
                 dist = (s.location - loc).length
                 results.append((loc, norm, ind, dist))
-            calcd = self.groundTrees[gnd.name].ray_cast(
-                point, tuple(x for x in direc))
+            calcd = tree.ray_cast(point, up)
             if calcd[0]:
                 loc, norm, ind, dist = calcd
-                loc = gnd.matrix_world * loc
-                norm = gnd.matrix_world * norm
+                loc = transform * loc
+                norm = transform * norm
                 dist = (s.location - loc).length
                 results.append((loc, norm, ind, -dist))
 
@@ -121,25 +264,38 @@ class Channel:
             self.calcground()
         return self.store["distance"]
 
+    def findNearest(self, gnd, point):
+        """The point on the ground object nearest to point. Approximated by
+        the point vertically above or below it when using height fields."""
+        if self.cellSize > 0:
+            hf = self.Ground.heightField(gnd, self.cellSize)
+            heights, normals, inside, useTree = hf.sample(
+                np.array([tuple(point)]))
+            if inside[0]:
+                co = Vector((point[0], point[1], heights[0]))
+                return co, None, None, (co - point).length
+            if not useTree[0]:
+                return None, None, None, None
+        return self.getGround(gnd)[0].find_nearest(point)
+
     def calcAhead(self, offset):
         s = bpy.context.scene.objects[self.userid]
         result = None
         best = None
         for gnd in self.groupObjects:
-            if not gnd.name in self.groundTrees:
-                sce = bpy.context.scene
-                self.groundTrees[gnd.name] = BVHTree.FromObject(gnd, sce)
             offsetVec = Vector((offset[0], offset[1], offset[2]))
             lookAheadPoint = s.matrix_world * offsetVec
-            r = self.groundTrees[gnd.name].find_nearest(lookAheadPoint)
+            r = self.findNearest(gnd, lookAheadPoint)
+            if r[0] is None:
+                continue
             if result is None or r[3] < best:
                 result = r[0]
                 best = r[3]
                 # TODO calc distance from look ahead point to nearest point?
 
         if result is None:
-            self.aheadStore[multiply] = {"rz": None,
-                                         "rx": None}
+            self.aheadStore[offset] = {"rz": None,
+                                       "rx": None}
             return
         relative = s.matrix_world.inverted() * result
         changez = math.atan2(relative[0], relative[1]) / math.pi
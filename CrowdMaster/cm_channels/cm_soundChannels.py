@@ -21,6 +21,7 @@ import math
 
 import bpy
 import mathutils
+import numpy as np
 
 from ..libs import ins_octree as ot
 from .cm_masterChannels import MasterChannel as Mc
@@ -83,8 +84,12 @@ class Channel:
         self.predictNext = False
         self.steeringNext = False
 
-        self.kdtree = None
-        self.maxVal = 0
+        # Results for all agents, calculated by the first agent to use this
+        #  channel in a frame
+        self.emitterInds = None
+        self.emitterVals = None
+        self.rangeResult = None
+        self.predictionResult = None
 
     def register(self, objectid, val):
         """Add an object that emits sound"""
@@ -99,116 +104,68 @@ class Channel:
         self.storeSteering = {}
         self.storeSteeringCalced = False
 
+    def emitterArrays(self):
+        """Array indices and values of the emitters, built once per frame"""
+        if self.emitterInds is None:
+            batch = self.sim.batch
+            self.emitterInds = batch.indices([e for e, v in self.emitters])
+            self.emitterVals = np.array([v for e, v in self.emitters],
+                                        dtype=np.float64)
+        return self.emitterInds, self.emitterVals
+
+    def userSlice(self, result):
+        """The range of the batch results that belong to the current user"""
+        i = self.sim.batch.index[self.userid]
+        lo = np.searchsorted(result["listener"], i, "left")
+        hi = np.searchsorted(result["listener"], i, "right")
+        return i, lo, hi
+
     def calculate(self, minusRadius):
         """Called the first time an agent uses this frequency"""
-        O = bpy.context.scene.objects
-
-        if self.kdtree is None:
-            self.kdtree = mathutils.kdtree.KDTree(len(self.emitters))
-            for i, item in enumerate(self.emitters):
-                emitterid, val = item
-                self.maxVal = max(self.maxVal, val)
-                self.kdtree.insert(O[emitterid].location, i)
-
-            self.kdtree.balance()
-
-        ag = O[self.userid]
-
-        collisions = self.kdtree.find_range(ag.location, self.maxVal)
-
-        agent = self.sim.agents[self.userid]
-
-        for (co, index, dist) in collisions:
-            emitterid, val = self.emitters[index]
-            if emitterid == self.userid:
-                continue
-            if dist <= val:
-                to = O[emitterid]
-
-                target = to.location - ag.location
-                z = mathutils.Matrix.Rotation(ag.rotation_euler[2], 4, 'Z')
-                y = mathutils.Matrix.Rotation(ag.rotation_euler[1], 4, 'Y')
-                x = mathutils.Matrix.Rotation(ag.rotation_euler[0], 4, 'X')
-                rotation = x * y * z
-                relative = target * rotation
-                changez = math.atan2(relative[0], relative[1]) / math.pi
-                changex = math.atan2(relative[2], relative[1]) / math.pi
-
-                if minusRadius:
-                    dist -= self.sim.agents[emitterid].radius
-                    dist -= agent.radius
-                    if dist < 0:
-                        dist = 0
-                self.store[emitterid] = {"rz": changez,
-                                         "rx": changex,
-                                         "distProp": dist / val}
+        batch = self.sim.batch
+        if self.rangeResult is None:
+            # Find the emitters in range of every agent at once
+            self.rangeResult = batch.soundRange(*self.emitterArrays())
+        result = self.rangeResult
+        user, lo, hi = self.userSlice(result)
+
+        emitter = result["emitter"][lo:hi]
+        dist = result["dist"][lo:hi]
+        if minusRadius:
+            dist = dist - batch.radius[self.emitterInds[emitter]]
+            dist = np.maximum(dist - batch.radius[user], 0)
+        distProp = dist / self.emitterVals[emitter]
+
+        for e, rz, rx, dp in zip(emitter.tolist(),
+                                 result["rz"][lo:hi].tolist(),
+                                 result["rx"][lo:hi].tolist(),
+                                 distProp.tolist()):
+            self.store[self.emitters[e][0]] = {"rz": rz,
+                                               "rx": rx,
+                                               "distProp": dp}
         self.storeCalced = True
 
     def calculatePrediction(self):
         """Called the first time an agent uses this frequency"""
-        O = bpy.context.scene.objects
-        ag = O[self.userid]
-        agSim = self.sim.agents[self.userid]
-        for emitterid, val in self.emitters:
-            if emitterid != self.userid:
-                toSim = self.sim.agents[emitterid]
-
-                p1 = mathutils.Vector((agSim.apx, agSim.apy, agSim.apz))
-                p2 = mathutils.Vector((toSim.apx, toSim.apy, toSim.apz))
-
-                d1 = mathutils.Vector(agSim.globalVelocity)
-                d2 = mathutils.Vector(toSim.globalVelocity)
-
-                a = d1.dot(d1)
-                b = d1.dot(d2)
-                e = d2.dot(d2)
-
-                d = a * e - b * b
-
-                if d != 0:  # If the two lines are not parallel.
-                    r = p1 - p2
-                    c = d1.dot(r)
-                    f = d2.dot(r)
-
-                    s = (b * f - c * e) / d
-                    t = (a * f - b * c) / d
-                    # t*d2 == closest point
-                    # s*d2 == point 2 is at when 1 is at closest approach
-                    pd1 = p1 + (s * d1)
-                    pd2 = p2 + (s * d2)
-                    dist = (pd1 - pd2).length
-                else:
-                    dist = float("inf")
-
-                # pd1 and pd2 are the positions the agents will be when they
-                #  make their closest approach
-                if dist <= val:
-                    target = pd2 - pd1
-
-                    z = mathutils.Matrix.Rotation(ag.rotation_euler[2], 4, 'Z')
-                    y = mathutils.Matrix.Rotation(ag.rotation_euler[1], 4, 'Y')
-                    x = mathutils.Matrix.Rotation(ag.rotation_euler[0], 4, 'X')
-
-                    rotation = x * y * z
-                    relative = target * rotation
-
-                    changez = math.atan2(relative[0], relative[1]) / math.pi
-                    changex = math.atan2(relative[2], relative[1]) / math.pi
-                    if (s < 1) or (t < 1):
-                        cert = 0
-                    else:
-                        if s > 32:
-                            c = 1
-                        else:
-                            c = s / 32
-                        cert = (1 - ((-(c**3) / 3 + (c**2) / 2) * 6))**2
-                        # https://www.desmos.com/calculator/godi4zejgd
-                    self.storePrediction[emitterid] = {"rz": changez,
-                                                       "rx": changex,
-                                                       "distProp": dist / val,
-                                                       "cert": cert}
-                    # (z rot, x rot, dist proportion, time until prediction)
-        self.storePredictionCalced = False
+        if self.predictionResult is None:
+            # Closest approach of every agent with every emitter at once
+            batch = self.sim.batch
+            self.predictionResult = batch.soundPrediction(
+                *self.emitterArrays())
+        result = self.predictionResult
+        user, lo, hi = self.userSlice(result)
+
+        for e, rz, rx, dp, cert in zip(result["emitter"][lo:hi].tolist(),
+                                       result["rz"][lo:hi].tolist(),
+                                       result["rx"][lo:hi].tolist(),
+                                       result["distProp"][lo:hi].tolist(),
+                                       result["cert"][lo:hi].tolist()):
+            self.storePrediction[self.emitters[e][0]] = {"rz": rz,
+                                                         "rx": rx,
+                                                         "distProp": dp,
+                                                         "cert": cert}
+            # (z rot, x rot, dist proportion, time until prediction)
+        self.storePredictionCalced = True
 
     def calculateSteering(self):
         """Called the first time an agent uses this frequency"""
@@ -0,0 +1,341 @@
+# Copyright 2017 CrowdMaster Developer Team
+#
+# ##### BEGIN GPL LICENSE BLOCK ######
+# This file is part of CrowdMaster.
+#
+# CrowdMaster is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CrowdMaster is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CrowdMaster.  If not, see <http://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+"""Run a simulation without the UI, split across several Blender processes.
+
+The agents are partitioned spatially and each worker (a background Blender
+with the same .blend file) steps the brains of its own agents. Every frame
+the workers send the state of their agents back and receive the agents of
+the other workers that are close to their own (the halo) so that neighbour
+queries across partitions still work. When the last frame is done the
+keyframes of all the agents are written into the scene and the file is
+saved.
+
+    blender -b crowd.blend --addons CrowdMaster --python-expr \\
+        "from CrowdMaster import cm_headless; cm_headless.main()" -- \\
+        [--workers N] [--halo DISTANCE] [--timeout SECONDS]
+        [--output path.blend]
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+import bpy
+import mathutils
+import numpy as np
+
+from .cm_simulate import Simulation
+
+logger = logging.getLogger("CrowdMaster")
+
+# Columns of the rows of agent state that are sent between processes
+STATECOLUMNS = ("apx", "apy", "apz", "arx", "ary", "arz", "vx", "vy", "vz")
+
+# Seconds between checks that the workers are still running
+POLLINTERVAL = 0.5
+
+
+def agentState(agent):
+    """The state of an agent that other processes need"""
+    v = agent.globalVelocity
+    return (agent.apx, agent.apy, agent.apz,
+            agent.arx, agent.ary, agent.arz,
+            v[0], v[1], v[2])
+
+
+def setAgentState(agent, row, tags):
+    """Mirror the state of an agent that is simulated by another process"""
+    agent.apx, agent.apy, agent.apz = row[0:3]
+    agent.arx, agent.ary, agent.arz = row[3:6]
+    agent.globalVelocity = mathutils.Vector(row[6:9])
+    agent.access = {"id": agent.id, "tags": tags}
+    obj = bpy.data.objects[agent.id]
+    obj.location = tuple(row[0:3])
+    obj.rotation_euler = tuple(row[3:6])
+
+
+def partitionAgents(positions, parts):
+    """Split the agents into parts of (nearly) the same size by repeatedly
+    halving the largest part along its longest axis.
+
+    :returns: List of arrays of indices into positions"""
+    result = [np.arange(len(positions))]
+    while len(result) < parts:
+        largest = max(range(len(result)), key=lambda i: len(result[i]))
+        inds = result.pop(largest)
+        if len(inds) < 2:
+            result.append(inds)
+            break
+        pts = positions[inds]
+        axis = np.argmax(pts.max(axis=0) - pts.min(axis=0))
+        order = inds[np.argsort(pts[:, axis], kind="mergesort")]
+        half = len(order) // 2
+        result += [order[:half], order[half:]]
+    return result
+
+
+def haloMasks(positions, partitions, halo):
+    """For each partition the agents of other partitions that are within
+    halo distance of the bounding box of its agents"""
+    owner = np.empty(len(positions), dtype=np.int64)
+    for k, inds in enumerate(partitions):
+        owner[inds] = k
+    masks = []
+    for k, inds in enumerate(partitions):
+        if len(inds) == 0:
+            masks.append(np.zeros(len(positions), dtype=bool))
+            continue
+        pts = positions[inds]
+        low = pts.min(axis=0) - halo
+        high = pts.max(axis=0) + halo
+        inside = np.all((positions >= low) & (positions <= high), axis=1)
+        masks.append(inside & (owner != k))
+    return masks
+
+
+def createSimulation():
+    """Set up the agents the same way as the Start Simulation operator.
+    This turns on cm_sim_bake_keyframes of the scene."""
+    scene = bpy.context.scene
+    scene.cm_sim_bake_keyframes = True
+    scene.frame_current = scene.cm_sim_start_frame
+    sim = Simulation()
+    sim.setupActions()
+    for group in scene.cm_groups:
+        sim.createAgents(group)
+    return sim
+
+
+def simulatedFrames():
+    scene = bpy.context.scene
+    return range(scene.cm_sim_start_frame + 1, scene.cm_sim_end_frame)
+
+
+def worker(address, authkey, index):
+    """Entry point of the worker processes"""
+    conn = Client(tuple(address), authkey=authkey.encode())
+    try:
+        conn.send(index)
+        scene = bpy.context.scene
+        sim = createSimulation()
+        allAgents = sim.agents
+
+        ownedIds = conn.recv()
+        owned = [allAgents[agid] for agid in ownedIds]
+
+        for frame in simulatedFrames():
+            haloIds, rows, tags = conn.recv()
+            ghosts = {}
+            for agid, row, agTags in zip(haloIds, rows, tags):
+                agent = allAgents[agid]
+                setAgentState(agent, row, agTags)
+                ghosts[agid] = agent
+            sim.agents = {ag.id: ag for ag in owned}
+            sim.agents.update(ghosts)
+            sim.ghosts = set(ghosts)
+
+            scene.frame_set(frame)
+            sim.framelast = frame
+            sim.step(scene)
+
+            state = np.array([agentState(ag) for ag in owned])
+            conn.send((state.reshape((-1, len(STATECOLUMNS))),
+                       [ag.access["tags"] for ag in owned]))
+
+        conn.send({ag.id: ag.keyframes.channels for ag in owned
+                   if ag.keyframes is not None})
+    finally:
+        conn.close()
+
+
+def startWorkers(address, authkey, count):
+    """Start background Blender processes with the same .blend file"""
+    env = dict(os.environ)
+    # Brains seed their random numbers with hash(agent id)
+    env["PYTHONHASHSEED"] = "0"
+    processes = []
+    for index in range(count):
+        expr = ("from {} import cm_headless; "
+                "cm_headless.worker({!r}, {!r}, {!r})").format(
+                    __package__, list(address), authkey, index)
+        command = [bpy.app.binary_path, "-b", bpy.data.filepath,
+                   "--addons", __package__, "--python-expr", expr]
+        processes.append(subprocess.Popen(command, env=env))
+    return processes
+
+
+def waitForWorker(ready, processes, timeout):
+    """Call ready(POLLINTERVAL) until it returns True. Raises RuntimeError
+    when one of the processes exits or after timeout seconds."""
+    deadline = time.time() + timeout
+    while not ready(POLLINTERVAL):
+        for proc in processes:
+            # Whatever was sent before the process exited can still be read
+            if proc.poll() is not None and not ready(0):
+                raise RuntimeError("Worker {} exited with code {}".format(
+                    proc.pid, proc.returncode))
+        if time.time() > deadline:
+            raise RuntimeError("No answer from the workers in {:.0f}s".format(
+                timeout))
+
+
+def acceptWorkers(listener, processes, timeout):
+    """Wait for every worker to connect.
+
+    :returns: The connections in the same order as processes"""
+    conns = [None] * len(processes)
+    errors = []
+
+    def accept():
+        try:
+            for _ in processes:
+                conn = listener.accept()
+                conns[conn.recv()] = conn
+        except Exception as e:
+            errors.append(e)
+
+    # Listener.accept has no timeout, so it blocks a thread instead
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    try:
+        def ready(wait):
+            thread.join(wait)
+            return not thread.is_alive()
+        waitForWorker(ready, processes, timeout)
+        if errors:
+            raise errors[0]
+    except:
+        for conn in conns:
+            if conn is not None:
+                conn.close()
+        raise
+    return conns
+
+
+def receive(conn, proc, timeout):
+    """conn.recv() that gives up when the worker exits or does not answer"""
+    waitForWorker(conn.poll, [proc], timeout)
+    try:
+        return conn.recv()
+    except EOFError:
+        raise RuntimeError("Worker {} closed the connection".format(proc.pid))
+
+
+def runHeadless(workers, halo, timeout=600.0):
+    """Simulate the scene with several worker processes and write the
+    results into the current scene.
+
+    :param timeout: Seconds to wait for a worker before giving up"""
+    if bpy.data.filepath == "":
+        raise RuntimeError("The .blend file must be saved to run headless")
+    scene = bpy.context.scene
+    bakeKeyframes = scene.cm_sim_bake_keyframes
+    try:
+        simulate(workers, halo, timeout)
+    finally:
+        # Only needed while the agents are created, don't save it to the file
+        scene.cm_sim_bake_keyframes = bakeKeyframes
+
+
+def simulate(workers, halo, timeout):
+    """Run the workers and write the keyframes they return into the scene"""
+    t = time.time()
+    sim = createSimulation()
+    agents = list(sim.agents.values())
+    ids = [ag.id for ag in agents]
+    rows = np.array([agentState(ag) for ag in agents])
+    rows = rows.reshape((-1, len(STATECOLUMNS)))
+    tags = [ag.access["tags"] for ag in agents]
+
+    partitions = partitionAgents(rows[:, :3], workers)
+    authkey = os.urandom(16).hex()
+    listener = Listener(("localhost", 0), authkey=authkey.encode())
+    processes = startWorkers(listener.address, authkey, len(partitions))
+    conns = []
+    try:
+        conns = acceptWorkers(listener, processes, timeout)
+        for conn, inds in zip(conns, partitions):
+            conn.send([ids[i] for i in inds])
+
+        frames = simulatedFrames()
+        for frame in frames:
+            for conn, mask in zip(conns, haloMasks(rows[:, :3], partitions,
+                                                    halo)):
+                inds = np.flatnonzero(mask)
+                conn.send(([ids[i] for i in inds], rows[inds],
+                           [tags[i] for i in inds]))
+            for conn, proc, inds in zip(conns, processes, partitions):
+                workerRows, workerTags = receive(conn, proc, timeout)
+                rows[inds] = workerRows
+                for i, agTags in zip(inds, workerTags):
+                    tags[i] = agTags
+            logger.info("Frame {} of {} ({:.1f}s)".format(
+                frame, frames[-1], time.time() - t))
+
+        for conn, proc in zip(conns, processes):
+            for agid, channels in receive(conn, proc, timeout).items():
+                keyframes = sim.agents[agid].keyframes
+                if keyframes is not None:
+                    keyframes.channels = channels
+    finally:
+        for conn in conns:
+            conn.close()
+        listener.close()
+        for proc in processes:
+            if proc.poll() is None:
+                proc.terminate()
+            proc.wait()
+
+    sim.writeKeyframes()
+    logger.info("Simulated {} agents in {:.1f}s".format(len(agents),
+                                                        time.time() - t))
+
+
+def parseArgs(argv):
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    else:
+        argv = []
+    parser = argparse.ArgumentParser(
+        description="Run a CrowdMaster simulation in several processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes")
+    parser.add_argument("--halo", type=float, default=10.0,
+                        help="How far agents of other workers are visible")
+    parser.add_argument("--timeout", type=float, default=600.0,
+                        help="Seconds to wait for a worker before giving up")
+    parser.add_argument("--output", default=None,
+                        help="Where to save the result (default: overwrite)")
+    return parser.parse_args(argv)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    args = parseArgs(sys.argv)
+    runHeadless(args.workers, args.halo, args.timeout)
+    if args.output is None:
+        bpy.ops.wm.save_mainfile()
+    else:
+        bpy.ops.wm.save_as_mainfile(filepath=args.output)
@@ -0,0 +1,145 @@
+# Copyright 2017 CrowdMaster Developer Team
+#
+# ##### BEGIN GPL LICENSE BLOCK ######
+# This file is part of CrowdMaster.
+#
+# CrowdMaster is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CrowdMaster is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CrowdMaster.  If not, see <http://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+import bpy
+import numpy as np
+
+TRANSFORMGROUP = "Object Transforms"
+
+
+def sparseKeys(frames, values):
+    """Drop the samples that are the same as the samples either side of them.
+    Gives the same keys as inserting a keyframe whenever the value changes
+    (and one on the frame before it started changing)."""
+    if len(values) < 3:
+        return frames, values
+    changed = np.abs(np.diff(values)) > 0.000001
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:-1] = changed[:-1] | changed[1:]
+    return frames[keep], values[keep]
+
+
+def writeFCurve(action, dataPath, index, frames, values, group=None):
+    """Add keyframes to an F-curve in one go, replacing any keyframes that
+    were already in the range of frames"""
+    fc = action.fcurves.find(dataPath, index)
+    if fc is None:
+        if group is None:
+            fc = action.fcurves.new(dataPath, index)
+        else:
+            fc = action.fcurves.new(dataPath, index, group)
+    else:
+        first, last = frames[0], frames[-1]
+        points = fc.keyframe_points
+        for i in reversed(range(len(points))):
+            if first <= points[i].co[0] <= last:
+                points.remove(points[i], fast=True)
+
+    start = len(fc.keyframe_points)
+    fc.keyframe_points.add(len(frames))
+    co = np.empty(2 * (start + len(frames)), dtype=np.float32)
+    if start > 0:
+        fc.keyframe_points.foreach_get("co", co[:2 * start])
+    co[2 * start::2] = frames
+    co[2 * start + 1::2] = values
+    fc.keyframe_points.foreach_set("co", co)
+    fc.update()
+
+
+class KeyframeBuffer:
+    """Samples of the transforms, shape keys and bones of one agent for the
+    whole simulation. Written to F-curves in a single pass when the
+    simulation stops instead of calling keyframe_insert every frame."""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.length = max(end - start + 1, 1)
+        # (data collection, datablock name, data path, index) -> samples
+        self.channels = {}
+
+    def _samples(self, key, frame):
+        if key not in self.channels:
+            self.channels[key] = np.full(self.length, np.nan,
+                                         dtype=np.float32)
+        samples = self.channels[key]
+        ind = frame - self.start
+        if ind >= len(samples):
+            grown = np.full(max(ind + 1, 2 * len(samples)), np.nan,
+                            dtype=np.float32)
+            grown[:len(samples)] = samples
+            self.channels[key] = samples = grown
+        return samples, ind
+
+    def add(self, collection, name, dataPath, index, frame, value):
+        """Record the value of a property on a frame"""
+        if frame < self.start:
+            return
+        samples, ind = self._samples((collection, name, dataPath, index),
+                                     frame)
+        samples[ind] = value
+
+    def addTransform(self, obj, frame, location, rotation):
+        """Record the location and rotation of an object"""
+        for index in range(3):
+            self.add("objects", obj.name, "location", index, frame,
+                     location[index])
+            self.add("objects", obj.name, "rotation_euler", index, frame,
+                     rotation[index])
+
+    def addShapeKey(self, key, shapeKey, frame, value):
+        """Record a shape key value and the value it is changing from if the
+        shape key wasn't set on the last frame"""
+        dataPath = 'key_blocks["{}"].value'.format(shapeKey.name)
+        samples, ind = self._samples(("shape_keys", key.name, dataPath, 0),
+                                     frame)
+        if ind > 0 and np.isnan(samples[ind - 1]):
+            samples[ind - 1] = shapeKey.value
+        samples[ind] = value
+
+    def write(self):
+        """Write all the samples to F-curves"""
+        for (collection, name, dataPath, index), samples in \
+                self.channels.items():
+            datablock = getattr(bpy.data, collection).get(name)
+            if datablock is None:
+                continue
+            frames = np.flatnonzero(~np.isnan(samples))
+            if len(frames) == 0:
+                continue
+            frames, values = sparseKeys(frames + self.start, samples[frames])
+
+            if datablock.animation_data is None:
+                datablock.animation_data_create()
+            animData = datablock.animation_data
+            if animData.action is None:
+                animData.action = bpy.data.actions.new(name + "Action")
+            if collection == "objects":
+                animData.action_extrapolation = 'HOLD_FORWARD'
+                animData.action_blend_type = 'ADD'
+                for track in animData.nla_tracks:
+                    track.mute = False
+            if dataPath in ("location", "rotation_euler"):
+                group = TRANSFORMGROUP
+            elif dataPath.startswith('pose.bones["'):
+                group = dataPath.split('"')[1]
+            else:
+                group = None
+            writeFCurve(animData.action, dataPath, index, frames, values,
+                        group)
+        self.channels = {}
@@ -115,15 +115,14 @@ class LogicNEWINPUT(Neuron):
                 return {"None": dist}
 
         elif settings["InputSource"] == "GROUND":
+            gChan = channels["Ground"].retrieve(settings["GroundGroup"],
+                                                settings["GroundCellSize"])
             if settings["GroundOptions"] == "DH":
-                gChan = channels["Ground"].retrieve(settings["GroundGroup"])
                 dh = gChan.dh()
                 return {"None": dh} if dh is not None else {}
             elif settings["GroundOptions"] == "ARZ":
-                gChan = channels["Ground"].retrieve(settings["GroundGroup"])
                 return {"None": gChan.aheadRz(self.settings["GroundAheadOffset"])}
             elif settings["GroundOptions"] == "ARX":
-                gChan = channels["Ground"].retrieve(settings["GroundGroup"])
                 return {"None": gChan.aheadRx(self.settings["GroundAheadOffset"])}
 
         elif settings["InputSource"] == "NOISE":
@@ -39,6 +39,9 @@ class Simulation:
         self.agents = {}
         self.framelast = bpy.context.scene.cm_sim_start_frame
         self.compbrains = {}
+        self.batch = chan.AgentBatch(self)
+        # Agents that are simulated by another process and only mirrored here
+        self.ghosts = set()
         Noise = chan.Noise(self)
         Sound = chan.Sound(self)
         State = chan.State(self)
@@ -127,10 +130,13 @@ class Simulation:
         # straight after the agent is evaluated.
 
         self.syncManager.newFrame()
+        self.batch.newframe()
 
-        for a in self.agents.values():
+        stepping = [a for a in self.agents.values()
+                    if a.id not in self.ghosts]
+        for a in stepping:
             a.step()
-        for a in self.agents.values():
+        for a in stepping:
             a.apply()
         for chan in self.lvars.values():
             chan.newframe()
@@ -183,3 +189,15 @@ class Simulation:
         if self.frameChangeHandler in bpy.app.handlers.frame_change_pre:
             logger.debug("Unregistering frame change handler")
             bpy.app.handlers.frame_change_pre.remove(self.frameChangeHandler)
+        self.writeKeyframes()
+
+    def writeKeyframes(self):
+        """Write the keyframes of agents that buffered them while baking"""
+        preferences = bpy.context.user_preferences.addons[__package__].preferences
+        if preferences.show_debug_options:
+            t = time.time()
+        for agent in self.agents.values():
+            if agent.keyframes is not None:
+                agent.keyframes.write()
+        if preferences.show_debug_options:
+            logger.debug("Wrote keyframes in {}".format(time.time() - t))
@@ -627,6 +627,8 @@ class camOperation(bpy.types.PropertyGroup):
 	
 	valid = bpy.props.BoolProperty(name="Valid",description="True if operation is ok for calculation", default=True);
 	changedata = bpy.props.StringProperty(name='changedata', description='change data for checking if stuff changed.')
+	geometry_key = bpy.props.StringProperty(name='geometry key', description='hash of source geometry, for the cache of intermediate results')
+	zbuffer_key = bpy.props.StringProperty(name='zbuffer key', description='hash of zbuffer image inputs, for the cache of intermediate results')
 	###############process related data
 	computing = bpy.props.BoolProperty(name="Computing right now",description="", default=False)
 	pid = bpy.props.IntProperty(name="process id", description="Background process id", default=-1)
@@ -802,6 +804,8 @@ def get_panels():#convenience function for bot register and unregister functions
 	ops.CAMPositionObject,
 	ops.CAMSimulate,
 	ops.CAMSimulateChain,
+	ops.CamGcodeBackplot,
+	ops.CamGcodeSimulate,
 	ops.CamChainAdd,
 	ops.CamChainRemove,
 	ops.CamChainOperationAdd,
@@ -23,6 +23,9 @@ import numpy
 import math
 import time
 import random
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 import curve_simplify
 import mathutils
@@ -552,7 +555,110 @@ def simCutterSpot(xs,ys,z,cutterArray, si, getvolume = False):
 		
 	return 0
 
-	
+
+def getSimulationSpots(co,maxz,minx,miny,simulation_detail,borderwidth):
+	'''positions (in simulation image pixels) and depths of all cutter spots along a path, as numpy arrays.
+	Cutter is placed at every path vertex and every simulation_detail along segments, like in the
+	per vertex loop of generateSimulationImage, but for the whole path at once.'''
+	co=numpy.asarray(co,dtype=float).reshape(-1,3)
+	if len(co)<2:
+		return numpy.zeros(0,dtype=int),numpy.zeros(0,dtype=int),numpy.zeros(0)
+	#the loop there starts with lasts = second vertex, so the first vertex is never simulated
+	lasts=numpy.concatenate((co[1:2],co[1:-1]))
+	s=co[1:]
+	v=s-lasts
+	l=numpy.sqrt((v*v).sum(axis=1))
+	flat=(v[:,0]==0)&(v[:,1]==0)
+	#only simulate inside material, and exclude lift-ups
+	active=((lasts[:,2]<maxz)|(s[:,2]<maxz))&~(flat&(v[:,2]>0))
+	#if the cutter goes straight down, we don't have to interpolate.
+	interpolated=active&~(flat&(v[:,2]<0))&(l>simulation_detail)
+	
+	def toPx(x,y):
+		return ((x-minx)/simulation_detail+borderwidth+simulation_detail/2).astype(int),((y-miny)/simulation_detail+borderwidth+simulation_detail/2).astype(int)
+	
+	fxs,fys=toPx(s[:,0],s[:,1])
+	
+	#spots along segments
+	counts=numpy.where(interpolated,numpy.ceil(l/simulation_detail).astype(int)-1,0)
+	counts=numpy.maximum(counts,0)
+	seg=numpy.repeat(numpy.arange(len(s)),counts)
+	starts=numpy.cumsum(counts)-counts
+	k=numpy.arange(len(seg))-numpy.repeat(starts,counts)+1
+	dirs=v[seg]/l[seg,None]
+	pts=lasts[seg]+dirs*(k*simulation_detail)[:,None]
+	ixs,iys=toPx(pts[:,0],pts[:,1])
+	
+	#spots which fall into the same pixel as the previous one are dropped, the first spot of a segment
+	#is compared with the last vertex spot simulated before
+	activeidx=numpy.nonzero(active)[0]
+	prevactive=numpy.searchsorted(activeidx,numpy.arange(len(s)))-1
+	prevx=numpy.where(prevactive>=0,fxs[activeidx[prevactive]],0)
+	prevy=numpy.where(prevactive>=0,fys[activeidx[prevactive]],0)
+	lastxs=numpy.empty_like(ixs)
+	lastys=numpy.empty_like(iys)
+	if len(seg)>0:
+		lastxs[1:]=ixs[:-1]
+		lastys[1:]=iys[:-1]
+		first=k==1
+		lastxs[first]=prevx[seg[first]]
+		lastys[first]=prevy[seg[first]]
+	keep=(ixs!=lastxs)|(iys!=lastys)
+	
+	xs=numpy.concatenate((ixs[keep],fxs[active]))
+	ys=numpy.concatenate((iys[keep],fys[active]))
+	zs=numpy.concatenate((pts[keep,2],s[active,2]))
+	return xs,ys,zs
+
+def simCutterSpots(si,xs,ys,zs,cutterArray,tilesize=256):
+	'''simulates many cutter spots at once, with the same result as calling simCutterSpot for each of them.
+	Lowest spot in each pixel is found first, then the cutter shape is swept over it in tiles,
+	skipping tiles that are not touched by any spot. Tiles don't overlap, so they are processed in parallel.'''
+	m=int(cutterArray.shape[0]/2)
+	size=cutterArray.shape[0]
+	keep=(xs>-m)&(xs<si.shape[0]+m)&(ys>-m)&(ys<si.shape[1]+m)
+	xs,ys,zs=xs[keep],ys[keep],zs[keep]
+	if len(xs)==0:
+		return
+	#lowest spot in each pixel, padded so that spots partially out of image fit in
+	zimg=numpy.full((si.shape[0]+2*size,si.shape[1]+2*size),numpy.inf)
+	numpy.minimum.at(zimg,(xs+size,ys+size),zs)
+	
+	tiles=[(x0,y0) for x0 in range(0,si.shape[0],tilesize) for y0 in range(0,si.shape[1],tilesize)]
+	
+	def simTile(tile):
+		x0,y0=tile
+		x1=min(x0+tilesize,si.shape[0])
+		y1=min(y0+tilesize,si.shape[1])
+		#si[p,q]=min(si[p,q], zimg[p+m-a,q+m-b]+cutterArray[a,b]) for all cutter pixels a,b
+		zt=zimg[x0+m+1:x1+size+m,y0+m+1:y1+size+m]
+		if not numpy.isfinite(zt).any():#no spot touches this tile
+			return
+		w=x1-x0
+		h=y1-y0
+		out=si[x0:x1,y0:y1]
+		for a in range(0,size):
+			for b in range(0,size):
+				sx=size-1-a
+				sy=size-1-b
+				numpy.minimum(out,zt[sx:sx+w,sy:sy+h]+cutterArray[a,b],out=out)
+	
+	with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+		list(pool.map(simTile,tiles))
+
+#stock states after each simulated operation, so that re-simulation after editing an operation
+#starts from the state before it: {key of operations chain: simulation image}
+simulation_cache={}
+
+def getSimulationKey(lastkey,o,co,cutterArray,limits):
+	'''key of stock state after operation o, which depends on all previous operations in the chain'''
+	h=hashlib.sha1()
+	h.update(lastkey.encode())
+	h.update(numpy.ascontiguousarray(co,dtype=numpy.float32).tobytes())
+	h.update(numpy.ascontiguousarray(cutterArray).tobytes())
+	h.update(repr((tuple(limits),o.simulation_detail,o.borderwidth,o.do_simulation_feedrate)).encode())
+	return h.hexdigest()
+
 def generateSimulationImage(operations,limits):
 	
 	minx,miny,minz,maxx,maxy,maxz = limits
@@ -572,12 +678,32 @@ def generateSimulationImage(operations,limits):
 	si.resize(resx,resy)
 	si.fill(maxz)
 	
-	
+	key=''
+	chainkeys=[]
 	for o in operations:
 		ob = bpy.data.objects[o.path_object_name]
 		m = ob.data
 		verts = m.vertices
 		
+		co=numpy.empty(len(verts)*3,dtype=numpy.float32)
+		verts.foreach_get('co',co)
+		co=co.reshape(-1,3)
+		cutterArray=-getCutterArray(o,simulation_detail)
+		key=getSimulationKey(key,o,co,cutterArray,limits)
+		chainkeys.append(key)
+		cached=simulation_cache.get(key)
+		if cached is not None and cached.shape==si.shape:
+			#this operation and all before it didn't change
+			si=cached.copy()
+			continue
+		
+		if not o.do_simulation_feedrate:
+			xs,ys,zs=getSimulationSpots(co,maxz,minx,miny,simulation_detail,borderwidth)
+			simCutterSpots(si,xs,ys,zs,cutterArray)
+			simulation_cache[key]=si.copy()
+			progress('simulation',100)
+			continue
+		
 		if o.do_simulation_feedrate:
 			kname = 'feedrates'
 			m.use_customdata_edge_crease = True
@@ -736,7 +862,13 @@ def generateSimulationImage(operations,limits):
 					m.edges[i].crease = d.co.y/(normal_load*4)
 
 				#d.co.z*=0.01#debug
-				
+		simulation_cache[key]=si.copy()
+	
+	#keep only states of this chain of operations
+	for k in list(simulation_cache.keys()):
+		if k not in chainkeys:
+			del simulation_cache[k]
+	
 	o=operations[0]
 	si=si[borderwidth:-borderwidth,borderwidth:-borderwidth]
 	si+=-minz
@@ -745,6 +877,26 @@ def generateSimulationImage(operations,limits):
 	
 	#print('simulation done in %f seconds' % (time.time()-t))
 	return si
+
+def generatePathSimulationImage(co,o,limits):
+	'''stock simulation of path points given as numpy array, e.g. read back from a gcode file,
+	with the cutter and simulation settings of operation o'''
+	minx,miny,minz,maxx,maxy,maxz = limits
+	simulation_detail=o.simulation_detail
+	borderwidth = o.borderwidth
+	resx=ceil((maxx-minx)/simulation_detail)+2*borderwidth
+	resy=ceil((maxy-miny)/simulation_detail)+2*borderwidth
+	si=numpy.empty((resx,resy),dtype=float)
+	si.fill(maxz)
+	
+	cutterArray=-getCutterArray(o,simulation_detail)
+	xs,ys,zs=getSimulationSpots(co,maxz,minx,miny,simulation_detail,borderwidth)
+	simCutterSpots(si,xs,ys,zs,cutterArray)
+	progress('simulation',100)
+	
+	si=si[borderwidth:-borderwidth,borderwidth:-borderwidth]
+	si+=-minz
+	return si
 	
 def crazyPath(o):#TODO: try to do something with this  stuff, it's just a stub. It should be a greedy adaptive algorithm. started another thing below.
 	MAX_BEND=0.1#in radians...#TODO: support operation chains ;)
@@ -1568,6 +1720,28 @@ def getSampleImage(s,sarray,minz):
 		z=sa*(maxy-y)+sb*(y-miny)
 		return z
 		
+def getSampleImageArray(xs,ys,sarray,minz):
+	'''vectorized getSampleImage, samples whole arrays of image coordinates at once'''
+	xs=numpy.asarray(xs,dtype=numpy.float64)
+	ys=numpy.asarray(ys,dtype=numpy.float64)
+	zs=numpy.full(xs.shape,-10.0)
+	inside=(xs>=0)&(xs<=sarray.shape[0]-1)&(ys>=0)&(ys<=sarray.shape[1]-1)
+	x=xs[inside]
+	y=ys[inside]
+	minx=numpy.floor(x).astype(numpy.int64)
+	miny=numpy.floor(y).astype(numpy.int64)
+	#on the last row/column the second pixel gets zero weight anyway
+	maxx=numpy.minimum(minx+1,sarray.shape[0]-1)
+	maxy=numpy.minimum(miny+1,sarray.shape[1]-1)
+	s1a=sarray[minx,miny]
+	s2a=sarray[maxx,miny]
+	s1b=sarray[minx,maxy]
+	s2b=sarray[maxx,maxy]
+	sa=s1a*(minx+1-x)+s2a*(x-minx)
+	sb=s1b*(minx+1-x)+s2b*(x-minx)
+	zs[inside]=sa*(miny+1-y)+sb*(y-miny)
+	return zs
+
 def getResolution(o):
 	sx=o.max.x-o.min.x
 	sy=o.max.y-o.min.y
@@ -1594,9 +1768,20 @@ def renderSampleImage(o):
 		resx=ceil(sx/o.pixsize)+2*o.borderwidth
 		resy=ceil(sy/o.pixsize)+2*o.borderwidth
 		
-		if not o.update_zbufferimage_tag and len(o.zbuffer_image)==resx and len(o.zbuffer_image[0])==resy :#if we call this accidentally in more functions, which currently happens...
+		key=''
+		if o.geometry_key!='':
+			key=getCacheKey('zbuffer',o.geometry_key,o.pixsize,o.borderwidth,tuple(o.min),tuple(o.max))
+		if not o.update_zbufferimage_tag and key==o.zbuffer_key and len(o.zbuffer_image)==resx and len(o.zbuffer_image[0])==resy :#if we call this accidentally in more functions, which currently happens...
 			#print('has zbuffer')
 			return o.zbuffer_image
+		o.zbuffer_key=key
+		cached=loadCachedStage(o,key)
+		if cached is not None and cached.shape==(resx,resy):
+			o.zbuffer_image=cached
+			o.update_zbufferimage_tag=False
+			return o.zbuffer_image
+		if key!='':#the saved image can be from other inputs
+			o.update_zbufferimage_tag=True
 		####setup image name
 		#fn=bpy.data.filepath
 		#iname=bpy.path.abspath(fn)
@@ -1697,9 +1882,13 @@ def renderSampleImage(o):
 		a=1.0-a
 		o.zbuffer_image=a
 		o.update_zbufferimage_tag=False
+		saveCachedStage(o,key,a)
 		
 	else:
 		i=bpy.data.images[o.source_image_name]
+		o.zbuffer_key=''
+		if o.geometry_key!='':
+			o.zbuffer_key=getCacheKey('zbuffer',o.geometry_key,o.source_image_crop,o.source_image_crop_start_x,o.source_image_crop_start_y,o.source_image_crop_end_x,o.source_image_crop_end_y,o.source_image_size_x,o.source_image_scale_z,tuple(o.source_image_offset),o.strategy=='WATERLINE',o.borderwidth)
 		if o.source_image_crop:
 			sx=int(i.size[0]*o.source_image_crop_start_x/100.0)
 			ex=int(i.size[0]*o.source_image_crop_end_x/100.0)
@@ -1764,7 +1953,18 @@ def prepareArea(o):
 	samples=o.zbuffer_image
 	
 	iname=getCachePath(o)+'_off.exr'
-
+	
+	key=''
+	if o.zbuffer_key!='':
+		key=getCacheKey('offset',o.zbuffer_key,getCutterArray(o,o.pixsize),o.inverse,o.min.z)
+	cached=loadCachedStage(o,key)
+	if cached is not None and cached.shape==samples.shape:
+		o.offset_image=cached
+		o.update_offsetimage_tag=False
+		return
+	if key!='':#the saved image can be from other inputs
+		o.update_offsetimage_tag=True
+	
 	if not o.update_offsetimage_tag:
 		progress('loading offset image')
 		try:
@@ -1776,5 +1976,8 @@ def prepareArea(o):
 	if o.update_offsetimage_tag:
 		if o.inverse:
 			samples=numpy.maximum(samples,o.min.z-0.00001)
+		if o.offset_image.shape!=samples.shape:#zbuffer came from the cache
+			o.offset_image=numpy.empty(samples.shape)
 		offsetArea(o,samples)
 		numpysave(o.offset_image,iname)
+		saveCachedStage(o,key,o.offset_image)
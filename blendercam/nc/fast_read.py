@@ -0,0 +1,351 @@
+################################################################################
+# fast_read.py
+#
+# Bulk ISO NC code reader
+#
+# Unlike the *_read.py parsers, which hand every word to a writer, this reads
+# the whole program with one regular expression and resolves the modal state
+# with numpy, giving arrays of moves for backplotting or simulation.
+# Only the XY plane (G17) is supported for arcs, G53, G28, G30, G92 and G10
+# blocks are not treated as moves. Z and R of drill cycles are read as absolute.
+
+import mmap
+import os
+import re
+import zlib
+
+import numpy
+
+MOVE_RAPID = 0
+MOVE_FEED = 1
+MOVE_ARC_CW = 2
+MOVE_ARC_CCW = 3
+MOVE_DRILL = 4
+
+# a word is a letter followed by a number, spaces between them are allowed (X 10),
+# new lines are kept to know where the blocks end
+pattern_words = re.compile(br'[A-Za-z][ \t]*[-+]?(?:\d+\.?\d*|\.\d+)|\n')
+pattern_comments = re.compile(br'\([^)\n]*\)|;[^\n]*')
+
+motion_codes = {0: MOVE_RAPID, 1: MOVE_FEED, 2: MOVE_ARC_CW, 3: MOVE_ARC_CCW, 12: MOVE_ARC_CW, 13: MOVE_ARC_CCW,
+                81: MOVE_DRILL, 82: MOVE_DRILL, 83: MOVE_DRILL, 80: -1}
+no_move_codes = {4, 10, 28, 30, 53, 92}
+axis_letters = 'XYZIJKRF'
+
+
+class ModalState:
+    '''state of the machine between blocks, used to resume reading'''
+
+    def __init__(self):
+        self.position = [0.0, 0.0, 0.0]
+        self.motion = MOVE_RAPID
+        self.absolute = True
+        self.units = 1.0 # 25.4 when in inches
+        self.feed = 0.0
+        self.retract = 0.0 # R of drill cycles
+        self.depth = 0.0 # Z of drill cycles
+        self.return_initial = True # G98, False after G99
+
+    def copy(self):
+        state = ModalState()
+        state.position = self.position[:]
+        state.motion = self.motion
+        state.absolute = self.absolute
+        state.units = self.units
+        state.feed = self.feed
+        state.retract = self.retract
+        state.depth = self.depth
+        state.return_initial = self.return_initial
+        return state
+
+
+class Moves:
+    '''moves of a program, one item per block that moves the machine
+
+    type - MOVE_* code
+    start, end - (n, 3) positions in mm, a drill cycle ends at the height it returns to
+    feed - feedrate, in mm per minute
+    arc - (n, 4) I, J, K, R of arcs in mm, nan where not given
+    retract - retract height (R) of drill cycles in mm, nan for other moves
+    depth - bottom of the hole of drill cycles in mm, nan for other moves
+    line - index of the line in the file
+    '''
+
+    def __init__(self, type, start, end, feed, arc, retract, depth, line):
+        self.type = type
+        self.start = start
+        self.end = end
+        self.feed = feed
+        self.arc = arc
+        self.retract = retract
+        self.depth = depth
+        self.line = line
+
+    def __len__(self):
+        return len(self.type)
+
+    def append(self, other):
+        return Moves(numpy.concatenate((self.type, other.type)),
+                     numpy.concatenate((self.start, other.start)),
+                     numpy.concatenate((self.end, other.end)),
+                     numpy.concatenate((self.feed, other.feed)),
+                     numpy.concatenate((self.arc, other.arc)),
+                     numpy.concatenate((self.retract, other.retract)),
+                     numpy.concatenate((self.depth, other.depth)),
+                     numpy.concatenate((self.line, other.line)))
+
+
+def _ffill(values, initial):
+    '''replaces nan with the last value given before it, or with initial'''
+    idx = numpy.where(numpy.isnan(values), 0, numpy.arange(1, len(values) + 1))
+    numpy.maximum.accumulate(idx, out=idx)
+    return numpy.concatenate(([initial], values))[idx]
+
+
+def _positions(v, absolute, initial):
+    '''position along one axis after every line, from the words of the axis (nan where not given)'''
+    isset = ~numpy.isnan(v)
+    # incremental words are summed from the last absolute one
+    delta = numpy.where(isset & ~absolute, v, 0.0)
+    total = numpy.cumsum(delta)
+    base = numpy.where(isset & absolute, v - total, numpy.nan)
+    return _ffill(base, initial) + total
+
+
+def _last_code(codes, lines, nlines, table):
+    '''per line value of the last G code found in table, nan if there is none'''
+    out = numpy.full(nlines, numpy.nan)
+    for code, value in table.items():
+        mask = codes == code
+        out[lines[mask]] = value
+    return out
+
+
+def parse_buffer(buf, state=None, first_line=0, pos=0, endpos=None):
+    '''
+    reads moves from bytes like object (bytes, mmap) between pos and endpos,
+    returns (Moves, ModalState at the end, number of lines read)
+    '''
+    if state is None:
+        state = ModalState()
+    if endpos is None:
+        endpos = len(buf)
+    if buf.find(b'(', pos, endpos) >= 0 or buf.find(b';', pos, endpos) >= 0:
+        buf = pattern_comments.sub(b'', buf[pos:endpos])
+        pos, endpos = 0, len(buf)
+    words = pattern_words.findall(buf, pos, endpos)
+    if len(words) == 0:
+        return Moves(numpy.empty(0, dtype=numpy.int8), numpy.empty((0, 3)), numpy.empty((0, 3)),
+                     numpy.empty(0), numpy.empty((0, 4)), numpy.empty(0), numpy.empty(0),
+                     numpy.empty(0, dtype=int)), state.copy(), 0
+    # all words as rows of bytes, the letter is the first column
+    words = numpy.array(words)
+    chars = words.view(numpy.uint8).reshape(len(words), -1)
+    newline = chars[:, 0] == 10
+    lines = numpy.cumsum(newline) - newline
+    nlines = int(lines[-1]) + 1
+    chars = chars[~newline]
+    lines = lines[~newline]
+    letters = chars[:, 0] & 0xDF # upper case
+    # the letter is replaced by a space, which float conversion skips like the spaces after it
+    chars[:, 0] = 32
+    values = chars.view(words.dtype).ravel().astype(float)
+
+    # G codes, in tenths, so that G61.1 does not match G61
+    isg = letters == ord('G')
+    gcodes = numpy.round(values[isg] * 10).astype(int)
+    glines = lines[isg]
+    motion = _last_code(gcodes, glines, nlines, {c * 10: v for c, v in motion_codes.items()})
+    absolute = _last_code(gcodes, glines, nlines, {900: 1, 910: 0})
+    units = _last_code(gcodes, glines, nlines, {200: 25.4, 700: 25.4, 210: 1.0, 710: 1.0})
+    return_initial = _last_code(gcodes, glines, nlines, {980: 1, 990: 0})
+    no_move = numpy.zeros(nlines, dtype=bool)
+    no_move[glines[numpy.isin(gcodes, [c * 10 for c in no_move_codes])]] = True
+
+    motion = _ffill(motion, state.motion)
+    absolute = _ffill(absolute, 1.0 if state.absolute else 0.0) > 0.5
+    units = _ffill(units, state.units)
+    return_initial = _ffill(return_initial, 1.0 if state.return_initial else 0.0) > 0.5
+
+    given = {}
+    for letter in axis_letters:
+        mask = letters == ord(letter)
+        column = numpy.full(nlines, numpy.nan)
+        column[lines[mask]] = values[mask]
+        given[letter] = column * units
+
+    feed = _ffill(given['F'], state.feed)
+    # R and Z are modal for drill cycles, R words of arcs must not change the retract height
+    isdrill = motion == MOVE_DRILL
+    retract = _ffill(numpy.where(isdrill, given['R'], numpy.nan), state.retract)
+    depth = _ffill(numpy.where(isdrill, given['Z'], numpy.nan), state.depth)
+
+    end = numpy.empty((nlines, 3))
+    for axis, letter in enumerate('XY'):
+        end[:, axis] = _positions(given[letter], absolute, state.position[axis])
+    # a drill cycle ends at R (G99) or at the height before the cycles (G98, but not below R),
+    # Z of the cycle is the depth of the hole and does not move the tool there
+    z = _positions(numpy.where(isdrill, numpy.nan, given['Z']), absolute, state.position[2])
+    clearance = numpy.where(return_initial, numpy.maximum(z, retract), retract)
+    end[:, 2] = _positions(numpy.where(isdrill, clearance, given['Z']), absolute | isdrill, state.position[2])
+    start = numpy.concatenate(([state.position], end[:-1]))
+
+    moved = numpy.zeros(nlines, dtype=bool)
+    for letter in 'XYZ':
+        moved |= ~numpy.isnan(given[letter])
+    isarc = (motion == MOVE_ARC_CW) | (motion == MOVE_ARC_CCW)
+    for letter in 'IJKR':
+        moved |= isarc & ~numpy.isnan(given[letter])
+    moved &= (motion >= 0) & ~no_move
+    sel = numpy.flatnonzero(moved)
+
+    arc = numpy.column_stack((given['I'], given['J'], given['K'], given['R']))[sel]
+    arc[isdrill[sel], 3] = numpy.nan
+    moveretract = numpy.where(isdrill[sel], retract[sel], numpy.nan)
+    movedepth = numpy.where(isdrill[sel], depth[sel], numpy.nan)
+    moves = Moves(motion[sel].astype(numpy.int8), start[sel], end[sel], feed[sel], arc, moveretract, movedepth,
+                  sel + first_line)
+
+    newstate = ModalState()
+    newstate.position = list(end[-1])
+    newstate.motion = int(motion[-1])
+    newstate.absolute = bool(absolute[-1])
+    newstate.units = float(units[-1])
+    newstate.feed = float(feed[-1])
+    newstate.retract = float(retract[-1])
+    newstate.depth = float(depth[-1])
+    newstate.return_initial = bool(return_initial[-1])
+    return moves, newstate, int(newline.sum())
+
+
+def _crc(buf, start, stop, value=0):
+    '''checksum of a part of buf, without copying it'''
+    with memoryview(buf) as view:
+        return zlib.crc32(view[start:stop], value)
+
+
+def read(name, use_mmap=True, modal_cache=None):
+    '''reads moves from a file.
+
+    If modal_cache (a dict) is given, the moves and the modal state at the end of the file are kept in it,
+    and the next read of the same file, if it only grew, parses just the new lines. A file counts as grown
+    only if the part that was read before is unchanged (same checksum), otherwise it is read from scratch.
+    '''
+    st = os.stat(name)
+    size = st.st_size
+    cached = None
+    offset = 0
+    first_line = 0
+    state = None
+    if modal_cache is not None:
+        cached = modal_cache.get(name)
+        if cached is not None and cached['size'] == size and cached['mtime'] == st.st_mtime_ns:
+            return cached['moves']
+        if cached is None or cached['size'] > size:
+            cached = None
+
+    with open(name, 'rb') as f:
+        if size == 0:
+            buf = b''
+        elif use_mmap:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buf = f.read()
+        try:
+            if cached is not None and _crc(buf, 0, cached['offset']) != cached['crc']:
+                # rewritten, not appended to
+                cached = None
+            if cached is not None:
+                offset, first_line, state = cached['offset'], cached['lines'], cached['state']
+            # only complete lines are read, the last one may still be written
+            stop = buf.rfind(b'\n', offset) + 1
+            if stop <= offset:
+                stop = offset
+            if stop == offset and cached is not None:
+                return cached['moves']
+            moves, state, nlines = parse_buffer(buf, state, first_line, offset, stop)
+            if modal_cache is not None:
+                crc = _crc(buf, offset, stop, cached['crc'] if cached is not None else 0)
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+    if cached is not None:
+        moves = cached['moves'].append(moves)
+    if modal_cache is not None:
+        modal_cache[name] = {'size': size, 'mtime': st.st_mtime_ns, 'offset': stop, 'crc': crc,
+                             'lines': first_line + nlines, 'state': state, 'moves': moves}
+    return moves
+
+
+def arc_centres(moves, sel):
+    '''centres of arc moves in XY, from IJ or from R'''
+    start = moves.start[sel]
+    end = moves.end[sel]
+    i, j, k, r = moves.arc[sel].T
+    centre = start[:, :2] + numpy.column_stack((numpy.nan_to_num(i), numpy.nan_to_num(j)))
+    byr = ~numpy.isnan(r) & numpy.isnan(i) & numpy.isnan(j)
+    if byr.any():
+        chord = end[byr, :2] - start[byr, :2]
+        l = numpy.maximum(numpy.hypot(chord[:, 0], chord[:, 1]), 1e-12)
+        h = numpy.sqrt(numpy.maximum(r[byr] ** 2 - (l / 2) ** 2, 0))
+        normal = numpy.column_stack((-chord[:, 1], chord[:, 0])) / l[:, None]
+        # for a clockwise arc the centre is on the right, negative R takes the longer arc
+        side = numpy.where(moves.type[sel][byr] == MOVE_ARC_CW, -1.0, 1.0) * numpy.sign(r[byr])
+        centre[byr] = start[byr, :2] + chord / 2 + normal * (h * side)[:, None]
+    return centre
+
+
+def polyline(moves, max_angle=0.1):
+    '''
+    points of the tool path as a (n, 3) array, with arcs split to segments of at most max_angle radians,
+    and the move type of each point (the move ending in it)
+    '''
+    n = len(moves)
+    counts = numpy.ones(n, dtype=int)
+    # drill cycles move above the hole, go down to the retract height, to the bottom and back up
+    isdrill = moves.type == MOVE_DRILL
+    counts[isdrill] = 4
+    isarc = (moves.type == MOVE_ARC_CW) | (moves.type == MOVE_ARC_CCW)
+    sel = numpy.flatnonzero(isarc)
+    if len(sel):
+        centre = arc_centres(moves, sel)
+        a0 = numpy.arctan2(moves.start[sel, 1] - centre[:, 1], moves.start[sel, 0] - centre[:, 0])
+        a1 = numpy.arctan2(moves.end[sel, 1] - centre[:, 1], moves.end[sel, 0] - centre[:, 0])
+        cw = moves.type[sel] == MOVE_ARC_CW
+        sweep = numpy.where(cw, a0 - a1, a1 - a0) % (2 * numpy.pi)
+        sweep[sweep < 1e-9] = 2 * numpy.pi # full circle
+        counts[sel] = numpy.maximum(numpy.ceil(sweep / max_angle), 1).astype(int)
+        radius = numpy.hypot(moves.start[sel, 0] - centre[:, 0], moves.start[sel, 1] - centre[:, 1])
+
+    total = counts.sum()
+    owner = numpy.repeat(numpy.arange(n), counts)
+    # 1..count for every point of a move
+    step = numpy.arange(total) - numpy.repeat(numpy.cumsum(counts) - counts, counts) + 1
+    t = step / counts[owner]
+    points = moves.start[owner] + (moves.end[owner] - moves.start[owner]) * t[:, None]
+
+    if len(sel):
+        arcidx = numpy.full(n, -1)
+        arcidx[sel] = numpy.arange(len(sel))
+        onarc = isarc[owner]
+        ai = arcidx[owner[onarc]]
+        direction = numpy.where(cw[ai], -1.0, 1.0)
+        angle = a0[ai] + direction * sweep[ai] * t[onarc]
+        points[onarc, 0] = centre[ai, 0] + radius[ai] * numpy.cos(angle)
+        points[onarc, 1] = centre[ai, 1] + radius[ai] * numpy.sin(angle)
+
+    ondrill = isdrill[owner]
+    if ondrill.any():
+        drill = owner[ondrill]
+        points[ondrill] = moves.end[drill]
+        points[ondrill, 2] = numpy.select([step[ondrill] == 1, step[ondrill] == 2, step[ondrill] == 3],
+                                          [numpy.maximum(moves.start[drill, 2], moves.retract[drill]),
+                                           moves.retract[drill], moves.depth[drill]], moves.end[drill, 2])
+
+    if n:
+        points = numpy.concatenate((moves.start[:1], points))
+        types = numpy.concatenate(([MOVE_RAPID], moves.type[owner]))
+    else:
+        types = numpy.empty(0, dtype=numpy.int8)
+    return points, types
@@ -357,6 +357,7 @@ class Creator(nc.Creator):
 		if name == None:
 			name = self.program_name + ' subroutine ' + str(id)
 			
+		self.file_flush()
 		self.save_file = self.file
 		if self.subroutines_in_own_files:
 			new_name = self.make_subroutine_name(id)
@@ -384,6 +385,7 @@ class Creator(nc.Creator):
 	def sub_end(self):
 		self.write(self.SPACE() + self.SUBPROG_END() + '\n')
 
+		self.file_flush()
 		self.file.close()
 		self.file = self.save_file
 		
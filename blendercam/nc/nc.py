@@ -29,26 +29,36 @@ class Creator:
 	############################################################################
 	##	Internals
 		
+	# number of pieces of text kept in memory before they are written to the file
+	BUFFER_SIZE = 100000
+
 	def file_open(self, name):
-		#self.buffer=[]
+		self.buffer=[]
+		self.lines=0#lines written so far, including the ones still in the buffer
 		self.file = open(name, 'w')
 		self.filename = name
 		
+	def file_flush(self):
+		if len(self.buffer)>0:
+			s=''.join(self.buffer)
+			self.buffer=[]
+			self.file.write(s)
+		
 	def file_close(self):
-		#self.file.write(''.join(self.buffer))
-		#self.buffer=[]
+		self.file_flush()
 		self.file.close()
 
 	def write(self, s):
-		self.file.write(s)
-		#self.buffer.append(s)
-		#if len(self.buffer)>100000:
-		#	self.file.write(''.join(self.buffer))
-		#	self.buffer=[]
+		self.buffer.append(s)
+		self.lines+=s.count('\n')
+		if len(self.buffer)>self.BUFFER_SIZE:
+			self.file_flush()
 			
 	def writem(self, a):
-		self.file.write(''.join(a))
-		#self.buffer.extend(a)
+		self.buffer.extend(a)
+		self.lines+=sum(s.count('\n') for s in a)
+		if len(self.buffer)>self.BUFFER_SIZE:
+			self.file_flush()
 	############################################################################
 	##	Programs
 
@@ -26,6 +26,7 @@ import subprocess,os, sys, threading
 import cam
 from cam import utils, pack,polygon_utils_cam,chunk,simple
 from bpy.props import *
+from bpy_extras.io_utils import ImportHelper
 import shapely
 
 from shapely import geometry as sgeometry
@@ -406,6 +407,34 @@ class CAMSimulateChain(bpy.types.Operator):
 		layout.prop_search(self, "operation", bpy.context.scene, "cam_operations")
 
 
+class CamGcodeBackplot(bpy.types.Operator, ImportHelper):
+	'''show toolpath of a gcode file as a mesh object'''
+	bl_idname = "object.cam_gcode_backplot"
+	bl_label = "Backplot gcode file"
+	bl_options = {'REGISTER', 'UNDO'}
+	
+	filter_glob = StringProperty(default="*.tap;*.ngc;*.nc;*.gcode", options={'HIDDEN'})
+	
+	def execute(self, context):
+		utils.gcodeBackplot(self.filepath)
+		return {'FINISHED'}
+
+
+class CamGcodeSimulate(bpy.types.Operator, ImportHelper):
+	'''simulate stock removal of a gcode file, with cutter, stock and simulation settings of the active operation'''
+	bl_idname = "object.cam_gcode_simulate"
+	bl_label = "Simulate gcode file"
+	bl_options = {'REGISTER', 'UNDO'}
+	
+	filter_glob = StringProperty(default="*.tap;*.ngc;*.nc;*.gcode", options={'HIDDEN'})
+	
+	def execute(self, context):
+		s=bpy.context.scene
+		operation = s.cam_operations[s.cam_active_operation]
+		utils.doGcodeSimulation(self.filepath,operation)
+		return {'FINISHED'}
+
+
 class CamChainAdd(bpy.types.Operator):
 	'''Add new CAM chain'''
 	bl_idname = "scene.cam_chain_add"
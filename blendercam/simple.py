@@ -21,6 +21,9 @@
 
 import math,sys,os,string
 import time
+import hashlib
+import pickle
+import numpy
 import bpy
 import mathutils 
 from mathutils import *
@@ -156,6 +159,87 @@ def getCachePath(o):
 	iname=fn[:-l]+'temp_cam'+os.sep+bn+'_'+o.name
 	return iname
 
+def getCacheKey(*parts):
+	'''hash of all parts - strings, numbers, numpy arrays or keys of other stages, used as name of cached data'''
+	h=hashlib.sha1()
+	for p in parts:
+		if isinstance(p,numpy.ndarray):
+			h.update(str((p.shape,p.dtype)).encode())
+			h.update(numpy.ascontiguousarray(p).tobytes())
+		else:
+			h.update(repr(p).encode())
+		h.update(b'|')
+	return h.hexdigest()
+
+#the cache of intermediate results is trimmed to this size, least recently used stages are removed first
+STAGE_CACHE_MAX_SIZE=1024*1024*1024
+
+def getStageCachePath(o,key):
+	'''content addressed cache file for intermediate results, shared by all operations of the blend file'''
+	cp=getCachePath(o)
+	return os.path.join(os.path.dirname(cp),'stages',key+'.pickle')
+
+def loadCachedStage(o,key):
+	'''returns data stored by saveCachedStage, or None if there is none'''
+	if key=='' or bpy.data.filepath=='':
+		return None
+	try:
+		f=open(getStageCachePath(o,key),'rb')
+		d=pickle.load(f)
+		f.close()
+	except (IOError,EOFError,pickle.UnpicklingError,AttributeError,ImportError):
+		return None
+	try:#mark as recently used
+		os.utime(getStageCachePath(o,key),None)
+	except OSError:
+		pass
+	progress('loaded cached data '+key)
+	return d
+
+def pruneStageCache(folder,keep=''):
+	'''removes least recently used stages until the cache fits in STAGE_CACHE_MAX_SIZE'''
+	files=[]
+	total=0
+	for name in os.listdir(folder):
+		fn=os.path.join(folder,name)
+		if not name.endswith('.pickle') or fn==keep:
+			continue
+		try:
+			st=os.stat(fn)
+		except OSError:
+			continue
+		files.append((st.st_mtime,st.st_size,fn))
+		total+=st.st_size
+	if keep!='' and os.path.isfile(keep):
+		total+=os.path.getsize(keep)
+	files.sort()
+	for mtime,size,fn in files:
+		if total<=STAGE_CACHE_MAX_SIZE:
+			break
+		try:
+			os.remove(fn)
+			total-=size
+		except OSError:
+			pass
+
+def saveCachedStage(o,key,data):
+	if key=='' or bpy.data.filepath=='':#no place for the cache in unsaved files
+		return
+	fn=getStageCachePath(o,key)
+	if os.path.isfile(fn):#same key, same content
+		return
+	try:
+		if not os.path.isdir(os.path.dirname(fn)):
+			os.makedirs(os.path.dirname(fn))
+		#write to a temporary file first, so that an interrupted write is never read as valid data
+		f=open(fn+'.tmp','wb')
+		pickle.dump(data,f,pickle.HIGHEST_PROTOCOL)
+		f.close()
+		os.replace(fn+'.tmp',fn)
+		pruneStageCache(os.path.dirname(fn),fn)
+	except (IOError,OSError,pickle.PicklingError,RecursionError) as e:
+		print('stage cache not saved: %s' % str(e))
+
 def safeFileName(name):#for export gcode
 	valid_chars = "-_.()%s%s" % (string.ascii_letters, string.digits)
 	filename=''.join(c for c in name if c in valid_chars)
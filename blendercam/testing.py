@@ -20,7 +20,9 @@
 # ***** END GPL LICENCE BLOCK *****
 
 import bpy
-from cam import simple, utils
+import random
+from cam import simple, utils, chunk
+from cam.nc import fast_read
 from cam.simple import *
 
 def addTestCurve(loc):
@@ -105,6 +107,76 @@ def testWaterline(pos):
 def testSimulation():
 	pass;
 
+class sortTestOperation:
+	strategy='DRILL'#sortChunks skips connectChunksLow for drill, so only the order is compared
+	movement_type='MEANDER'
+
+def makeSortTestChunks(n,seed):
+	#random chunks with parent links, some of them allready sorted
+	r=random.Random(seed)
+	chunks=[]
+	for i in range(0,n):
+		x=r.randint(0,20)*.01
+		y=r.randint(0,20)*.01
+		if r.random()<.3:
+			ch=chunk.camPathChunk([(x,y,0),(x+.01,y,0),(x+.01,y+.01,0),(x,y+.01,0)])
+			ch.closed=True
+		else:
+			ch=chunk.camPathChunk([(x,y,0),(x+r.randint(-2,2)*.01,y+r.randint(-2,2)*.01,0)])
+		ch.testindex=i
+		for parent in r.sample(chunks,min(len(chunks),r.randint(0,2))):
+			parent.children.append(ch)
+			ch.parents.append(parent)
+		chunks.append(ch)
+	for ch in chunks:
+		if r.random()<.15:
+			ch.sorted=True
+	r.shuffle(chunks)
+	return chunks
+
+def sortChunksLinear(chunks,o):
+	#the order sortChunks gave before chunksGrid, using the linear getClosest()
+	sortedchunks=[]
+	lastch=None
+	pos=(0,0,0)
+	while len(chunks)>0:
+		ch=None
+		if len(sortedchunks)==0 or len(lastch.parents)==0:
+			ch = utils.getClosest(o,pos,chunks)
+		else:
+			for parent in lastch.parents:
+				ch=parent.getNextClosest(o,pos)
+				if ch!=None:
+					break
+			if ch==None:
+				ch = utils.getClosest(o,pos,chunks)
+		if ch is not None:
+			if not ch.sorted:
+				ch.adaptdist(pos, o)
+				ch.sorted = True
+			chunks.remove(ch)
+			sortedchunks.append(ch)
+			lastch = ch
+			pos = lastch.points[-1]
+	return sortedchunks
+
+def testSortChunks(n=300,seeds=10):
+	report='testing sortChunks against the linear order\n'
+	o=sortTestOperation()
+	test_ok=True
+	for seed in range(0,seeds):
+		expected=[ch.testindex for ch in sortChunksLinear(makeSortTestChunks(n,seed),o)]
+		result=[ch.testindex for ch in utils.sortChunks(makeSortTestChunks(n,seed),o)]
+		if result!=expected:
+			report+='order is different for seed %i\n' % (seed)
+			test_ok = False
+	if test_ok:
+		report += 'test ok\n\n'
+	else:
+		report += 'test result is different\n \n '
+	print(report)
+	return report
+
 def cleanUp():
 	bpy.ops.object.select_all(action='SELECT')
 	bpy.ops.object.delete(use_global=False)
@@ -112,6 +184,26 @@ def cleanUp():
 		bpy.ops.scene.cam_operation_remove()
 
 
+def testGcodeDrillCycle():
+	report='testing reading of a drill cycle followed by a move without Z\n'
+	test_ok=True
+	#G99 returns to R, G98 to the height before the cycle
+	for mode,clearance in (('G99',1),('G98',5)):
+		code='G0 Z5\n%s G81 X10 Y10 Z-5 R1\nX20\nG80\nG0 X50 Y50\n' % (mode)
+		moves,state,lines=fast_read.parse_buffer(code.encode())
+		if list(moves.start[-1])!=[20,10,clearance] or list(moves.end[-1])!=[50,50,clearance]:
+			report+='%s: the rapid after the cycle goes from %s to %s\n' % (mode,list(moves.start[-1]),list(moves.end[-1]))
+			test_ok = False
+		if list(moves.depth[1:3])!=[-5,-5]:
+			report+='%s: wrong depth of the holes %s\n' % (mode,list(moves.depth[1:3]))
+			test_ok = False
+	if test_ok:
+		report += 'test ok\n\n'
+	else:
+		report += 'test result is different\n \n '
+	print(report)
+	return report
+
 def testOperation(i):
 	
 	s=bpy.context.scene
@@ -156,6 +248,8 @@ def testAll():
 	report=''
 	for i in range(0, len(s.cam_operations)):
 		report+=testOperation(i)
+	report+=testSortChunks()
+	report+=testGcodeDrillCycle()
 	print(report)
 		
 ''''		
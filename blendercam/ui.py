@@ -317,6 +317,9 @@ class CAM_OPERATIONS_Panel(CAMButtonsPanel, bpy.types.Panel):
 						if ao.path_object_name!=None and scene.objects.get(ao.path_object_name)!=None:
 							layout.operator("object.cam_export", text="Export gcode")		
 						layout.operator("object.cam_simulate", text="Simulate this operation")
+						row=layout.row(align=True)
+						row.operator("object.cam_gcode_backplot", text="Backplot gcode")
+						row.operator("object.cam_gcode_simulate", text="Simulate gcode")
 
 							
 					else:
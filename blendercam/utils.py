@@ -53,6 +53,7 @@ from cam import image_utils
 from cam.image_utils import *
 from cam.nc import nc
 from cam.nc import iso
+from cam.nc import fast_read
 from cam.opencamlib.opencamlib import oclSample, oclSamplePoints, oclResampleChunks, oclGetWaterline
 
 
@@ -210,6 +211,74 @@ def getChangeData(o):
 		
 	return changedata
 
+
+#operation properties that don't change the path itself, or are written during calculation
+CACHE_IGNORED_PROPS={'rna_type','name','filename','auto_export','hide_all_others','feedrate','plunge_feedrate','spindle_rpm',
+	'cutter_id','cutter_flutes','cutter_description','simulation_detail','do_simulation_feedrate','duration','chipload',
+	'output_header','gcode_header','output_trailer','gcode_trailer','path_object_name','changed','update_zbufferimage_tag',
+	'update_offsetimage_tag','update_silhouete_tag','update_ambient_tag','update_bullet_collision_tag','valid','changedata',
+	'geometry_key','zbuffer_key','computing','pid','outtext','warnings'}
+#properties used only when sorting sampled chunks
+CACHE_SORT_PROPS=('stay_low','merge_dist')
+
+def getObjectsKey(obs,use_modifiers):
+	'''hash of evaluated geometry and placement of objects'''
+	s=bpy.context.scene
+	parts=[]
+	for ob in obs:
+		parts.extend((ob.name,ob.type,numpy.array(ob.matrix_world)))
+		try:
+			mesh=ob.to_mesh(s,use_modifiers,'RENDER')
+		except RuntimeError:#e.g. empties
+			continue
+		if mesh==None:
+			continue
+		co=numpy.empty(len(mesh.vertices)*3,dtype=numpy.float32)
+		mesh.vertices.foreach_get('co',co)
+		loops=numpy.empty(len(mesh.loops),dtype=numpy.int32)
+		mesh.loops.foreach_get('vertex_index',loops)
+		edges=numpy.empty(len(mesh.edges)*2,dtype=numpy.int32)
+		mesh.edges.foreach_get('vertices',edges)
+		parts.extend((co,loops,edges))
+		bpy.data.meshes.remove(mesh)
+	return getCacheKey(*parts)
+
+def getGeometryKey(o):
+	'''hash of everything in the scene the operation path depends on, for the cache of intermediate results'''
+	parts=[o.geometry_source]
+	if o.geometry_source=='IMAGE':
+		i=bpy.data.images[o.source_image_name]
+		parts.extend((i.filepath,tuple(i.size)))
+		fn=bpy.path.abspath(i.filepath)
+		if i.is_dirty or i.packed_file!=None or not os.path.isfile(fn):
+			#edited in blender, only the pixels tell what changed
+			parts.append(numpy.array(i.pixels[:],dtype=numpy.float32))
+		else:
+			st=os.stat(fn)
+			parts.extend((st.st_size,st.st_mtime))
+	else:
+		parts.append(getObjectsKey(o.objects,o.use_modifiers))
+	curves=[]
+	for name in (o.curve_object,o.curve_object1):
+		if name in bpy.data.objects:
+			curves.append(bpy.data.objects[name])
+	if o.use_limit_curve and o.limit_curve in bpy.data.objects:
+		curves.append(bpy.data.objects[o.limit_curve])
+	parts.append(getObjectsKey(curves,False))
+	return getCacheKey(*parts)
+
+def getOperationKey(o,ignored=()):
+	'''hash of operation properties which influence the path'''
+	parts=[]
+	for p in o.bl_rna.properties:
+		pname=p.identifier
+		if pname in CACHE_IGNORED_PROPS or pname in ignored:
+			continue
+		v=getattr(o,pname)
+		if hasattr(v,'__len__') and not isinstance(v,str):#vectors
+			v=tuple(v)
+		parts.append((pname,v))
+	return getCacheKey(*parts)
 		
 def getBounds(o):
 	#print('kolikrat sem rpijde')
@@ -386,6 +455,7 @@ def sampleChunks(o,pathSamples,layers):
 	totaltime=timinginit()
 	timingstart(totaltime)
 	lastz=minz
+	ambient=prepared.prep(o.ambient)#prepared geometry is much faster for many contains() tests
 	for patternchunk in pathSamples:
 		thisrunchunks=[]
 		for l in layers:
@@ -393,18 +463,25 @@ def sampleChunks(o,pathSamples,layers):
 		lastlayer=None
 		currentlayer=None
 		lastsample=None
-		#threads_count=4
 		
-		#for t in range(0,threads):
-			
-		for s in patternchunk.points:
+		#the whole chunk is tested against ambient, and for image method also sampled, at once
+		inside=[ambient.contains(sgeometry.Point(s[0],s[1])) for s in patternchunk.points]
+		if not o.use_exact and len(patternchunk.points)>0:
+			timingstart(samplingtime)
+			chunkpoints=numpy.array([(s[0],s[1]) for s in patternchunk.points])
+			xs=(chunkpoints[:,0]-minx)/pixsize+coordoffset
+			ys=(chunkpoints[:,1]-miny)/pixsize+coordoffset
+			zs=(getSampleImageArray(xs,ys,o.offset_image,minz)+o.skin).tolist()
+			timingadd(samplingtime)
+			
+		for si,s in enumerate(patternchunk.points):
 			if o.strategy!='WATERLINE' and int(100*n/totlen)!=last_percent:
 				last_percent=int(100*n/totlen)
 				progress('sampling paths ',last_percent)
 			n+=1
 			x=s[0]
 			y=s[1]
-			if not o.ambient.contains(sgeometry.Point(x,y)):
+			if not inside[si]:
 				newsample=(x,y,1)
 			else:
 				if o.use_opencamlib and o.use_exact:
@@ -425,13 +502,9 @@ def sampleChunks(o,pathSamples,layers):
 					#print(z)
 					#here we have 
 				else:
-					timingstart(samplingtime)
-					xs=(x-minx)/pixsize+coordoffset
-					ys=(y-miny)/pixsize+coordoffset
-					timingadd(samplingtime)
 					#if o.inverse:
 					#  z=layerstart
-					z=getSampleImage((xs,ys),o.offset_image,minz)+o.skin
+					z=zs[si]
 				#if minz>z and o.ambient.isInside(x,y):
 				#	z=minz;
 				################################
@@ -992,7 +1065,7 @@ def chunksToMesh(chunks,o):
 				verts.append(v)
 			lifted=lift
 			#print(verts_rotations)
-	if o.use_exact and not o.use_opencamlib:
+	if o.use_exact and not o.use_opencamlib and not o.update_bullet_collision_tag:#collision world wasn't prepared when chunks came from the cache
 		cleanupBulletCollision(o)
 	print(time.time()-t)
 	t=time.time()
@@ -1050,6 +1123,8 @@ def chunksToMesh(chunks,o):
 
 	
 		
+EXPORT_BLOCK_SIZE=100000#number of vertices processed at once during gcode export
+
 def exportGcodePath(filename,vertslist,operations):
 	'''exports gcode with the heeks nc adopted library.'''
 	
@@ -1165,6 +1240,7 @@ def exportGcodePath(filename,vertslist,operations):
 		return c
 		
 	c=startNewFile()
+	totlines=0#lines in allready closed files
 	last_cutter=None;#[o.cutter_id,o.cutter_dameter,o.cutter_type,o.cutter_flutes]
 	
 	processedops=0
@@ -1180,7 +1256,7 @@ def exportGcodePath(filename,vertslist,operations):
 		free_movement_height=o.free_movement_height#o.max.z+
 		
 		mesh=vertslist[i]
-		verts=mesh.vertices[:]
+		nverts=len(mesh.vertices)
 		if o.machine_axes!='3':
 			rots=mesh.shape_keys.key_blocks['rotations'].data
 			
@@ -1244,123 +1320,128 @@ def exportGcodePath(filename,vertslist,operations):
 		scale_graph=0.05 #warning this has to be same as in export in utils!!!!
 		
 		#print('2')
-		for vi,vert in enumerate(verts):
-			# skip the first vertex if this is a chained operation
-			# ie: outputting more than one operation
-			# otherwise the machine gets sent back to 0,0 for each operation which is unecessary
-			if i>0 and vi==0:
-				continue 
-			v=vert.co
-			if o.machine_axes!='3':
-				v=v.copy()#we rotate it so we need to copy the vector
-				r=Euler(rots[vi].co)
-				#conversion to N-axis coordinates
-				# this seems to work correctly for 4 axis.
-				rcompensate=r.copy()
-				rcompensate.x=-r.x
-				rcompensate.y=-r.y
-				rcompensate.z=-r.z
-				v.rotate(rcompensate)
+		#vertices are read in blocks, so that huge paths don't need a list of all vertices in memory
+		for blockstart in range(0,nverts,EXPORT_BLOCK_SIZE):
+			verts=mesh.vertices[blockstart:blockstart+EXPORT_BLOCK_SIZE]
+			progress('exporting gcode file, %i lines/s' % (int((totlines+c.lines)/max(time.time()-t,0.001))),100*blockstart/nverts)
+			for vi,vert in enumerate(verts,blockstart):
+				# skip the first vertex if this is a chained operation
+				# ie: outputting more than one operation
+				# otherwise the machine gets sent back to 0,0 for each operation which is unecessary
+				if i>0 and vi==0:
+					continue 
+				v=vert.co
+				if o.machine_axes!='3':
+					v=v.copy()#we rotate it so we need to copy the vector
+					r=Euler(rots[vi].co)
+					#conversion to N-axis coordinates
+					# this seems to work correctly for 4 axis.
+					rcompensate=r.copy()
+					rcompensate.x=-r.x
+					rcompensate.y=-r.y
+					rcompensate.z=-r.z
+					v.rotate(rcompensate)
 				
-				if r.x==lastrot.x: 
-					ra=None;
-					#print(r.x,lastrot.x)
-				else:	
+					if r.x==lastrot.x: 
+						ra=None;
+						#print(r.x,lastrot.x)
+					else:	
 					
-					ra=r.x*rotcorr
-					#print(ra,'RA')
-				#ra=r.x*rotcorr
-				if r.y==lastrot.y: rb=None;
-				else:	rb=r.y*rotcorr
-				#rb=r.y*rotcorr
-				#print (	ra,rb)
+						ra=r.x*rotcorr
+						#print(ra,'RA')
+					#ra=r.x*rotcorr
+					if r.y==lastrot.y: rb=None;
+					else:	rb=r.y*rotcorr
+					#rb=r.y*rotcorr
+					#print (	ra,rb)
 				
 				
 				
-			if vi>0 and v.x==last.x: vx=None; 
-			else:	vx=v.x*unitcorr
-			if vi>0 and v.y==last.y: vy=None; 
-			else:	vy=v.y*unitcorr
-			if vi>0 and v.z==last.z: vz=None; 
-			else:	vz=v.z*unitcorr
+				if vi>0 and v.x==last.x: vx=None; 
+				else:	vx=v.x*unitcorr
+				if vi>0 and v.y==last.y: vy=None; 
+				else:	vy=v.y*unitcorr
+				if vi>0 and v.z==last.z: vz=None; 
+				else:	vz=v.z*unitcorr
 			
 			
-			if fadjust:
-				fadjustval = shapek.data[vi].co.z / scale_graph
+				if fadjust:
+					fadjustval = shapek.data[vi].co.z / scale_graph
 				
 				
 			
-			#v=(v.x*unitcorr,v.y*unitcorr,v.z*unitcorr)
-			vect=v-last
-			l=vect.length
-			if vi>0	 and l>0 and downvector.angle(vect)<plungelimit:
-				#print('plunge')
-				#print(vect)
-				if f!=plungefeedrate or (fadjust and fadjustval!=1):
-					f=plungefeedrate * fadjustval
-					c.feedrate(f)
+				#v=(v.x*unitcorr,v.y*unitcorr,v.z*unitcorr)
+				vect=v-last
+				l=vect.length
+				if vi>0	 and l>0 and downvector.angle(vect)<plungelimit:
+					#print('plunge')
+					#print(vect)
+					if f!=plungefeedrate or (fadjust and fadjustval!=1):
+						f=plungefeedrate * fadjustval
+						c.feedrate(f)
 					
-				if o.machine_axes=='3':
-					c.feed( x=vx, y=vy, z=vz )
-				else:
+					if o.machine_axes=='3':
+						c.feed( x=vx, y=vy, z=vz )
+					else:
 					
-					#print('plungef',ra,rb)
-					c.feed( x=vx, y=vy, z=vz ,a = ra, b = rb)
+						#print('plungef',ra,rb)
+						c.feed( x=vx, y=vy, z=vz ,a = ra, b = rb)
 					
-			elif v.z>=free_movement_height or vi==0:#v.z==last.z==free_movement_height or vi==0
+				elif v.z>=free_movement_height or vi==0:#v.z==last.z==free_movement_height or vi==0
 			
-				if f!=freefeedrate:
-					f=freefeedrate
-					c.feedrate(f)
+					if f!=freefeedrate:
+						f=freefeedrate
+						c.feedrate(f)
 					
-				if o.machine_axes=='3':
-					c.rapid( x = vx , y = vy , z = vz )
-				else:
-					#print('rapidf',ra,rb)
-					c.rapid(x=vx, y=vy, z = vz, a = ra, b = rb)
-				#gcommand='{RAPID}'
+					if o.machine_axes=='3':
+						c.rapid( x = vx , y = vy , z = vz )
+					else:
+						#print('rapidf',ra,rb)
+						c.rapid(x=vx, y=vy, z = vz, a = ra, b = rb)
+					#gcommand='{RAPID}'
 				
-			else:
+				else:
 				
-				if f!=millfeedrate or (fadjust and fadjustval!=1):
-					f=millfeedrate * fadjustval
-					c.feedrate(f)
+					if f!=millfeedrate or (fadjust and fadjustval!=1):
+						f=millfeedrate * fadjustval
+						c.feedrate(f)
 					
-				if o.machine_axes=='3':
-					c.feed(x=vx,y=vy,z=vz)
-				else:
-					#print('normalf',ra,rb)
-					c.feed( x=vx, y=vy, z=vz ,a = ra, b = rb)
+					if o.machine_axes=='3':
+						c.feed(x=vx,y=vy,z=vz)
+					else:
+						#print('normalf',ra,rb)
+						c.feed( x=vx, y=vy, z=vz ,a = ra, b = rb)
 
 			
-			duration+=vect.length/f
-			#print(duration)
-			last=v
-			if o.machine_axes!='3':
-				lastrot=r
+				duration+=vect.length/f
+				#print(duration)
+				last=v
+				if o.machine_axes!='3':
+					lastrot=r
 				
-			processedops+=1
-			if split and processedops>m.split_limit:
-				c.rapid(x=last.x*unitcorr,y=last.y*unitcorr,z=free_movement_height*unitcorr)
-				#@v=(ch.points[-1][0],ch.points[-1][1],free_movement_height)
-				findex+=1
-				c.file_close()
-				c=startNewFile()
-				c.flush_nc()
-				c.comment('Tool change - D = %s type %s flutes %s' % ( strInUnits(o.cutter_diameter,4),o.cutter_type, o.cutter_flutes))
-				c.tool_change(o.cutter_id)
-				c.spindle(o.spindle_rpm,spdir_clockwise)
-				c.write_spindle()
-				c.flush_nc()
-
-				if m.spindle_start_time>0:
-					c.dwell(m.spindle_start_time)
+				processedops+=1
+				if split and processedops>m.split_limit:
+					c.rapid(x=last.x*unitcorr,y=last.y*unitcorr,z=free_movement_height*unitcorr)
+					#@v=(ch.points[-1][0],ch.points[-1][1],free_movement_height)
+					findex+=1
+					c.file_close()
+					totlines+=c.lines
+					c=startNewFile()
 					c.flush_nc()
+					c.comment('Tool change - D = %s type %s flutes %s' % ( strInUnits(o.cutter_diameter,4),o.cutter_type, o.cutter_flutes))
+					c.tool_change(o.cutter_id)
+					c.spindle(o.spindle_rpm,spdir_clockwise)
+					c.write_spindle()
+					c.flush_nc()
+
+					if m.spindle_start_time>0:
+						c.dwell(m.spindle_start_time)
+						c.flush_nc()
 				
-				c.feedrate(unitcorr*o.feedrate)
-				c.rapid(x=last.x*unitcorr,y=last.y*unitcorr,z=free_movement_height*unitcorr)
-				c.rapid(x=last.x*unitcorr,y=last.y*unitcorr,z=last.z*unitcorr)
-				processedops=0
+					c.feedrate(unitcorr*o.feedrate)
+					c.rapid(x=last.x*unitcorr,y=last.y*unitcorr,z=free_movement_height*unitcorr)
+					c.rapid(x=last.x*unitcorr,y=last.y*unitcorr,z=last.z*unitcorr)
+					processedops=0
 				
 				
 		
@@ -1378,7 +1459,58 @@ def exportGcodePath(filename,vertslist,operations):
 	
 	c.program_end()
 	c.file_close()
-	print(time.time()-t)
+	totlines+=c.lines
+	t=time.time()-t
+	print('%i lines of gcode exported in %f seconds, %i lines/s' % (totlines,t,int(totlines/max(t,0.001))))
+
+#modal state of read gcode files, a file that is still being written is read only from where it ended last time
+gcode_read_cache={}
+
+def readGcodePath(filename):
+	'''reads a gcode file back, returns toolpath points in blender units as numpy array, with arcs split to segments'''
+	t=time.time()
+	moves=fast_read.read(filename,modal_cache=gcode_read_cache)
+	co,types=fast_read.polyline(moves)
+	print('%i gcode moves read in %f seconds' % (len(moves),time.time()-t))
+	return co/1000.0 #gcode is read in mm
+
+def gcodeBackplot(filename):
+	'''shows the toolpath of a gcode file as a mesh object'''
+	s=bpy.context.scene
+	co=readGcodePath(filename)
+	oname='gcode_'+os.path.basename(filename)
+	
+	mesh = bpy.data.meshes.new(oname)
+	mesh.vertices.add(len(co))
+	mesh.vertices.foreach_set('co',co.astype(numpy.float32).ravel())
+	if len(co)>1:
+		mesh.edges.add(len(co)-1)
+		edges=numpy.arange(len(co)-1,dtype=numpy.int32)
+		mesh.edges.foreach_set('vertices',numpy.column_stack((edges,edges+1)).ravel())
+	mesh.update()
+	
+	if oname in s.objects:
+		s.objects[oname].data=mesh
+		ob=s.objects[oname]
+	else: 
+		ob=object_utils.object_data_add(bpy.context, mesh, operator=None)
+		ob=ob.object
+	ob.location=(0,0,0)
+	return ob
+
+def doGcodeSimulation(filename,o):
+	'''simulates stock removal of a gcode file, with cutter and simulation settings of operation o'''
+	getOperationSources(o)
+	limits = getBoundsMultiple([o])
+	co=readGcodePath(filename)
+	i=image_utils.generatePathSimulationImage(co,o,limits)
+	name=os.path.basename(filename)
+	cp=getCachePath(o)[:-len(o.name)]+name
+	iname=cp+'_sim.exr'
+	
+	numpysave(i,iname)
+	i=bpy.data.images.load(iname)
+	createSimulationObject(name,[o],i)
 
 def curveToShapely(cob, use_modifiers = False):
 	chunks=curveToChunks(cob, use_modifiers)
@@ -1528,6 +1660,125 @@ def getClosest(o,pos,chunks):
 				mind=d
 	return ch
 	
+class chunksGrid:
+	'''spatial index over points of chunks for sortChunks.
+	A chunk is inserted only when it can be milled (all its children are sorted),
+	and getClosest returns the same chunk as the linear getClosest() above,
+	including ties, which go to the chunk that comes first in the list.'''
+	def __init__(self,chunks,o):
+		self.o=o
+		self.chunks=chunks
+		self.index={}#chunk id -> position in the original chunks list
+		self.remaining=len(chunks)#chunks not taken out yet
+		self.taken=[]#chunk was taken out of the list
+		self.alive=[]#chunk is in the grid and not sorted yet
+		self.unsorted=[]#number of unsorted children of each chunk
+		self.counted=[]#chunk was unsorted at start, so it is counted in unsorted of its parents
+		self.cells={}#(ix,iy) -> list of (x,y,chunk index)
+		
+		pts=[]
+		for i,ch in enumerate(chunks):
+			self.index[id(ch)]=i
+			pts.extend(self.chunkPoints(ch))
+		if len(pts)>0:
+			xs=[p[0] for p in pts]
+			ys=[p[1] for p in pts]
+			self.minx,self.miny=min(xs),min(ys)
+			maxx,maxy=max(xs),max(ys)
+			w,h=maxx-self.minx,maxy-self.miny
+			#roughly 2 points per cell
+			if w>0 and h>0:
+				self.cellsize=math.sqrt(2*w*h/len(pts))
+			else:
+				self.cellsize=2*max(w,h)/len(pts)
+			if self.cellsize<=0:
+				self.cellsize=1
+			self.nx=int(w/self.cellsize)+1
+			self.ny=int(h/self.cellsize)+1
+		else:
+			self.minx=self.miny=0
+			self.cellsize=1
+			self.nx=self.ny=1
+		
+		for i,ch in enumerate(chunks):
+			self.alive.append(False)
+			self.taken.append(False)
+			self.counted.append(ch.sorted==False)
+			self.unsorted.append(len([child for child in ch.children if child.sorted==False]))
+		for i,ch in enumerate(chunks):
+			if self.unsorted[i]==0:
+				self.insert(i)
+	
+	def chunkPoints(self,ch):
+		#the points used by chunk.dist()
+		if len(ch.points)==0:
+			return []
+		if ch.closed:
+			return ch.points
+		if self.o.movement_type=='MEANDER':
+			return [ch.points[0],ch.points[-1]]
+		return [ch.points[0]]
+		
+	def cell(self,x,y):
+		return (int(math.floor((x-self.minx)/self.cellsize)),int(math.floor((y-self.miny)/self.cellsize)))
+		
+	def insert(self,i):
+		self.alive[i]=True
+		for p in self.chunkPoints(self.chunks[i]):
+			self.cells.setdefault(self.cell(p[0],p[1]),[]).append((p[0],p[1],i))
+	
+	def remove(self,ch):
+		'''call when ch is taken out of the list, after its sorted flag was set'''
+		i=self.index.get(id(ch))
+		if i is None or self.taken[i]:
+			return
+		self.taken[i]=True
+		self.remaining-=1
+		self.alive[i]=False
+		for parent in ch.parents:
+			j=self.index.get(id(parent))
+			if j is not None and self.counted[i] and self.unsorted[j]>0:
+				self.unsorted[j]-=1
+				if self.unsorted[j]==0 and not self.alive[j] and not self.taken[j]:
+					self.insert(j)
+	
+	def getClosest(self,pos):
+		cx,cy=self.cell(pos[0],pos[1])
+		#search rings of cells around pos, until no closer point can be found
+		maxr=max(abs(cx),abs(cx-self.nx+1),abs(cy),abs(cy-self.ny+1))
+		mind=10000#same limit as in getClosest()
+		mini=-1
+		r=0
+		while r<=maxr:
+			for ix in range(cx-r,cx+r+1):
+				if r==0 or ix==cx-r or ix==cx+r:
+					iys=range(cy-r,cy+r+1)
+				else:
+					iys=(cy-r,cy+r)
+				for iy in iys:
+					cell=self.cells.get((ix,iy))
+					if cell is None:
+						continue
+					alivecell=[]
+					for p in cell:
+						i=p[2]
+						if not self.alive[i]:
+							continue
+						alivecell.append(p)
+						d=dist2d(pos,p)
+						if d<mind or (d==mind and i<mini):
+							mind=d
+							mini=i
+					if len(alivecell)<len(cell):
+						self.cells[(ix,iy)]=alivecell
+			#points in further rings are at least r cells away
+			if r*self.cellsize>mind:
+				break
+			r+=1
+		if mini<0:
+			return None
+		return self.chunks[mini]
+	
 def sortChunks(chunks,o):
 	if o.strategy!='WATERLINE':
 		progress('sorting paths')
@@ -1538,14 +1789,15 @@ def sortChunks(chunks,o):
 	lastch=None
 	i=len(chunks)
 	pos=(0,0,0)
+	grid=chunksGrid(chunks,o)
 	#for ch in chunks:
 	#	ch.getNext()#this stores the unsortedchildren properties
 	#print('numofchunks')
 	#print(len(chunks))
-	while len(chunks)>0:
+	while grid.remaining>0:
 		ch=None
 		if len(sortedchunks)==0 or len(lastch.parents)==0:#first chunk or when there are no parents -> parents come after children here...
-			ch = getClosest(o,pos,chunks)
+			ch = grid.getClosest(pos)
 		elif len(lastch.parents)>0:# looks in parents for next candidate, recursively
 			#get siblings here
 			#siblings=[]
@@ -1559,7 +1811,7 @@ def sortChunks(chunks,o):
 				if ch!=None:
 					break
 			if ch==None:
-				ch = getClosest(o,pos,chunks)
+				ch = grid.getClosest(pos)
 			#	break
 			#pass;
 		if ch is not None:#found next chunk, append it to list
@@ -1568,7 +1820,7 @@ def sortChunks(chunks,o):
 				ch.adaptdist(pos, o)
 				ch.sorted = True
 			#print(len(ch.parents),'children')
-			chunks.remove(ch)
+			grid.remove(ch)#instead of chunks.remove(ch), which is a linear search again
 			sortedchunks.append(ch)
 			lastch = ch
 			pos = lastch.points[-1]
@@ -1588,7 +1840,7 @@ def sortChunks(chunks,o):
 			
 		i -= 1
 		
-	
+	del chunks[:]#all chunks were moved to sortedchunks
 	sys.setrecursionlimit(1000)
 	if o.strategy!='DRILL' and o.strategy != 'OUTLINEFILL': #THIS SHOULD AVOID ACTUALLY MOST STRATEGIES, THIS SHOULD BE DONE MANUALLY, BECAUSE SOME STRATEGIES GET SORTED TWICE.
 		sortedchunks = connectChunksLow(sortedchunks,o)
@@ -2852,6 +3104,74 @@ def strategy_medial_axis( o ):
 	
 #this is the main function.
 #FIXME: split strategies into separate file!
+def getSampledChunks3axis(o):
+	'''path pattern of the sampling 3 axis strategies, sampled on the model'''
+	if o.strategy=='CARVE':
+		pathSamples=[]
+		#for ob in o.objects:
+		ob=bpy.data.objects[o.curve_object]
+		pathSamples.extend(curveToChunks(ob))
+		pathSamples=sortChunks(pathSamples,o)#sort before sampling
+		pathSamples=chunksRefine(pathSamples,o)
+	elif o.strategy=='PENCIL':
+		prepareArea(o)
+		getAmbient(o)
+		pathSamples=getOffsetImageCavities(o,o.offset_image)
+		#for ch in pathSamples:
+		#	for i,p in enumerate(ch.points):
+		#	 ch.points[i]=(p[0],p[1],0)
+		pathSamples=limitChunks(pathSamples,o)
+		pathSamples=sortChunks(pathSamples,o)#sort before sampling
+	elif o.strategy=='CRAZY':
+		prepareArea(o)
+		
+		#pathSamples = crazyStrokeImage(o)
+		#####this kind of worked and should work:
+		millarea=o.zbuffer_image<o.minz+0.000001
+		avoidarea = o.offset_image>o.minz+0.000001
+		
+		pathSamples = crazyStrokeImageBinary(o,millarea,avoidarea)
+		#####
+		pathSamples=sortChunks(pathSamples,o)
+		pathSamples=chunksRefine(pathSamples,o)
+		
+	else: 
+		if o.strategy=='OUTLINEFILL':
+			getOperationSilhouete(o)
+		pathSamples=getPathPattern(o)
+		if o.strategy=='OUTLINEFILL':
+			pathSamples = sortChunks(pathSamples,o)#have to be sorted once before, because of the parenting inside of samplechunks
+		#chunksToMesh(pathSamples,o)#for testing pattern script
+		#return
+		if o.strategy in ['BLOCK', 'SPIRAL', 'CIRCLES']:
+			pathSamples=connectChunksLow(pathSamples,o)
+	
+	#print (minz)
+	
+	
+	chunks=[]
+	layers = getLayers(o, o.maxz, o.min.z)		
+	
+	chunks.extend(sampleChunks(o,pathSamples,layers))
+	if (o.strategy=='PENCIL'):# and bpy.app.debug_value==-3:
+		chunks=chunksCoherency(chunks)
+		print('coherency check')
+	return chunks
+
+def getSortedChunks3axis(o,samplekey):
+	'''sampled and sorted chunks, sampled chunks are taken from the cache if their inputs didn't change'''
+	chunks=loadCachedStage(o,samplekey)
+	if chunks==None:
+		chunks=getSampledChunks3axis(o)
+		saveCachedStage(o,samplekey,chunks)
+		
+	if o.strategy in ['PARALLEL', 'CROSS', 'PENCIL', 'OUTLINEFILL']:# and not o.parallel_step_back:
+		print('sorting')
+		chunks=sortChunks(chunks,o)
+		if o.strategy == 'OUTLINEFILL':
+			chunks = connectChunksLow(chunks,o)
+	return chunks
+
 def getPath3axis(context, operation):
 	s=bpy.context.scene
 	o=operation
@@ -2872,63 +3192,14 @@ def getPath3axis(context, operation):
 	
 		
 	elif o.strategy in ['PARALLEL', 'CROSS', 'BLOCK', 'SPIRAL', 'CIRCLES', 'OUTLINEFILL', 'CARVE', 'PENCIL', 'CRAZY']:
+		#sampled and sorted chunks are cached by hash of their inputs
+		samplekey=getCacheKey('sampled chunks',o.geometry_key,getOperationKey(o,CACHE_SORT_PROPS))
+		sortkey=getCacheKey('sorted chunks',samplekey,[getattr(o,pname) for pname in CACHE_SORT_PROPS])
+		chunks=loadCachedStage(o,sortkey)
+		if chunks==None:
+			chunks=getSortedChunks3axis(o,samplekey)
+			saveCachedStage(o,sortkey,chunks)
 		
-		if o.strategy=='CARVE':
-			pathSamples=[]
-			#for ob in o.objects:
-			ob=bpy.data.objects[o.curve_object]
-			pathSamples.extend(curveToChunks(ob))
-			pathSamples=sortChunks(pathSamples,o)#sort before sampling
-			pathSamples=chunksRefine(pathSamples,o)
-		elif o.strategy=='PENCIL':
-			prepareArea(o)
-			getAmbient(o)
-			pathSamples=getOffsetImageCavities(o,o.offset_image)
-			#for ch in pathSamples:
-			#	for i,p in enumerate(ch.points):
-			#	 ch.points[i]=(p[0],p[1],0)
-			pathSamples=limitChunks(pathSamples,o)
-			pathSamples=sortChunks(pathSamples,o)#sort before sampling
-		elif o.strategy=='CRAZY':
-			prepareArea(o)
-			
-			#pathSamples = crazyStrokeImage(o)
-			#####this kind of worked and should work:
-			millarea=o.zbuffer_image<o.minz+0.000001
-			avoidarea = o.offset_image>o.minz+0.000001
-			
-			pathSamples = crazyStrokeImageBinary(o,millarea,avoidarea)
-			#####
-			pathSamples=sortChunks(pathSamples,o)
-			pathSamples=chunksRefine(pathSamples,o)
-			
-		else: 
-			if o.strategy=='OUTLINEFILL':
-				getOperationSilhouete(o)
-			pathSamples=getPathPattern(o)
-			if o.strategy=='OUTLINEFILL':
-				pathSamples = sortChunks(pathSamples,o)#have to be sorted once before, because of the parenting inside of samplechunks
-			#chunksToMesh(pathSamples,o)#for testing pattern script
-			#return
-			if o.strategy in ['BLOCK', 'SPIRAL', 'CIRCLES']:
-				pathSamples=connectChunksLow(pathSamples,o)
-		
-		#print (minz)
-		
-		
-		chunks=[]
-		layers = getLayers(o, o.maxz, o.min.z)		
-		
-		chunks.extend(sampleChunks(o,pathSamples,layers))
-		if (o.strategy=='PENCIL'):# and bpy.app.debug_value==-3:
-			chunks=chunksCoherency(chunks)
-			print('coherency check')
-			
-		if o.strategy in ['PARALLEL', 'CROSS', 'PENCIL', 'OUTLINEFILL']:# and not o.parallel_step_back:
-			print('sorting')
-			chunks=sortChunks(chunks,o)
-			if o.strategy == 'OUTLINEFILL':
-				chunks = connectChunksLow(chunks,o)
 		if o.ramp:
 			for ch in chunks:
 				ch.rampZigZag(ch.zstart, ch.points[0][2],o)
@@ -3346,6 +3617,7 @@ def getPath(context,operation):#should do all path calculations.
 	
 
 	getOperationSources(operation)
+	operation.geometry_key=getGeometryKey(operation)
 
 	operation.warnings=''
 	checkMemoryLimit(operation)
@@ -34,6 +34,9 @@ import sys
 import time
 import datetime
 import shutil
+import itertools
+
+import numpy
 
 import bpy
 import bmesh
@@ -43,6 +46,10 @@ from bpy.types import Operator
 from bpy.props import StringProperty, BoolProperty, FloatProperty, IntProperty
 
 
+# size of blocks the importer reads at once, memory needed for parsing does not grow with file size
+FAST_OBJ_CHUNK_SIZE = 64 * 1024 * 1024
+
+
 def log(msg="", indent=0, prefix="> "):
     m = "{}{}{}".format("    " * indent, prefix, msg, )
     print(m)
@@ -377,144 +384,182 @@ class FastOBJReader():
             obj.select = True
             sc.objects.active = obj
         
-        log("reading..", 1)
-        ls = None
-        with open(path, mode='r', encoding='utf-8') as f:
-            ls = f.readlines()
-        
-        def v(l):
-            a = l.split()[1:]
-            return tuple(map(float, a))
-        
-        def vt(l):
-            a = l.split()[1:]
-            return tuple(map(float, a))
-        
-        def f(l):
-            a = l.split()[1:]
-            ls = map(int, a)
-            return tuple([i - 1 for i in ls])
-        
-        def fn(l):
-            a = l.split()[1:]
-            ls = [i.split('/') for i in a]
-            f = []
-            for i, p in enumerate(ls):
-                f.append(int(p[0]) - 1)
-            return f
-        
-        def ftn(l):
-            a = l.split()[1:]
-            ls = [i.split('/') for i in a]
-            f = []
-            t = []
-            for i, p in enumerate(ls):
-                f.append(int(p[0]) - 1)
-                t.append(int(p[1]) - 1)
-            return f, t
-        
-        def vc_mrgb(l):
-            r = []
-            m = []
-            l = l[6:]
-            l = l.strip()
-            for i in range(0, len(l), 8):
-                v = l[i:i + 8]
-                c = (int(v[2:4], 16) / 255, int(v[4:6], 16) / 255, int(v[6:8], 16) / 255)
-                r.append(c)
-                m.append(int(v[0:2], 16) / 255)
-            return r, m
-        
-        def v_vc_ext(l):
-            a = l.split()[1:]
-            return tuple(map(float, a))
+        def floats(ls, skip, ):
+            # parse block of lines with the same number of values at once, skip is length of line prefix
+            if(len(ls) == 0):
+                return None
+            n = len(ls[0].split()) - 1
+            a = numpy.fromstring(b' '.join([l[skip:] for l in ls]), dtype=numpy.float64, sep=' ', )
+            if(n > 0 and len(a) == n * len(ls)):
+                return a.reshape(-1, n)
+            # lines with different number of values (e.g. v x y z and v x y z w), parse them one by one
+            rows = [l.split()[1:] for l in ls]
+            n = max(map(len, rows))
+            if(min(map(len, rows)) < 1):
+                raise ValueError("lines starting with {} without values".format(ls[0][:skip].strip().decode()))
+            a = numpy.zeros((len(ls), n), dtype=numpy.float64, )
+            for i, r in enumerate(rows):
+                a[i, :len(r)] = [float(v) for v in r]
+            return a
+        
+        def faces(ls, ):
+            # returns vertex indices, texture vertex indices (or None) and number of vertices of each face
+            bodies = [l.split()[1:] for l in ls]
+            counts = numpy.fromiter(map(len, bodies), dtype=numpy.int32, count=len(bodies), )
+            tokens = b' '.join(itertools.chain.from_iterable(bodies))
+            n = 1
+            if(face_format == 'fn'):
+                tokens = tokens.replace(b'//', b' ')
+                n = 2
+            elif(face_format == 'ftn'):
+                n = bodies[0][0].count(b'/') + 1
+                tokens = tokens.replace(b'/', b' ')
+            a = numpy.fromstring(tokens, dtype=numpy.int64, sep=' ', )
+            if(len(a) != counts.sum() * n):
+                raise ValueError("faces with mixed index formats are not supported")
+            a = a.reshape(-1, n) - 1
+            if(face_format == 'ftn'):
+                return a[:, 0].astype(numpy.int32), a[:, 1].astype(numpy.int32), counts
+            return a[:, 0].astype(numpy.int32), None, counts
+        
+        def mrgb(ls, ):
+            # each value is 8 hex digits: mask, red, green, blue
+            h = b''.join([l[6:].strip() for l in ls]).decode('ascii')
+            a = numpy.frombuffer(bytes.fromhex(h), dtype=numpy.uint8, ).reshape(-1, 4)
+            return a[:, 1:] / 255, a[:, 0] / 255
+        
+        def chunks(f, size, ):
+            # yield lists of complete lines, reading file in large blocks
+            rest = b''
+            while(True):
+                b = f.read(size)
+                if(not b):
+                    break
+                b = rest + b
+                i = b.rfind(b'\n')
+                if(i == -1):
+                    rest = b
+                    continue
+                rest = b[i + 1:]
+                yield b[:i].split(b'\n')
+            if(rest):
+                yield rest.split(b'\n')
         
         groups = {}
         verts = []
         tverts = []
-        faces = []
-        tfaces = []
+        faces_verts = []
+        faces_tverts = []
+        faces_counts = []
         vcols = []
         shading = []
-        shading_flag = None
+        shading_flag = False
         mask = []
         
-        log("parsing..", 1)
-        parsef = None
-        has_uv = None
+        log("reading and parsing..", 1)
+        face_format = None
         cg = None
         
-        for l in ls:
-            if(l.startswith('s ')):
-                if(with_shading):
-                    if(l.lower() == 's off' or l.lower() == 's 0'):
-                        shading_flag = False
-                    else:
-                        shading_flag = True
-            elif(l.startswith('g ')):
-                if(with_polygroups):
-                    g = l[2:]
-                    g = g.strip()
-                    if(g not in groups):
-                        groups[g] = []
-                    cg = g
-            elif(l.startswith('v ')):
-                if(with_vertex_colors and use_vcols_ext):
-                    a = v_vc_ext(l)
-                    verts.append(a[:3])
-                    vcols.append(a[3:])
-                else:
-                    verts.append(v(l))
-            elif(l.startswith('vt ')):
-                if(with_uv):
-                    tverts.append(vt(l))
-            elif(l.startswith('f ')):
-                if(parsef is None):
-                    if('//' in l):
-                        parsef = fn
-                    elif('/' not in l):
-                        parsef = f
-                    else:
-                        parsef = ftn
-                        has_uv = True
-                if(has_uv):
-                    a, b = parsef(l)
-                else:
-                    a = parsef(l)
-                faces.append(a)
-                if(with_shading):
-                    shading.append(shading_flag)
-                if(has_uv):
+        size = os.path.getsize(path)
+        wm = bpy.context.window_manager
+        wm.progress_begin(0, 100)
+        with open(path, mode='rb') as f:
+            for ls in chunks(f, FAST_OBJ_CHUNK_SIZE):
+                # split lines into parts between shading and group lines, faces in each part share the same state
+                marks = [i for i, l in enumerate(ls) if l[:2] == b's ' or l[:2] == b'g ']
+                marks.append(len(ls))
+                p = 0
+                for i in marks:
+                    part = ls[p:i]
+                    p = i + 1
+                    
+                    vs = floats([l for l in part if l[:2] == b'v '], 2, )
+                    if(vs is not None):
+                        if(with_vertex_colors and use_vcols_ext):
+                            vcols.append(vs[:, 3:6].astype(numpy.float32))
+                        verts.append(vs[:, :3].astype(numpy.float32))
+                    
                     if(with_uv):
-                        tfaces.append(b)
-                if(with_polygroups):
-                    if(cg is not None):
-                        groups[cg].extend(a)
-            elif(l.startswith('#MRGB ')):
-                if(with_vertex_colors):
-                    if(use_vcols_mrgb):
-                        c, m = vc_mrgb(l)
-                        vcols.extend(c)
-                        if(use_mask_as_vertex_group):
-                            mask.extend(m)
-            else:
-                pass
+                        vts = floats([l for l in part if l[:3] == b'vt '], 3, )
+                        if(vts is not None):
+                            tverts.append(vts[:, :2].astype(numpy.float32))
+                    
+                    fs = [l for l in part if l[:2] == b'f ']
+                    if(len(fs) > 0):
+                        if(face_format is None):
+                            if(b'//' in fs[0]):
+                                face_format = 'fn'
+                            elif(b'/' not in fs[0]):
+                                face_format = 'f'
+                            else:
+                                face_format = 'ftn'
+                        a, b, c = faces(fs)
+                        faces_verts.append(a)
+                        faces_counts.append(c)
+                        if(with_shading):
+                            shading.append(numpy.full(len(c), shading_flag, dtype=bool, ))
+                        if(b is not None and with_uv):
+                            faces_tverts.append(b)
+                        if(with_polygroups and cg is not None):
+                            groups[cg].append(a)
+                    
+                    if(with_vertex_colors and use_vcols_mrgb):
+                        ms = [l for l in part if l[:6] == b'#MRGB ']
+                        if(len(ms) > 0):
+                            c, m = mrgb(ms)
+                            vcols.append(c.astype(numpy.float32))
+                            if(use_mask_as_vertex_group):
+                                mask.append(m.astype(numpy.float32))
+                    
+                    if(i == len(ls)):
+                        break
+                    l = ls[i]
+                    if(l[:2] == b's '):
+                        if(with_shading):
+                            s = l[2:].strip().lower()
+                            shading_flag = not (s == b'off' or s == b'0')
+                    elif(with_polygroups):
+                        cg = l[2:].strip().decode('utf-8')
+                        if(cg not in groups):
+                            groups[cg] = []
+                
+                pc = 100 * f.tell() / size if size else 100
+                wm.progress_update(pc)
+                log("{:.0f}%".format(pc), 2)
+        wm.progress_end()
+        
+        def concat(a, dtype, shape, ):
+            if(len(a) == 0):
+                return numpy.zeros(shape, dtype=dtype, )
+            return numpy.concatenate(a)
+        
+        verts = concat(verts, numpy.float32, (0, 3), )
+        tverts = concat(tverts, numpy.float32, (0, 2), )
+        faces_verts = concat(faces_verts, numpy.int32, 0, )
+        faces_tverts = concat(faces_tverts, numpy.int32, 0, )
+        faces_counts = concat(faces_counts, numpy.int32, 0, )
+        vcols = concat(vcols, numpy.float32, (0, 3), )
+        shading = concat(shading, bool, 0, )
+        mask = concat(mask, numpy.float32, 0, )
         
         log("making mesh..", 1)
         me = bpy.data.meshes.new(name)
-        me.from_pydata(verts, [], faces)
+        me.vertices.add(len(verts))
+        me.vertices.foreach_set("co", verts.ravel())
+        me.loops.add(len(faces_verts))
+        me.loops.foreach_set("vertex_index", faces_verts)
+        me.polygons.add(len(faces_counts))
+        loop_start = numpy.zeros(len(faces_counts), dtype=numpy.int32)
+        numpy.cumsum(faces_counts[:-1], out=loop_start[1:])
+        me.polygons.foreach_set("loop_start", loop_start)
+        me.polygons.foreach_set("loop_total", faces_counts)
+        me.update(calc_edges=True)
         
         log("{} {}".format("{}: ".format("with_uv").ljust(log_args_align, "."), with_uv), 1)
-        if(len(tverts) > 0):
+        if(len(tverts) > 0 and len(faces_tverts) > 0):
             log("making uv map..", 1)
             me.uv_textures.new("UVMap")
-            loops = me.uv_layers[0].data
-            i = 0
-            for j in range(len(tfaces)):
-                f = tfaces[j]
-                for k in range(len(f)):
-                    loops[i + k].uv = tverts[f[k]]
-                i += (k + 1)
+            me.uv_layers[0].data.foreach_set("uv", tverts[faces_tverts].ravel())
         
         log("{} {}".format("{}: ".format("with_vertex_colors").ljust(log_args_align, "."), with_vertex_colors), 1)
         log("{} {}".format("{}: ".format("use_vcols_mrgb").ljust(log_args_align, "."), use_vcols_mrgb), 1)
@@ -524,9 +569,7 @@ class FastOBJReader():
             log("making vertex colors..", 1)
             me.vertex_colors.new()
             vc = me.vertex_colors.active
-            vcd = vc.data
-            for l in me.loops:
-                vcd[l.index].color = vcols[l.vertex_index]
+            vc.data.foreach_set("color", vcols[faces_verts].ravel())
         
         log("{} {}".format("{}: ".format("convert_axes").ljust(log_args_align, "."), convert_axes), 1)
         log("{} {}".format("{}: ".format("apply_conversion").ljust(log_args_align, "."), apply_conversion), 1)
@@ -548,11 +591,10 @@ class FastOBJReader():
         if(len(mask) > 0):
             log("making mask vertex group..", 1)
             g = self.object.vertex_groups.new("mask")
-            indexes = [i for i in range(len(me.vertices))]
-            g.add(indexes, 0.0, 'REPLACE')
-            ind = g.index
-            for i, v in enumerate(me.vertices):
-                v.groups[ind].weight = mask[i]
+            # mask has at most 256 distinct values, add vertices with the same weight together
+            values, inverse = numpy.unique(mask, return_inverse=True, )
+            for i, w in enumerate(values):
+                g.add(numpy.flatnonzero(inverse == i).tolist(), float(w), 'REPLACE')
         
         if(convert_axes):
             if(not apply_conversion):
@@ -564,8 +606,7 @@ class FastOBJReader():
         log("{} {}".format("{}: ".format("with_shading").ljust(log_args_align, "."), with_shading), 1)
         if(with_shading):
             log("setting shading..", 1)
-            for i, p in enumerate(me.polygons):
-                p.use_smooth = shading[i]
+            me.polygons.foreach_set("use_smooth", shading)
         
         log("{} {}".format("{}: ".format("with_polygroups").ljust(log_args_align, "."), with_polygroups), 1)
         if(len(groups) > 0):
@@ -575,7 +616,8 @@ class FastOBJReader():
             for k, v in groups.items():
                 o.vertex_groups.new(k)
                 vg = o.vertex_groups[k]
-                vg.add(list(set(v)), 1.0, 'REPLACE')
+                if(len(v) > 0):
+                    vg.add(numpy.unique(numpy.concatenate(v)).tolist(), 1.0, 'REPLACE')
         
         log("imported object: '{}'".format(self.object.name), 1)
         
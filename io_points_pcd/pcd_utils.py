@@ -18,21 +18,20 @@
 
 import bpy
 
-import os
-import subprocess
-import tempfile
+import numpy as np
 
 from . import pcdparser
 
 
 def create_and_link_mesh(name, points):
     """
-    Create a blender mesh and object called name from a list of
-    *points* and link it in the current scene.
+    Create a blender mesh and object called name from an (n, 3) array
+    of *points* and link it in the current scene.
     """
 
     mesh = bpy.data.meshes.new(name)
-    mesh.from_pydata(points, [], [])
+    mesh.vertices.add(len(points))
+    mesh.vertices.foreach_set("co", points.ravel())
 
     # update mesh to allow proper display
     mesh.validate()
@@ -46,33 +45,21 @@ def create_and_link_mesh(name, points):
 
 
 def import_pcd(filepath, name="new_pointcloud"):
-    # check if the file is binary compressed
-    parser = pcdparser.PCDParser.factory(filepath, pcdparser.PointXYZ)
-    parser.onlyParseHeader()
-    is_binary_compressed = parser.datatype == 'BINARY_COMPRESSED'
-
-    # create a temp uncompressed pcd file
-    if (is_binary_compressed):
-        tmpdir = tempfile.TemporaryDirectory()
-        tmpfilepath = tmpdir.name + "blender_pcd_io_tmp.pcd"
-        try:
-            subprocess.call(["pcl_convert_pcd_ascii_binary", filepath, tmpfilepath, "1"])
-        except FileNotFoundError:
-            print("[ERROR] Can't read BINARY COMPRESSED PCD. No pcl_convert_pcd_ascii_binary found! Have you installed libPCL?")
-            return
-        filepath = tmpfilepath
-
-
-    # do actual parsing
     parser = pcdparser.PCDParser.factory(filepath, pcdparser.PointXYZ)
+    if parser is None:
+        print("[ERROR] Can't create parser for this file")
+        return
     parser.parseFile()
-    points = parser.getPoints()
+    data = parser.getData()
+    if data is None:
+        return
 
-    blender_points = []
-    for point in points:
-        blender_points.append((point.x, point.y, point.z))
+    points = np.zeros((len(data), 3), dtype=np.float32)
+    for i, field in enumerate(('x', 'y', 'z')):
+        if field in data.dtype.names:
+            points[:, i] = data[field]
 
-    create_and_link_mesh(name, blender_points)
+    create_and_link_mesh(name, points)
   
 
 def export_pcd(filepath):
@@ -18,7 +18,9 @@
 
 
 import struct
-import io
+import re
+
+import numpy as np
 
 try:
     import lzf
@@ -27,6 +29,21 @@ except:
     GOT_LZF_MODULE=False
 
 
+# (TYPE, SIZE) of a PCD field -> numpy type
+FIELD_TYPES = {
+    ('F', 4): '<f4',
+    ('F', 8): '<f8',
+    ('U', 1): 'u1',
+    ('U', 2): '<u2',
+    ('U', 4): '<u4',
+    ('U', 8): '<u8',
+    ('I', 1): 'i1',
+    ('I', 2): '<i2',
+    ('I', 4): '<i4',
+    ('I', 8): '<i8',
+}
+
+
 
 def dumpHexData(data):
     for byte in data:
@@ -38,6 +55,50 @@ def encodeASCIILine(line):
     return line.decode(encoding='ASCII')
 
 
+def lzfDecompress(data, size):
+    """ Decompress LZF data (as written by pcl) to size bytes """
+    if GOT_LZF_MODULE:
+        return lzf.decompress(bytes(data), size)
+
+    out = bytearray(size)
+    ip = 0
+    op = 0
+    inlen = len(data)
+    while ip < inlen:
+        ctrl = data[ip]
+        ip += 1
+        if ctrl < 32:
+            # literal run of ctrl + 1 bytes
+            length = ctrl + 1
+            out[op:op + length] = data[ip:ip + length]
+            ip += length
+            op += length
+        else:
+            # back reference
+            length = ctrl >> 5
+            if length == 7:
+                length += data[ip]
+                ip += 1
+            length += 2
+            ref = op - ((ctrl & 0x1f) << 8) - data[ip] - 1
+            ip += 1
+            if ref < 0:
+                raise ValueError("Invalid LZF back reference")
+            distance = op - ref
+            if distance >= length:
+                out[op:op + length] = out[ref:ref + length]
+            else:
+                # the reference overlaps the output, repeat the pattern
+                pattern = out[ref:op]
+                repeats = length // distance + 1
+                out[op:op + length] = (pattern * repeats)[:length]
+            op += length
+
+    if op != size:
+        raise ValueError("LZF data decompressed to %d bytes, expected %d" % (op, size))
+    return bytes(out)
+
+
 
 class Point:
 
@@ -111,6 +172,10 @@ class PCDParser:
 
     def parserWarning(self, msg):
         print("[WARNING] ", msg)
+
+
+    def parserError(self, msg):
+        print("[ERROR] ", msg)
     
 
     def rmComment(self, line):
@@ -158,6 +223,10 @@ class PCDParser:
         return self.points
 
 
+    def getData(self):
+        return None
+
+
     def version(self):
         return 'NO_VERSION_NUMBER'
 
@@ -171,6 +240,7 @@ class PCDParser_v0_7(PCDParser):
     def __init__(self, filepath, PointClass):
         super().__init__(filepath, PointClass)
         self.fields = []
+        self.data = None
 
 
     def version(self):
@@ -206,10 +276,8 @@ class PCDParser_v0_7(PCDParser):
 
 
     def parseFIELDS(self, split):
-        print("SPLIT FIELDS:", split)
         for field in split:
-            self.fields.append([field, None, None, None])
-        print("FIELDS, after parsing:", self.fields)
+            self.fields.append([field, None, None, 1])
 
 
     def parseSIZE(self, split):
@@ -251,7 +319,32 @@ class PCDParser_v0_7(PCDParser):
 
     def finalizeHeader(self):
         self.numPoints = self.width * self.height
-        print("FIELDS - finalized", self.fields)
+
+
+    def fieldNames(self):
+        """ Field names that can be used in a structured array,
+            pcl can have several '_' padding fields """
+        names = []
+        for i, field in enumerate(self.fields):
+            name = field[0]
+            if name in names:
+                name = name + "_" + str(i)
+            names.append(name)
+        return names
+
+
+    def dtype(self):
+        """ The numpy dtype of one point """
+        dtype = []
+        for name, field in zip(self.fieldNames(), self.fields):
+            fieldtype = FIELD_TYPES.get((field[2], field[1]))
+            if fieldtype is None:
+                raise ValueError("Unsupported PCD field type %s of size %s" % (field[2], field[1]))
+            if field[3] == 1:
+                dtype.append((name, fieldtype))
+            else:
+                dtype.append((name, fieldtype, (field[3],)))
+        return np.dtype(dtype)
 
 
     def parsePoints(self):
@@ -260,113 +353,83 @@ class PCDParser_v0_7(PCDParser):
         elif self.datatype == 'BINARY':
             self.parseBINARY()
         elif self.datatype == 'BINARY_COMPRESSED':
-            if not GOT_LZF_MODULE:
-                print("[ERROR] No support for BINARY COMPRESSED data format.")
-                return
-            else:
-                self.parseBINARY_COMPRESSED()
+            self.parseBINARY_COMPRESSED()
 
 
     def parseASCII(self):
-        parsedPoints = 0
-        while parsedPoints < self.numPoints:
-           
-            try: 
-                b = self.file.readline()
-                line = encodeASCIILine(b)
-            except:
-                self.parserError("Unexpected end of data")
-                return
-            line = self.rmComment(line)
-            split = line.split()
-
-            if (len(split) == 0):
-                continue
+        body = self.file.read()
+        if b'#' in body:
+            body = re.sub(rb'#[^\n]*', b'', body)
+
+        dtype = self.dtype()
+        numValues = sum(field[3] for field in self.fields)
+        values = np.fromstring(body.decode(encoding='ASCII'), dtype=np.float64, sep=' ')
+        if len(values) < self.numPoints * numValues:
+            self.parserError("Unexpected end of data")
+            return
+        values = values[:self.numPoints * numValues].reshape(self.numPoints, numValues)
+
+        self.data = np.empty(self.numPoints, dtype=dtype)
+        column = 0
+        for name, field in zip(dtype.names, self.fields):
+            count = field[3]
+            if count == 1:
+                self.data[name] = values[:, column]
             else:
-                parsedPoints += 1
+                self.data[name] = values[:, column:column + count]
+            column += count
 
-            point = self.PointClass()
 
-            for field in self.fields:
-                fieldname = field[0]
-                fieldtype = field[2]
-                fieldcount = field[3]
+    def parseBINARY_COMPRESSED(self):
+        """ pcl compresses the points with LZF after reordering them
+            field by field (all x, then all y, ...) """
+        compressed_len, decompressed_len = struct.unpack('<II', self.file.read(8))
+        compressed_body = self.file.read(compressed_len)
+        if len(compressed_body) < compressed_len:
+            self.parserError("Unexpected end of data")
+            return
+        body = lzfDecompress(compressed_body, decompressed_len)
 
-                values = []
-                for i in range(fieldcount):
-                    vs = split.pop(0)
-                    if fieldtype == 'F':
-                        values.append(float(vs))
-                    elif fieldtype in ['U', 'I']:
-                        values.append(int(vs))
+        dtype = self.dtype()
+        self.data = np.empty(self.numPoints, dtype=dtype)
+        offset = 0
+        for name in dtype.names:
+            fieldtype, _ = dtype.fields[name]
+            nbytes = fieldtype.itemsize * self.numPoints
+            column = np.frombuffer(body, dtype=fieldtype.base, count=nbytes // fieldtype.base.itemsize, offset=offset)
+            self.data[name] = column.reshape((self.numPoints,) + fieldtype.shape)
+            offset += nbytes
 
-                point.setField(fieldname, values)
 
-            self.points.append(point)
+    def parseBINARY(self):
+        dtype = self.dtype()
+        data = np.fromfile(self.file, dtype=dtype, count=self.numPoints)
+        if len(data) < self.numPoints:
+            self.parserError("Unexpected end of data")
+            return
+        self.data = data
 
 
-    def parseBINARY_COMPRESSED(self):
-        """ BROKEN!!! - There seem to be uncompatiblities 
-            with pcl LZF and liblzf"""
-        max_size = 1024**3 # 1GB 
-        fs = '<i'
-        compressed_len = struct.unpack('<i', self.file.read(4))[0]
-        decompressed_len = struct.unpack('<i', self.file.read(4))[0]
+    def getData(self):
+        """ Structured array with one column per field """
+        return self.data
 
-        compressed_body = self.file.read(compressed_len)
-        decompressed_body = lzf.decompress(compressed_body, max_size)
-
-        fobj = io.BytesIO(decompressed_body)
-        self.parseBINARY(fobj)
-
-
-
-    def parseBINARY(self, infile=""):
-        
-        if infile == "":
-            infile = self.file
-
-        for pointi in range(self.numPoints):
-            point = self.PointClass()
-
-            for field in self.fields:
-                fieldname = field[0]
-                fieldsize = field[1]
-                fieldtype = field[2]
-                fieldcount = field[3]
-
-                values = []
-                for i in range(fieldcount):
-
-                    fs = None
-                    if fieldtype == 'F':
-                        if fieldsize == 4: #float
-                            fs = '<f'
-                        elif fieldsize == 8: #double
-                            fs = '<d'
-                    elif fieldtype == 'U':
-                        if fieldsize == 1: #unsinged char
-                            fs = '<B'
-                        elif fieldsize == 2: #unsinged short
-                            fs = '<H'
-                        elif fieldsize == 4: #unsinged int
-                            fs =  '<I'
-                    elif fieldtype == 'I':
-                        if fieldsize == 1: #char
-                            fs = '<c'
-                        elif fieldsize == 2: #short
-                            fs = '<h'
-                        elif fieldsize == 4: #signed int
-                            fs =  '<i'
-
-                    raw = infile.read(fieldsize)
-                    if (fs):
-                        data = struct.unpack(fs, raw)
-                        values.append(data[0])
-
-                point.setField(fieldname, values)
-
-            self.points.append(point)
+
+    def getPoints(self):
+        """ The points as PointClass objects (slow for big files,
+            use getData instead) """
+        if self.data is None:
+            return []
+        if not self.points:
+            names = self.data.dtype.names
+            for row in self.data.tolist():
+                point = self.PointClass()
+                for name, value in zip(names, row):
+                    if not isinstance(value, (list, tuple)):
+                        value = (value, )
+                    point.setField(name, value)
+                self.points.append(point)
+        return self.points
 
 
 
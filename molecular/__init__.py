@@ -29,10 +29,12 @@ bl_info = {
     "category": "Object"}
     
 import bpy
+import numpy as np
 try:
     from molecular import cmolcore
 except:
-    print("cmolcore not working")
+    print("cmolcore not working, using the numpy core")
+    from molecular import molcore as cmolcore
 from random import random
 from math import pi
 from mathutils import Vector
@@ -44,6 +46,19 @@ import multiprocessing
 
 mol_simrun = False
 
+# particle alive_state values (UNBORN, ALIVE, DYING, DEAD) to the state used by the core
+mol_alive_states = np.array([2, 0, 0, 3], dtype = np.int32)
+mol_alive_names = {"DEAD": 3, "UNBORN": 2, "ALIVE": 0, "DYING": 0}
+
+def get_alive_state(psys, parlen):
+    par_alive = np.empty(parlen, dtype = np.int32)
+    try:
+        psys.particles.foreach_get('alive_state',par_alive)
+    except TypeError:
+        # older Blender versions can't read enums with foreach_get
+        return np.fromiter((mol_alive_names[par.alive_state] for par in psys.particles), dtype = np.int32, count = parlen)
+    return mol_alive_states[par_alive]
+
 def define_props():
     
     parset = bpy.types.ParticleSettings
@@ -141,31 +156,20 @@ def pack_data(initiate):
                 psys.settings.mol_density = float(psys.settings.mol_matter)
             if psys.settings.mol_active == True and len(psys.particles) > 0:
                 parlen = len(psys.particles)
-                par_loc = [0,0,0] * parlen
-                par_vel = [0,0,0] * parlen
-                par_size = [0] * parlen
-                par_alive = []
-                for par in psys.particles:
-                    parnum += 1
-                    if par.alive_state == "UNBORN":
-                        par_alive.append(2)
-                    if par.alive_state == "ALIVE":
-                        par_alive.append(0)
-                    if par.alive_state == "DEAD":
-                        par_alive.append(3)
-                        
+                parnum += parlen
+                par_loc = np.empty(parlen * 3, dtype = np.float32)
+                par_vel = np.empty(parlen * 3, dtype = np.float32)
                 psys.particles.foreach_get('location',par_loc)
                 psys.particles.foreach_get('velocity',par_vel)
+                par_alive = get_alive_state(psys, parlen)
                 
                 if initiate:
-                    par_mass = []
-                    
+                    par_size = np.empty(parlen, dtype = np.float32)
+                    psys.particles.foreach_get('size',par_size)
                     if psys.settings.mol_density_active:
-                        for par in psys.particles:
-                            par_mass.append(psys.settings.mol_density * (4/3*pi*((par.size/2)**3)))
+                        par_mass = (psys.settings.mol_density * (4/3*pi*((par_size/2)**3))).astype(np.float32)
                     else:
-                        for par in psys.particles:
-                            par_mass.append(psys.settings.mass)
+                        par_mass = np.full(parlen, psys.settings.mass, dtype = np.float32)
                     """
                     if scene.mol_timescale_active == True:
                         psys.settings.timestep = 1 / (scene.render.fps / scene.timescale)
@@ -175,9 +179,8 @@ def pack_data(initiate):
                     #psys.settings.count = psys.settings.count
                     psys.point_cache.frame_step = psys.point_cache.frame_step
                     psyslen += 1
-                    psys.particles.foreach_get('size',par_size)
-                    if mol_minsize > min(par_size):
-                        mol_minsize = min(par_size)
+                    if mol_minsize > par_size.min():
+                        mol_minsize = float(par_size.min())
                     
                     if psys.settings.mol_link_samevalue:
                         psys.settings.mol_link_estiff = psys.settings.mol_link_stiff
@@ -52,6 +52,11 @@ cpdef init(importdata):
     cdef int i = 0
     cdef int ii = 0
     cdef int profiling = 0
+    cdef float[::1] par_loc
+    cdef float[::1] par_vel
+    cdef float[::1] par_size
+    cdef float[::1] par_mass
+    cdef int[::1] par_alive
     newlinks = 0
     totallinks = 0
     totaldeadlinks = 0
@@ -75,17 +80,22 @@ cpdef init(importdata):
         psys[i].parnum = importdata[i+1][0]
         psys[i].particles = <Particle *>malloc( psys[i].parnum * cython.sizeof(Particle) )
         psys[i].particles = &parlist[jj]
+        par_loc = importdata[i + 1][1]
+        par_vel = importdata[i + 1][2]
+        par_size = importdata[i + 1][3]
+        par_mass = importdata[i + 1][4]
+        par_alive = importdata[i + 1][5]
         for ii in xrange(psys[i].parnum):
             parlist[jj].id = jj
-            parlist[jj].loc[0] = importdata[i + 1][1][(ii * 3)]
-            parlist[jj].loc[1] = importdata[i + 1][1][(ii * 3) + 1]
-            parlist[jj].loc[2] = importdata[i + 1][1][(ii * 3) + 2]
-            parlist[jj].vel[0] = importdata[i + 1][2][(ii * 3)]
-            parlist[jj].vel[1] = importdata[i + 1][2][(ii * 3) + 1]
-            parlist[jj].vel[2] = importdata[i + 1][2][(ii * 3) + 2]
-            parlist[jj].size = importdata[i + 1][3][ii]
-            parlist[jj].mass = importdata[i + 1][4][ii]
-            parlist[jj].state = importdata[i + 1][5][ii]
+            parlist[jj].loc[0] = par_loc[(ii * 3)]
+            parlist[jj].loc[1] = par_loc[(ii * 3) + 1]
+            parlist[jj].loc[2] = par_loc[(ii * 3) + 2]
+            parlist[jj].vel[0] = par_vel[(ii * 3)]
+            parlist[jj].vel[1] = par_vel[(ii * 3) + 1]
+            parlist[jj].vel[2] = par_vel[(ii * 3) + 2]
+            parlist[jj].size = par_size[ii]
+            parlist[jj].mass = par_mass[ii]
+            parlist[jj].state = par_alive[ii]
             psys[i].selfcollision_active = importdata[i + 1][6][0]
             psys[i].othercollision_active = importdata[i + 1][6][1]
             psys[i].collision_group = int(importdata[i + 1][6][2])
@@ -233,6 +243,7 @@ cpdef simulate(importdata):
     cdef int i= 0
     cdef int ii = 0
     cdef int profiling = 0
+    cdef float[::1] par_vel
 
     cdef float minX = INT_MAX
     cdef float minY = INT_MAX
@@ -442,21 +453,17 @@ cpdef simulate(importdata):
     exportdata = []
     parloc = []
     parvel = []
-    parloctmp = []
-    parveltmp = []
     #printdb(196)
+    # the new velocities go back into the buffers they came from, the
+    # locations are not changed here
     for i in xrange(psysnum):
+        par_vel = importdata[i][1]
         for ii in xrange(psys[i].parnum):
-            parloctmp.append(psys[i].particles[ii].loc[0])
-            parloctmp.append(psys[i].particles[ii].loc[1])
-            parloctmp.append(psys[i].particles[ii].loc[2])
-            parveltmp.append(psys[i].particles[ii].vel[0])
-            parveltmp.append(psys[i].particles[ii].vel[1])
-            parveltmp.append(psys[i].particles[ii].vel[2])
-        parloc.append(parloctmp)  
-        parvel.append(parveltmp)
-        parloctmp = []
-        parveltmp = [] 
+            par_vel[(ii * 3)] = psys[i].particles[ii].vel[0]
+            par_vel[(ii * 3) + 1] = psys[i].particles[ii].vel[1]
+            par_vel[(ii * 3) + 2] = psys[i].particles[ii].vel[2]
+        parloc.append(importdata[i][0])
+        parvel.append(importdata[i][1])
     #printdb(198)
     
     #print "  New links at this frame: ",newlinks
@@ -942,16 +949,22 @@ cdef void update(data):
     global psys
     cdef int i = 0
     cdef int ii = 0
+    cdef float[::1] par_loc
+    cdef float[::1] par_vel
+    cdef int[::1] par_alive
     for i in xrange(psysnum):
+        par_loc = data[i][0]
+        par_vel = data[i][1]
+        par_alive = data[i][2]
         for ii in xrange(psys[i].parnum):
-            psys[i].particles[ii].loc[0] = data[i][0][(ii * 3)]
-            psys[i].particles[ii].loc[1] = data[i][0][(ii * 3) + 1]
-            psys[i].particles[ii].loc[2] = data[i][0][(ii * 3) + 2]
-            psys[i].particles[ii].vel[0] = data[i][1][(ii * 3)]
-            psys[i].particles[ii].vel[1] = data[i][1][(ii * 3) + 1]
-            psys[i].particles[ii].vel[2] = data[i][1][(ii * 3) + 2]
-            if psys[i].particles[ii].state == 0 and data[i][2][ii] == 0:
-                psys[i].particles[ii].state = data[i][2][ii] + 1
+            psys[i].particles[ii].loc[0] = par_loc[(ii * 3)]
+            psys[i].particles[ii].loc[1] = par_loc[(ii * 3) + 1]
+            psys[i].particles[ii].loc[2] = par_loc[(ii * 3) + 2]
+            psys[i].particles[ii].vel[0] = par_vel[(ii * 3)]
+            psys[i].particles[ii].vel[1] = par_vel[(ii * 3) + 1]
+            psys[i].particles[ii].vel[2] = par_vel[(ii * 3) + 2]
+            if psys[i].particles[ii].state == 0 and par_alive[ii] == 0:
+                psys[i].particles[ii].state = par_alive[ii] + 1
                 #printdb(546)
                 if psys[i].links_active == 1:
                     KDTree_rnn_query(kdtree,&psys[i].particles[ii],psys[i].particles[ii].loc,psys[i].particles[ii].sys.link_length)
@@ -960,11 +973,11 @@ cdef void update(data):
                     psys[i].particles[ii].neighboursnum = 0
                 #printdb(548)
 
-            elif psys[i].particles[ii].state == 1 and data[i][2][ii] == 0:
+            elif psys[i].particles[ii].state == 1 and par_alive[ii] == 0:
                 psys[i].particles[ii].state = 1
 
             else:
-                psys[i].particles[ii].state = data[i][2][ii]
+                psys[i].particles[ii].state = par_alive[ii]
             psys[i].particles[ii].collided_with = <int *>realloc(psys[i].particles[ii].collided_with, 1 * cython.sizeof(int) )
             psys[i].particles[ii].collided_num = 0
 
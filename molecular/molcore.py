@@ -1,512 +1,510 @@
-from math import floor
-from sys import getsizeof
-from time import clock
-from random import random
+#====================== BEGIN GPL LICENSE BLOCK ======================
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+#======================= END GPL LICENSE BLOCK ========================
+
+# NumPy version of cmolcore, used when the Cython module isn't built.
+# Same init/simulate/memfree interface and the same collision and link
+# maths, but every step works on whole arrays:
+#   - neighbours come from a cell list (particles sorted by grid cell)
+#   - links are stored as arrays, one entry per link
+#   - collisions and links are solved in batches where no particle is in
+#     two pairs, so each batch is applied at once and a particle still sees
+#     the velocity left by its previous pair like in the sequential solver
+
+import numpy as np
+
+# names of the 45 parameters of a particle system, in pack_data order
+PARAMS = (
+    "selfcollision_active", "othercollision_active", "collision_group",
+    "friction", "collision_damp", "links_active", "link_length", "link_max",
+    "link_tension", "link_tensionrand", "link_stiff", "link_stiffrand",
+    "link_stiffexp", "link_damp", "link_damprand", "link_broken",
+    "link_brokenrand", "link_estiff", "link_estiffrand", "link_estiffexp",
+    "link_edamp", "link_edamprand", "link_ebroken", "link_ebrokenrand",
+    "relink_group", "relink_chance", "relink_chancerand", "relink_max",
+    "relink_tension", "relink_tensionrand", "relink_stiff", "relink_stiffexp",
+    "relink_stiffrand", "relink_damp", "relink_damprand", "relink_broken",
+    "relink_brokenrand", "relink_estiff", "relink_estiffexp",
+    "relink_estiffrand", "relink_edamp", "relink_edamprand", "relink_ebroken",
+    "relink_ebrokenrand", "link_friction")
+
+LINKFIELDS = (
+    "start", "end", "lenght", "stiffness", "exponent", "damping", "broken",
+    "estiffness", "eexponent", "edamping", "ebroken", "friction")
+
+# number of particles queried at once by the cell list
+QUERYBLOCK = 65536
+
+core = None
+print("molcore (numpy) imported with success! v1.01")
+
+
+def crand(seed, count = 1):
+    # cmolcore calls srand(seed) right before each rand() so every link gets
+    # the same "random" values. These are the values of the 15 bits rand()
+    # the core was written for (divided by the same rand_max = 32767).
+    state = seed
+    for i in range(count):
+        state = (state * 214013 + 2531011) & 0xffffffff
+    return ((state >> 16) & 0x7fff) / 32767
+
+
+def randfactor(rand, amount):
+    return ((rand * amount) - (amount / 2)) + 1
+
+
+def neighbours(query, points, radius, exclude_self = False):
+    # all the (query, point) pairs closer than radius[query] (inclusive)
+    empty = np.zeros(0, dtype = np.int64)
+    if len(query) == 0 or len(points) == 0:
+        return empty, empty
+    cellsize = float(radius.max())
+    if cellsize <= 0:
+        cellsize = 1.0
+    low = np.minimum(points.min(axis = 0), query.min(axis = 0))
+    pcells = np.floor((points - low) / cellsize).astype(np.int64)
+    qcells = np.floor((query - low) / cellsize).astype(np.int64)
+    dims = np.maximum(pcells.max(axis = 0), qcells.max(axis = 0)) + 3
+    pcells += 1
+    qcells += 1
+    keys = (pcells[:, 0] * dims[1] + pcells[:, 1]) * dims[2] + pcells[:, 2]
+    order = np.argsort(keys, kind = "mergesort")
+    keys = keys[order]
+    sqradius = radius * radius
+
+    result_q = []
+    result_p = []
+    for start in range(0, len(query), QUERYBLOCK):
+        cells = qcells[start:start + QUERYBLOCK]
+        qinds = np.arange(start, start + len(cells))
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                # the three cells along z are next to each other in the keys
+                base = ((cells[:, 0] + dx) * dims[1] + cells[:, 1] + dy) * dims[2] + cells[:, 2]
+                lo = np.searchsorted(keys, base - 1, "left")
+                hi = np.searchsorted(keys, base + 1, "right")
+                counts = hi - lo
+                total = counts.sum()
+                if total == 0:
+                    continue
+                q = np.repeat(qinds, counts)
+                within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                p = order[np.repeat(lo, counts) + within]
+                diff = points[p] - query[q]
+                sqdist = np.einsum("ij,ij->i", diff, diff)
+                keep = sqdist <= sqradius[q]
+                if exclude_self:
+                    keep &= p != q
+                result_q.append(q[keep])
+                result_p.append(p[keep])
+    if len(result_q) == 0:
+        return empty, empty
+    q = np.concatenate(result_q)
+    p = np.concatenate(result_p)
+    order = np.lexsort((p, q))
+    return q[order], p[order]
+
+
+def first_owner(owner, other, count):
+    # keep one of (i, j) and (j, i), the one a sequential sweep in index order
+    # would meet first
+    low = np.minimum(owner, other)
+    high = np.maximum(owner, other)
+    key = low * count + high
+    order = np.lexsort((owner, key))
+    key = key[order]
+    first = np.ones(len(key), dtype = bool)
+    first[1:] = key[1:] != key[:-1]
+    keep = np.sort(order[first])
+    return owner[keep], other[keep]
+
+
+def batches(a, b, count):
+    # split the pairs in groups where no particle is used twice. A pair goes
+    # in a batch once it comes first (in a fixed shuffled order) among the
+    # pairs left for both of its particles.
+    if len(a) == 0:
+        return
+    priority = np.empty(len(a), dtype = np.int64)
+    priority[np.random.RandomState(len(a)).permutation(len(a))] = np.arange(len(a))
+    left = np.arange(len(a))
+    best = np.empty(count, dtype = np.int64)
+    while len(left) > 0:
+        la = a[left]
+        lb = b[left]
+        p = priority[left]
+        best[la] = len(a)
+        best[lb] = len(a)
+        np.minimum.at(best, la, p)
+        np.minimum.at(best, lb, p)
+        chosen = (best[la] == p) & (best[lb] == p)
+        yield left[chosen]
+        left = left[~chosen]
+
+
+def dot(u, v):
+    return np.einsum("ij,ij->i", u, v)
+
+
+class MolCore:
+
+    def __init__(self, importdata):
+        fps = float(importdata[0][0])
+        substep = int(importdata[0][1])
+        self.deltatime = fps * (substep + 1)
+        self.psysnum = int(importdata[0][2])
+        self.parnum = int(importdata[0][3])
+        self.cpunum = int(importdata[0][4])
+        self.newlinks = 0
+        self.totallinks = 0
+        self.totaldeadlinks = 0
+
+        self.psys_parnum = []
+        params = []
+        loc = []
+        vel = []
+        size = []
+        mass = []
+        state = []
+        sys = []
+        for i in range(self.psysnum):
+            data = importdata[i + 1]
+            self.psys_parnum.append(int(data[0]))
+            loc.append(np.asarray(data[1], dtype = np.float64).reshape(-1, 3))
+            vel.append(np.asarray(data[2], dtype = np.float64).reshape(-1, 3))
+            size.append(np.asarray(data[3], dtype = np.float64))
+            mass.append(np.asarray(data[4], dtype = np.float64))
+            state.append(np.asarray(data[5], dtype = np.int64))
+            sys.append(np.full(int(data[0]), i, dtype = np.int64))
+            params.append([float(value) for value in data[6]])
+        self.loc = np.concatenate(loc) if loc else np.zeros((0, 3))
+        self.vel = np.concatenate(vel) if vel else np.zeros((0, 3))
+        self.size = np.concatenate(size) if size else np.zeros(0)
+        self.mass = np.concatenate(mass) if mass else np.zeros(0)
+        self.state = np.concatenate(state) if state else np.zeros(0, dtype = np.int64)
+        self.sys = np.concatenate(sys) if sys else np.zeros(0, dtype = np.int64)
+        self.parnum = len(self.loc)
+
+        params = np.array(params, dtype = np.float64).reshape(-1, len(PARAMS))
+        self.params = {}
+        for i, name in enumerate(PARAMS):
+            self.params[name] = params[:, i]
+        for name in ("collision_group", "relink_group", "link_max", "relink_max"):
+            self.params[name] = np.trunc(self.params[name])
+        for name in ("link_stiff", "link_estiff", "relink_stiff", "relink_estiff"):
+            self.params[name] = self.params[name] * 0.5
+
+        self.links = {}
+        for name in LINKFIELDS:
+            if name in ("start", "end", "exponent", "eexponent"):
+                self.links[name] = np.zeros(0, dtype = np.int64)
+            else:
+                self.links[name] = np.zeros(0, dtype = np.float64)
+        self.links["alive"] = np.zeros(0, dtype = bool)
+
+        # the positions the neighbour searches of update() are done against,
+        # like the kdtree of cmolcore built on the last frame
+        self.treeloc = self.loc.copy()
+        print("  Number of cpu's used:", self.cpunum)
+
+        owners = np.flatnonzero(
+            (self.param("links_active") == 1) & (self.state <= 1) &
+            (self.param("link_max") > 0))
+        self.create_links(owners, self.state)
+        self.totallinks += self.newlinks
+        print("  New links created: ", self.newlinks)
+
+    def param(self, name, index = None):
+        if index is None:
+            return self.params[name][self.sys]
+        return self.params[name][self.sys[index]]
+
+    def avg(self, name, a, b):
+        return (self.param(name, a) + self.param(name, b)) / 2
+
+    def link_keys(self):
+        alive = self.links["alive"]
+        start = self.links["start"][alive]
+        end = self.links["end"][alive]
+        return np.minimum(start, end) * self.parnum + np.maximum(start, end)
+
+    def linked(self, a, b):
+        key = np.minimum(a, b) * self.parnum + np.maximum(a, b)
+        return np.isin(key, self.link_keys())
+
+    def activnum(self):
+        alive = self.links["alive"]
+        return np.bincount(self.links["start"][alive], minlength = self.parnum)
+
+    def add_links(self, values):
+        for name in LINKFIELDS:
+            self.links[name] = np.concatenate((self.links[name], values[name].astype(self.links[name].dtype)))
+        self.links["alive"] = np.concatenate((self.links["alive"], np.ones(len(values["start"]), dtype = bool)))
+        self.newlinks += len(values["start"])
+
+    def create_links(self, owners, oldstate):
+        # links from each owner to the particles within its link_length of
+        # the positions of the last neighbour search. Particles are handled
+        # in order so the ones after an owner still have the state and
+        # location of the last frame.
+        radius = self.param("link_length", owners)
+        q, other = neighbours(self.loc[owners], self.treeloc, radius)
+        par = owners[q]
+        before = other < par
+        otherstate = np.where(before, self.state[other], oldstate[other])
+        keep = (other != par) & (otherstate <= 1)
+        par = par[keep]
+        other = other[keep]
+        keep = ~self.linked(par, other)
+        par, other = first_owner(par[keep], other[keep], self.parnum)
+        if len(par) == 0:
+            return
+
+        before = other < par
+        otherloc = np.where(before[:, None], self.loc[other], self.treeloc[other])
+        diff = otherloc - self.loc[par]
+        length = np.sqrt(dot(diff, diff))
+        tension = randfactor(crand(1), self.avg("link_tensionrand", par, other) * 2)
+        stiffrandom = self.avg("link_stiffrand", par, other) * 2
+        damprandom = self.avg("link_damprand", par, other) * 2
+        brokrandom = self.avg("link_brokenrand", par, other) * 2
+        self.add_links({
+            "start": par,
+            "end": other,
+            "friction": self.avg("link_friction", par, other),
+            "lenght": length * self.avg("link_tension", par, other) * tension,
+            "stiffness": self.avg("link_stiff", par, other) * randfactor(crand(2), stiffrandom),
+            "estiffness": self.avg("link_estiff", par, other) * randfactor(crand(3), stiffrandom),
+            "exponent": np.abs(np.trunc(self.avg("link_stiffexp", par, other))),
+            "eexponent": np.abs(np.trunc(self.avg("link_estiffexp", par, other))),
+            "damping": self.avg("link_damp", par, other) * randfactor(crand(4), damprandom),
+            "edamping": self.avg("link_edamp", par, other) * randfactor(crand(5), damprandom),
+            "broken": self.avg("link_broken", par, other) * randfactor(crand(6), brokrandom),
+            "ebroken": self.avg("link_ebroken", par, other) * randfactor(crand(7), brokrandom)})
+
+    def create_relinks(self, par, other):
+        # new links on collision, at most link_max * 2 per particle
+        keep = (self.avg("relink_chance", par, other) > 0) & \
+            (self.param("links_active", par) == 1) & \
+            (self.param("relink_group", par) == self.param("relink_group", other))
+        chancerdom = self.avg("relink_chancerand", par, other) * 2
+        keep &= crand(8) <= self.avg("relink_chance", par, other) * randfactor(crand(9), chancerdom)
+        par = par[keep]
+        other = other[keep]
+        order = np.lexsort((other, par))
+        par = par[order]
+        other = other[order]
+        first = np.ones(len(par), dtype = bool)
+        first[1:] = par[1:] != par[:-1]
+        starts = np.flatnonzero(first)
+        rank = np.arange(len(par)) - np.repeat(starts, np.diff(np.append(starts, len(par))))
+        room = self.param("link_max", par) * 2 - self.activnum()[par]
+        keep = rank < room
+        par = par[keep]
+        other = other[keep]
+        if len(par) == 0:
+            return
+
+        diff = self.loc[other] - self.loc[par]
+        length = np.sqrt(dot(diff, diff))
+        tension = randfactor(crand(10), self.avg("relink_tensionrand", par, other) * 2)
+        stiffrandom = self.avg("relink_stiffrand", par, other) * 2
+        damprandom = self.avg("relink_damprand", par, other) * 2
+        brokrandom = self.avg("relink_brokenrand", par, other) * 2
+        self.add_links({
+            "start": par,
+            "end": other,
+            "friction": self.avg("link_friction", par, other),
+            "lenght": length * self.avg("relink_tension", par, other) * tension,
+            "stiffness": self.avg("relink_stiff", par, other) * randfactor(crand(11), stiffrandom),
+            "estiffness": self.avg("relink_estiff", par, other) * randfactor(crand(12), stiffrandom),
+            "exponent": np.abs(np.trunc(self.avg("relink_stiffexp", par, other))),
+            "eexponent": np.abs(np.trunc(self.avg("relink_estiffexp", par, other))),
+            "damping": self.avg("relink_damp", par, other) * randfactor(crand(13), damprandom),
+            "edamping": self.avg("relink_edamp", par, other) * randfactor(crand(14), damprandom),
+            "broken": self.avg("relink_broken", par, other) * randfactor(crand(14, 2), brokrandom),
+            "ebroken": self.avg("relink_ebroken", par, other) * randfactor(crand(15), brokrandom)})
+
+    def update(self, data):
+        loc = []
+        vel = []
+        alive = []
+        for i in range(self.psysnum):
+            loc.append(np.asarray(data[i][0], dtype = np.float64).reshape(-1, 3))
+            vel.append(np.asarray(data[i][1], dtype = np.float64).reshape(-1, 3))
+            alive.append(np.asarray(data[i][2], dtype = np.int64))
+        if self.psysnum == 0:
+            return
+        self.loc = np.concatenate(loc)
+        self.vel = np.concatenate(vel)
+        alive = np.concatenate(alive)
+
+        oldstate = self.state
+        self.state = np.where((oldstate <= 1) & (alive == 0), 1, alive)
+        born = np.flatnonzero((oldstate == 0) & (alive == 0) &
+                              (self.param("links_active") == 1))
+        if len(born) == 0:
+            return
+        born = born[self.activnum()[born] < self.param("link_max", born)]
+        self.create_links(born, oldstate)
+
+    def simulate(self, importdata):
+        self.newlinks = 0
+        deadlinks = 0
+        self.update(importdata)
+        self.treeloc = self.loc.copy()
+
+        par, other = neighbours(self.loc, self.loc, self.size * 2, True)
+        par, other = self.colliding(par, other)
+        self.collide(par, other)
+        self.create_relinks(par, other)
+        deadlinks = self.solve_link()
+
+        self.totallinks += self.newlinks
+        self.totaldeadlinks += deadlinks
+        # like cmolcore the new velocities go back into the buffers they came
+        # from and the locations are not changed
+        parloc = []
+        parvel = []
+        start = 0
+        for i, parnum in enumerate(self.psys_parnum):
+            importdata[i][1][:] = self.vel[start:start + parnum].ravel()
+            parloc.append(importdata[i][0])
+            parvel.append(importdata[i][1])
+            start += parnum
+        return [parloc, parvel, self.newlinks, deadlinks, self.totallinks, self.totaldeadlinks]
+
+    def colliding(self, par, other):
+        # the pairs that cmolcore collide() would resolve, each only once
+        samesys = self.sys[par] == self.sys[other]
+        check = np.where(samesys,
+                         self.param("selfcollision_active", par) == 1,
+                         (self.param("othercollision_active", par) == 1) &
+                         (self.param("othercollision_active", other) == 1))
+        check &= self.param("collision_group", par) == self.param("collision_group", other)
+        check &= (self.state[par] <= 1) & (self.state[other] <= 1)
+        diff = self.loc[par] - self.loc[other]
+        sqlenght = dot(diff, diff)
+        target = (self.size[par] + self.size[other]) * 0.999
+        check &= (sqlenght != 0) & (sqlenght < target * target)
+        par = par[check]
+        other = other[check]
+        keep = ~self.linked(par, other)
+        return first_owner(par[keep], other[keep], self.parnum)
+
+    def collide(self, par, other):
+        lenghtxyz = self.loc[par] - self.loc[other]
+        lenght = np.sqrt(dot(lenghtxyz, lenghtxyz))
+        invlenght = 1 / lenght
+        target = (self.size[par] + self.size[other]) * 0.999
+        factor = (lenght - target) * invlenght
+        ratio1 = self.mass[other] / (self.mass[par] + self.mass[other])
+        ratio2 = 1 - ratio1
+        force1 = (ratio1 * factor * self.deltatime)[:, None] * lenghtxyz
+        force2 = (ratio2 * factor * self.deltatime)[:, None] * lenghtxyz
+        col_normal1 = -lenghtxyz * invlenght[:, None]
+        friction = self.avg("friction", par, other)
+        damp = self.avg("collision_damp", par, other)
+        friction1 = (1 - friction * ratio1)[:, None]
+        friction2 = (1 - friction * ratio2)[:, None]
+        damping1 = (1 - damp * ratio1)[:, None]
+        damping2 = (1 - damp * ratio2)[:, None]
+
+        vel = self.vel
+        for batch in batches(par, other, self.parnum):
+            a = par[batch]
+            b = other[batch]
+            normal = col_normal1[batch]
+            vel1 = vel[a] - force1[batch]
+            vel2 = vel[b] + force2[batch]
+            ypar_vel = dot(vel1, normal)[:, None] * normal
+            xpar_vel = vel1 - ypar_vel
+            yi_vel = dot(vel2, normal)[:, None] * normal
+            xi_vel = vel2 - yi_vel
+            d1 = damping1[batch]
+            d2 = damping2[batch]
+            f1 = friction1[batch]
+            f2 = friction2[batch]
+            vel[a] = ypar_vel * d1 + yi_vel * (1 - d1) + xpar_vel * f1 + xi_vel * (1 - f1)
+            vel[b] = yi_vel * d2 + ypar_vel * (1 - d2) + xi_vel * f2 + xpar_vel * (1 - f2)
+
+    def solve_link(self):
+        links = self.links
+        start = links["start"]
+        end = links["end"]
+        lenght = links["lenght"]
+        lengthxyz = self.loc[end] - self.loc[start]
+        length = np.sqrt(dot(lengthxyz, lengthxyz))
+        active = np.flatnonzero(links["alive"] & (self.state[start] < 2) &
+                                (lenght != length) & (length != 0))
+        if len(active) == 0:
+            return 0
+        start = start[active]
+        end = end[active]
+        lenght = lenght[active]
+        lengthxyz = lengthxyz[active]
+        length = length[active]
+
+        compress = lenght > length
+        stiff = np.where(compress, links["stiffness"][active], links["estiffness"][active]) * self.deltatime
+        damping = np.where(compress, links["damping"][active], links["edamping"][active])
+        exp = np.where(compress, links["exponent"][active], links["eexponent"][active])
+        normal = lengthxyz / length[:, None]
+        with np.errstate(invalid = "ignore"):
+            forcespring = np.power(length - lenght, exp.astype(np.float64)) * stiff
+        ratio1 = (self.mass[end] / (self.mass[start] + self.mass[end]))[:, None]
+        ratio2 = (self.mass[start] / (self.mass[start] + self.mass[end]))[:, None]
+        friction1 = 1 - links["friction"][active][:, None] * ratio1
+        friction2 = 1 - links["friction"][active][:, None] * ratio2
+
+        vel = self.vel
+        for batch in batches(start, end, self.parnum):
+            a = start[batch]
+            b = end[batch]
+            n = normal[batch]
+            v = dot(vel[b] - vel[a], n)
+            force = ((forcespring[batch] + damping[batch] * v)[:, None]) * n
+            vel1 = vel[a] + force * ratio1[batch]
+            vel2 = vel[b] - force * ratio2[batch]
+            ypar1_vel = dot(vel1, n)[:, None] * n
+            xpar1_vel = vel1 - ypar1_vel
+            ypar2_vel = dot(vel2, n)[:, None] * n
+            xpar2_vel = vel2 - ypar2_vel
+            f1 = friction1[batch]
+            f2 = friction2[batch]
+            vel[a] = ypar1_vel + xpar1_vel * f1 + xpar2_vel * (1 - f1)
+            vel[b] = ypar2_vel + xpar2_vel * f2 + xpar1_vel * (1 - f2)
+
+        broken = (length > lenght * (1 + links["ebroken"][active])) | \
+            (length < lenght * (1 - links["broken"][active]))
+        links["alive"][active[broken]] = False
+        return int(broken.sum())
+
 
 def init(importdata):
-    global fps
-    global substep
-    global psys
-    global kdtree
-    global parlist
-    
-    fps = importdata[0][0]
-    substep = importdata[0][1]
-    psys = []
-    for i in importdata[1:]:
-        psys.append(ParSys(i))
-    parnum = 0
-    for i in psys:
-        parnum += i.parnum
-    parlist = []  
-    for i in psys:
-        for ii in i.particle:
-            parlist.append(ii)
-    timer = clock()
-    kdtree = KDTree()
-    kdtree.create_nodes(len(parlist))
-    kdtree.create_tree(parlist,"root")
-    print("  KDtree generation take:",round(clock()-timer,5),"sec")
-    """
-    point = (0,0,0)
-    r = 2
-    timer = clock()
-    rquery = kdtree.rnn_query(point,r)
-    print("  RNN query number find:",len(rquery))
-    print("  KDtree RNN query take:",round(clock()-timer,5),"sec")
-    timer = clock()
-    bquery = kdtree.brute_query(point,r)
-    print("  Brute query number find:",len(bquery))
-    print("  Brute query take:",round(clock()-timer,5),"sec")
-    if len(rquery) != len(bquery):
-        print("> DONT MATCH!!!")
-    else:
-        print("  Match!")
-    """
-    for i in psys:
-        for ii in i.particle:
-            create_link(ii)
-            
-    #for i in kdtree.nodes:
-        #ppar = i.particle.id
-        #print(parlist[ppar].id)
-    return parnum
+    global core
+    core = MolCore(importdata)
+    return core.parnum
 
 
 def simulate(importdata):
-    global kdtree
-    global parlist
-    
-    update_ParSys(importdata)
-    #print(len(parlist))
-    kdtree.create_tree(parlist,"root")
-    for parsys in psys:
-        for par in parsys.particle:
-            collide(par)
-            solve_link(par)
-            #print(par.state)
-    exportdata = []
-    parloc = []
-    parvel = []
-    parloctmp = []
-    parveltmp = []
-    for parsys in psys:
-        for par in parsys.particle:
-            parloctmp += par.loc
-            parveltmp += par.vel
-        parloc.append(parloctmp)  
-        parvel.append(parveltmp)
-        parloctmp = []
-        parveltmp = []   
-    exportdata = [parloc,parvel]
-    return exportdata
-            
-            
-    
-def collide(par):
-    global kdtree
-    
-    neighbours = kdtree.rnn_query(par.loc,par.size * 2)
-    
-    for ii in neighbours:
-        i = ii[0].particle
-        if i not in par.collided_with:
-            if i.sys != par.sys :
-                if i.sys.othercollision_active == False or par.sys.othercollision_active == False:
-                    return
-            #print(par.sys.collision_group)
-            if i.sys.collision_group != par.sys.collision_group:
-                return
-            if i.sys == par.sys and par.sys.selfcollision_active == False:
-                return
-            
-            stiff = (fps * (substep +1))
-            target = (par.size + i.size) * 0.99
-            sqtarget = target**2
-            
-            if par.state <= 1 and i.state <= 1 and i not in par.link_with and par not in i.link_with:
-                lenghtx = par.loc[0] - i.loc[0]
-                lenghty = par.loc[1] - i.loc[1]
-                lenghtz = par.loc[2] - i.loc[2]
-                sqlenght  = ii[1]
-                if sqlenght != 0 and sqlenght < sqtarget:
-                    lenght = sqlenght**0.5
-                    factor = (lenght - target) / lenght
-                    ratio1 = (i.mass/(par.mass + i.mass))
-                    ratio2 = (par.mass/(par.mass + i.mass))
-                    
-                    par.vel[0] -= (lenghtx * factor * ratio1) * stiff
-                    par.vel[1] -= (lenghty * factor * ratio1) * stiff
-                    par.vel[2] -= (lenghtz * factor * ratio1) * stiff
-                    i.vel[0] += (lenghtx * factor * ratio2) * stiff
-                    i.vel[1] += (lenghty * factor * ratio2) * stiff
-                    i.vel[2] += (lenghtz * factor * ratio2) * stiff
-                    
-                  
-                    
-                    col_normal1 = [(i.loc[0] - par.loc[0]) / lenght,(i.loc[1] - par.loc[1]) / lenght,(i.loc[2] - par.loc[2]) / lenght]
-                    #print("i.vel:",i.vel)
-                    #print("Normal",col_normal1)
-                    #print("Normal_length",(col_normal1[0]**2 + col_normal1[1]**2 + col_normal1[2]**2)**0.5)
-                    col_normal2 = [col_normal1[0] * -1,col_normal1[1] * -1,col_normal1[2] * -1]
-                     
-                    factor1 = dot_product(par.vel,col_normal1)      
-                    ypar_vel = [factor1 * col_normal1[0],factor1 * col_normal1[1],factor1 * col_normal1[2]]
-                    xpar_vel = [par.vel[0] - ypar_vel[0],par.vel[1] - ypar_vel[1],par.vel[2] - ypar_vel[2]]
-                    
-                    factor2 = dot_product(i.vel,col_normal2)
-                    yi_vel = [factor2 * col_normal2[0],factor2 * col_normal2[1],factor2* col_normal2[2]]
-                    xi_vel = [i.vel[0] - yi_vel[0],i.vel[1] - yi_vel[1],i.vel[2] - yi_vel[2]]
-                    
-                    #print("yi_vel:",yi_vel)
-                    #print("xi_vel:",xi_vel)
-                    
-                    """
-                    Ua = factor1
-                    #print("Ua:",Ua)       
-                    Ub = -factor2
-                    #print("Ub:",Ub)  
-                    Cr = 1
-                    Ma = par.mass
-                    Mb = i.mass     
-                    Va = (Cr*Mb*(Ub-Ua)+Ma*Ua+Mb*Ub)/(Ma+Mb)
-                    Vb = (Cr*Ma*(Ua-Ub)+Ma*Ua+Mb*Ub)/(Ma+Mb)
-                    #print("Va:",Va)
-                    #print("Vb:",Vb)  
-                    
-                    #print("factor:",-(factor * ratio1) * stiff)
-                    mula = 1
-                    #print("mula:",mula)
-                    mulb = 1
-                    #print("mulb:",mulb)
-                    ypar_vel[0] = col_normal1[0] * Va * mula
-                    ypar_vel[1] = col_normal1[1] * Va * mula
-                    ypar_vel[2] = col_normal1[2] * Va * mula
-                    yi_vel[0] = col_normal1[0] * Vb * mulb
-                    yi_vel[1] = col_normal1[1] * Vb * mulb
-                    yi_vel[2] = col_normal1[2] * Vb * mulb
-                    #print("yi_vel after:",yi_vel)
-                    #print("xi_vel after:",xi_vel)
-                    """
-                    friction = 1 - ((par.sys.friction + i.sys.friction ) / 2)
-                    xpar_vel[0] *= friction
-                    xpar_vel[1] *= friction
-                    xpar_vel[2] *= friction
-                    xi_vel[0] *= friction
-                    xi_vel[1] *= friction
-                    xi_vel[2] *= friction
-                    
-                    #print("par_vel befor:",par.vel)
-                    #print("i_vel befor:",i.vel)
-                    par.vel = [ypar_vel[0] + xpar_vel[0],ypar_vel[1] + xpar_vel[1],ypar_vel[2] + xpar_vel[2]]
-                    i.vel = [yi_vel[0] + xi_vel[0],yi_vel[1] + xi_vel[1],yi_vel[2] + xi_vel[2]]
-                    #print("par_vel after:",par.vel)
-                    #print("i_vel after:",i.vel)
-                    
-                    """
-                    if abs(Va) < abs(((factor * ratio1) * stiff)):
-                        par.vel[0] -= ((lenghtx * factor * ratio1) * stiff)
-                        par.vel[1] -= ((lenghty * factor * ratio1) * stiff)
-                        par.vel[2] -= ((lenghtz * factor * ratio1) * stiff)
-                    if abs(Vb) < abs(((factor * ratio2) * stiff)):
-                        i.vel[0] += ((lenghtx * factor * ratio2) * stiff)
-                        i.vel[1] += ((lenghty * factor * ratio2) * stiff)
-                        i.vel[2] += ((lenghtz * factor * ratio2) * stiff)
-                    """
-                    
-                    i.collided_with.append(par)
-                    if (par.sys.relink_chance + par.sys.relink_chance / 2) > 0:
-                        create_link(par,[i,lenght**2])
-                    
-                    
-                    
-def solve_link(par):
-    broken_links = []
-    for link in par.links:
-        
-        stiff = link.stiffness * (fps * (substep +1))
-        damping = link.damping
-        timestep = 1/(fps * (substep +1))
-        exp = link.exponent
-        par1 = link.start
-        par2 = link.end
-        Loc1 = par1.loc
-        Loc2 = par2.loc
-        V1 = link.start.vel
-        V2 = link.end.vel
-        LengthX = Loc2[0] - Loc1[0]
-        LengthY = Loc2[1] - Loc1[1]
-        LengthZ = Loc2[2] - Loc1[2]
-        Length = (LengthX**2 + LengthY**2 + LengthZ**2)**(0.5)
-        if link.lenght != Length:
-            Vx = V2[0] - V1[0]
-            Vy = V2[1] - V1[1]
-            Vz = V2[2] - V1[2]
-            V = (Vx * LengthX + Vy * LengthY+Vz * LengthZ) / Length
-            ForceSpring = ((Length - link.lenght)**(exp)) * stiff
-            ForceDamper = damping * V
-            ForceX = (ForceSpring + ForceDamper) * LengthX / Length
-            ForceY = (ForceSpring + ForceDamper) * LengthY / Length
-            ForceZ = (ForceSpring + ForceDamper) * LengthZ / Length
-            Force1 = [ForceX,ForceY,ForceZ]
-            Force2 = [-ForceX,-ForceY,-ForceZ]
-            ratio1 = (par2.mass/(par1.mass + par2.mass))
-            ratio2 = (par1.mass/(par1.mass + par2.mass))
-            par1.vel[0] += Force1[0] * ratio1
-            par1.vel[1] += Force1[1] * ratio1
-            par1.vel[2] += Force1[2] * ratio1
-            par2.vel[0] += Force2[0] * ratio2
-            par2.vel[1] += Force2[1] * ratio2
-            par2.vel[2] += Force2[2] * ratio2
-            if Length > (link.lenght  * (1 + link.broken)) or Length < (link.lenght  * (1 - link.broken)):
-                #print("broke!!!!!")
-                broken_links.append(link)
-                if par2 in par1.link_with:
-                    par1.link_with.remove(par2)
-                if par1 in par2.link_with:
-                    par2.link_with.remove(par1)
-                    
-    par.links = list(set(par.links) - set(broken_links))
-                
-    
-
-
-    
-def update_ParSys(data):
-    global psys
-    global substep
-    global parlist
-    i = 0
-    ii = 0
-    #print(data[1][2])
-    parlist = []
-    for parsys in psys:
-        for par in parsys.particle:
-            par.loc = data[i][0][(ii * 3):(ii * 3 + 3)]
-            par.vel = data[i][1][(ii * 3):(ii * 3 + 3)]
-            if par.state == 0 and data[i][2][ii] == 0:
-                par.state = data[i][2][ii] + 1
-                create_link(par)
-                parlist.append(par)
-            elif par.state == 1 and data[i][2][ii] == 0:
-                par.state = 1
-                parlist.append(par)
-            else:
-                par.state = data[i][2][ii]
-            par.collided_with = []
-            #print("state:",par.state)
-            ii += 1
-        ii = 0
-        i += 1
-
-def create_link(par,parothers = None):
-    global kdtree
-    if par.sys.links_active == 0:
-        return
-    if parothers == None:
-        neighbours = kdtree.rnn_query(par.loc,par.sys.link_length)
-    else:
-        neighbours = [parothers]
-    
-    for ii in neighbours:
-        if parothers == None:
-            i = ii[0].particle
-        else:
-            i = ii[0]
-        if par != i:
-            if par not in i.link_with and i.state <= 1 and par.state <= 1:
-                link = links()
-                link.lenght = ii[1]**0.5
-                link.start = par
-                link.end = i
-                if parothers == None:
-                    stiffrandom = (par.sys.link_stiffrand + i.sys.link_stiffrand) / 2 * 2
-                    link.stiffness = ((par.sys.link_stiff + i.sys.link_stiff)/2) * (((random() * stiffrandom) - (stiffrandom / 2)) + 1)
-                    link.exponent = abs((par.sys.link_stiffexp + i.sys.link_stiffexp) / 2)
-                    damprandom = ((par.sys.link_damprand + i.sys.link_damprand) / 2) * 2
-                    link.damping = ((par.sys.link_damp + i.sys.link_damp) / 2) * (((random() * damprandom) - (damprandom / 2)) + 1)
-                    brokrandom = ((par.sys.link_brokenrand + i.sys.link_brokenrand) / 2) * 2
-                    link.broken = ((par.sys.link_broken + i.sys.link_broken) / 2) * (((random() * brokrandom) - (brokrandom  / 2)) + 1)
-                    par.links.append(link)
-                    par.link_with.append(i)
-                    i.link_with.append(par)
-                    del link
-                if parothers != None and par.sys.relink_group == i.sys.relink_group:
-                    relinkrandom = random()
-                    chancerdom = (par.sys.relink_chancerand + i.sys.relink_chancerand) / 2 * 2
-                    if relinkrandom <= ((par.sys.relink_chance + i.sys.relink_chance) / 2) * (((random() * chancerdom) - (chancerdom / 2)) + 1):
-                        stiffrandom = (par.sys.relink_stiffrand + i.sys.relink_stiffrand) / 2 * 2
-                        link.stiffness = ((par.sys.relink_stiff + i.sys.relink_stiff)/2) * (((random() * stiffrandom) - (stiffrandom / 2)) + 1)
-                        link.exponent = abs((par.sys.relink_stiffexp + i.sys.relink_stiffexp) / 2)
-                        damprandom = ((par.sys.relink_damprand + i.sys.relink_damprand) / 2) * 2
-                        link.damping = ((par.sys.relink_damp + i.sys.relink_damp) / 2) * (((random() * damprandom) - (damprandom / 2)) + 1)
-                        brokrandom = ((par.sys.relink_brokenrand + i.sys.relink_brokenrand) / 2) * 2
-                        link.broken = ((par.sys.relink_broken + i.sys.relink_broken) / 2) * (((random() * brokrandom) - (brokrandom  / 2)) + 1)
-                        par.links.append(link)
-                        par.link_with.append(i)
-                        i.link_with.append(par)
-                        del link
-   
-    
-    #print("num link",len(par.links))
-    
-   
-class links:
-    def __init__(self):
-        self.lenght = "lenght of the link"
-        self.start = "first particle starting from"
-        self.end = "second particle ending with"
-        self.stiffness = "stiffness of the link"
-        self.exponent = "exponent of the stiffness"
-        self.damping = "damping of the link"
-        self.broken = "max stretch factor to link broken"
-    
-class ParSys:
-    def __init__(self,data):
-        global hashgrid
-        
-        self.parnum = data[0]
-        self.particle = [0] * self.parnum
-        self.sqsize_list = []
-        self.selfcollision_active = data[6][0]
-        self.othercollision_active = data[6][1]
-        self.collision_group = data[6][2]
-        self.links_active = data[6][3]
-        self.link_length = data[6][4]
-        self.link_stiff = data[6][5]
-        self.link_stiffrand = data[6][6]
-        self.link_stiffexp = data[6][7]
-        self.friction = data[6][8]
-        self.link_damp = data[6][9]
-        self.link_damprand = data[6][10]
-        self.link_broken = data[6][11]
-        self.link_brokenrand = data[6][12]
-        self.relink_group = data[6][13]
-        self.relink_chance = data[6][14]
-        self.relink_chancerand = data[6][15]
-        self.relink_stiff = data[6][16]
-        self.relink_stiffexp = data[6][17]
-        self.relink_stiffrand = data[6][18]
-        self.relink_damp = data[6][19]
-        self.relink_damprand = data[6][20]
-        self.relink_broken = data[6][21]
-        self.relink_brokenrand = data[6][22] 
-        
-        for i in range(self.parnum):
-            self.particle[i] = Particle()
-            self.particle[i].id = i
-            self.particle[i].loc = data[1][(i * 3):(i * 3 + 3)]
-            self.particle[i].vel = data[2][(i * 3):(i * 3 + 3)]
-            self.particle[i].size = data[3][i]
-            self.particle[i].sqsize = sq_number(self.particle[i].size)
-            if self.particle[i].sqsize not in self.sqsize_list:
-                self.sqsize_list.append(self.particle[i].sqsize)
-            self.particle[i].mass = data[4][i]
-            self.particle[i].state = data[5][i]
-            self.particle[i].sys = self
-            #print(self.particle[i].size,self.particle[i].sqsize)
-            
-        
-class Particle(ParSys):
-    def __init__(self):
-        self.id = 0
-        self.loc = [0,0,0]
-        self.vel = [0,0,0]
-        self.size = "is size"
-        self.sqsize = "near square number for hashing"
-        self.mass = "is mass"
-        self.state = "is alive state"
-        self.sys = "is parent system"
-        self.collided_with = []
-        self.links = []
-        self.link_with = []
-
-class KDTree:
-    root_node = "node on top"
-    nodes = []
-    result = []
-    index = 0
-    def create_nodes(self,parnum):
-        if self.nodes == []:
-            for i in range(parnum):
-                node = Nodes()
-                self.nodes.append(node)
-                self.index = 0
-    def create_tree(self,parlist,name,depth = 0):
-        if not parlist:
-            return None
-        
-        k = len(parlist[0].loc)
-        axis = depth % k
-        parlist.sort(key= lambda p: p.loc[axis])
-        median = int(len(parlist) / 2)
-        if depth == 0:
-            self.index = 0
-        node = self.nodes[self.index]
-        node.name = name
-        if parlist and depth == 0:
-            self.root_node = node
-        self.index += 1
-        node.particle = parlist[median]
-        node.left_child = self.create_tree(parlist[:median],"left" + str(depth+1),depth + 1)
-        node.right_child = self.create_tree(parlist[median + 1:],"right" + str(depth+1),depth + 1)
-        return node
-    
-    def rnn_query(self,point,dist):
-        self.result = []
-        if self.root_node == None:
-            return []
-        else:
-            sqdist = dist**2
-            #print("   distance to reach:",dist)
-            k = len(self.root_node.particle.loc)
-            self.rnn_search(self.root_node,point,dist,sqdist,k)
-            
-        return self.result
-            
-    def rnn_search(self,node,point,dist,sqdist,k,depth = 0):
-        
-        if node == None:
-            return None
-        
-        axis = depth % k
-        #print("    " + node.name + "(" + str(node.particle.id) + ")" + " viewed at " + str(square_dist(point,node.particle.loc,k)**0.5))
-
-        if (point[axis] - node.particle.loc[axis])**2 <= sqdist:
-            realdist = square_dist(point,node.particle.loc,k)
-            if realdist <= sqdist:
-                #print("    " + node.name + "(" + str(node.particle.id) + ")" + " added")
-                self.result.append((node,realdist))
-            self.rnn_search(node.left_child,point,dist,sqdist,k,depth + 1)
-            self.rnn_search(node.right_child,point,dist,sqdist,k,depth + 1)
-        
-        else:
-            if point[axis] <= node.particle.loc[axis]:
-                self.rnn_search(node.left_child,point,dist,sqdist,k,depth + 1)
-            if point[axis] >= node.particle.loc[axis]:
-                self.rnn_search(node.right_child,point,dist,sqdist,k,depth + 1)
-
-
-    def brute_query(self,point,dist):
-        self.result = []
-        k = len(point)
-        dist = dist**2
-        for i in self.nodes:
-            #print("    " + i.name + "(" + str(i.particle.id) + ")" + " viewed at " + str(square_dist(point,i.particle.loc,k)**0.5))
-            if square_dist(i.particle.loc,point,k) <= dist:
-                #print("    " + i.name + "(" + str(i.particle.id) + ")" + " added")
-                self.result.append(i)
-        return self.result
-
-
-
-class Nodes:
-    def __init__(self):
-        name = "node name"
-        loc = [0,0,0]
-        particle = "particle"
-        self.left_child = None
-        self.right_child = None
-   
-        
-def sq_number(val):
-    nearsq = 8
-    while val > nearsq or val < nearsq / 2:
-        if val > nearsq:
-            nearsq = nearsq * 2
-        elif val < nearsq / 2:
-            nearsq = nearsq / 2
-    return nearsq        
-
-def square_dist(point1,point2,k):
-    sq_dist = 0
-    for i in range(k):
-        sq_dist += (point1[i] - point2[i])**2
-    return sq_dist
-
-def cross_product(u,v):
-    cross = [(u[1] * v[2] - u[2] * v[1]),(u[2] * v[0] - u[0] * v[2]),(u[0] * v[1] - u[1] * v[0])]
-    return cross
-def dot_product(u,v):
-    dot = (u[0] * v[0]) + (u[1] * v[1]) + (u[2] * v[2])
-    return dot
+    return core.simulate(importdata)
+
+
+def memfree():
+    global core
+    core = None
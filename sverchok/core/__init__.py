@@ -11,7 +11,7 @@ root_modules = [
 
 core_modules = [
     "monad_properties", "sv_custom_exceptions",
-    "handlers", "update_system", "upgrade_nodes", "upgrade_group",
+    "handlers", "incremental_update", "update_system", "upgrade_nodes", "upgrade_group",
     "monad", "node_defaults"
 ]
 
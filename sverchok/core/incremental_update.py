@@ -0,0 +1,157 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Dirty-flag bookkeeping for incremental node tree evaluation.
+
+Each time a node is processed, we remember a fingerprint of everything
+its process() method can see: node properties, properties of unlinked
+input sockets, and the version of the data linked into each input socket
+(see socket_data.get_socket_version). On the next update, a node whose
+fingerprint did not change is skipped, and its previous outputs, which are
+still stored in socket_data_cache, are reused by downstream nodes.
+
+Nodes that read data from outside of the node tree (scene, objects,
+texts, network...) or that only have side effects (viewers) are always
+processed.
+"""
+
+import collections
+
+from sverchok import data_structure
+from sverchok.core.socket_data import get_socket_version, has_socket_data
+from sverchok.utils.logging import debug
+
+# node categories (sub-packages of sverchok.nodes) which depend on
+# blender scene or other external state and must always be processed
+always_process_categories = {
+    "scene", "script", "viz", "object_nodes", "network", "text", "layout"
+}
+
+# tree name -> {node name -> fingerprint}
+node_fingerprints = {}
+# tree name -> Counter with "hits" and "misses" of the last update
+update_stats = {}
+
+
+def _freeze(value):
+    """make something hashable out of ID property value"""
+    if hasattr(value, "to_dict"):
+        value = value.to_dict()
+    elif hasattr(value, "to_list"):
+        value = value.to_list()
+    return repr(value)
+
+
+def is_cacheable(node):
+    """
+    Check if the node's outputs depend only on its inputs and properties.
+    A node class can opt out explicitly by setting is_scene_dependent = True.
+    """
+    if getattr(node, "is_scene_dependent", False):
+        return False
+    if not node.outputs:
+        return False
+    parts = type(node).__module__.split(".")
+    if len(parts) > 2 and parts[1] == "nodes" and parts[2] in always_process_categories:
+        return False
+    return True
+
+
+def node_fingerprint(node):
+    """
+    Calculate fingerprint of node state and of the data linked to its inputs.
+    """
+    props = tuple((key, _freeze(value)) for key, value in node.items())
+    inputs = []
+    for socket in node.inputs:
+        if socket.is_linked:
+            other = socket.other
+            if other is None:
+                return None
+            inputs.append((socket.identifier, other.socket_id, get_socket_version(other)))
+        else:
+            inputs.append((socket.identifier, tuple((k, _freeze(v)) for k, v in socket.items())))
+    return (node.bl_idname, props, tuple(inputs))
+
+
+def outputs_available(node):
+    """all linked outputs of node still have their data in socket cache"""
+    return all(has_socket_data(socket) for socket in node.outputs if socket.is_linked)
+
+
+def check_node(node):
+    """
+    Decide if node has to be processed.
+    Returns a tuple (is_up_to_date, fingerprint); the fingerprint should be
+    passed to store_fingerprint() after the node was processed successfully.
+    """
+    if not is_cacheable(node):
+        return False, None
+    ng_name = node.id_data.name
+    stats = update_stats.setdefault(ng_name, collections.Counter())
+    fingerprint = node_fingerprint(node)
+    known = node_fingerprints.get(ng_name, {}).get(node.name)
+    if fingerprint is not None and fingerprint == known and outputs_available(node):
+        stats["hits"] += 1
+        return True, fingerprint
+    stats["misses"] += 1
+    return False, fingerprint
+
+
+def store_fingerprint(node, fingerprint):
+    if fingerprint is None:
+        return
+    node_fingerprints.setdefault(node.id_data.name, {})[node.name] = fingerprint
+
+
+def forget_node(node):
+    """
+    Make sure the node is processed on the next update,
+    for example because its last process() raised an exception.
+    """
+    node_fingerprints.get(node.id_data.name, {}).pop(node.name, None)
+
+
+def reset_fingerprints(ng=None):
+    """
+    Forget all fingerprints of the node group, or of all node groups.
+    """
+    if ng is None:
+        node_fingerprints.clear()
+    else:
+        node_fingerprints.pop(ng.name, None)
+
+
+def start_update(ng):
+    """reset hit / miss counters before new update of the node group"""
+    update_stats[ng.name] = collections.Counter()
+
+
+def get_update_stats(ng):
+    """
+    Return (hits, misses) of the last update of node group.
+    """
+    stats = update_stats.get(ng.name, {})
+    return stats.get("hits", 0), stats.get("misses", 0)
+
+
+def report_update_stats(ng):
+    if data_structure.DEBUG_MODE:
+        hits, misses = get_update_stats(ng)
+        debug("Incremental update of %s: %s nodes reused, %s nodes processed", ng.name, hits, misses)
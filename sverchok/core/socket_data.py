@@ -16,7 +16,13 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+import threading
+
+import bpy
+import numpy as np
+
 from sverchok import data_structure
+from sverchok.core.sv_custom_exceptions import SvSharedDataMutated
 from sverchok.utils.logging import warning, info
 
 #####################################
@@ -25,8 +31,23 @@ from sverchok.utils.logging import warning, info
 
 sentinel = object()
 
+# how many items _same_data compares at most before it gives up
+# and reports the data as changed
+SAME_DATA_MAX_ITEMS = 100000
+
 # socket cache
 socket_data_cache = {}
+# socket data versions, bumped each time new data is set to the socket,
+# used by incremental update to detect changed inputs
+socket_data_version = {}
+# socket data with numpy arrays converted to lists for nodes
+# which are not numpy aware: tree name -> {socket id: (version, data)}
+socket_data_lists_cache = {}
+
+# data which the node being processed got from its inputs without copy,
+# used to catch in-place changes of shared data (CHECK_SHARED_DATA mode);
+# thread local, as nodes can be processed in parallel
+_shared_reads = threading.local()
 
 # faster than builtin deep copy for us.
 # useful for our limited case
@@ -36,7 +57,11 @@ socket_data_cache = {}
 
 def sv_deep_copy(lst):
     """return deep copied data of list/tuple structure"""
+    if isinstance(lst, np.ndarray):
+        return lst.copy()
     if isinstance(lst, (list, tuple)):
+        if lst and isinstance(lst[0], np.ndarray):
+            return [sv_deep_copy(l) for l in lst]
         if lst and not isinstance(lst[0], (list, tuple)):
             return lst[:]
         return [sv_deep_copy(l) for l in lst]
@@ -77,16 +102,122 @@ def SvSetSocket(socket, out):
             warning("{} setting unconncted socket: {}".format(socket.node.name, socket.name))
     s_id = socket.socket_id
     s_ng = socket.id_data.name
-    if s_ng not in socket_data_cache:
-        socket_data_cache[s_ng] = {}
-    socket_data_cache[s_ng][s_id] = out
+    # setdefault, as nodes can be processed by several threads at once
+    ng_cache = socket_data_cache.setdefault(s_ng, {})
+    ng_version = socket_data_version.setdefault(s_ng, {})
+    old = ng_cache.get(s_id, sentinel)
+    if not (data_structure.INCREMENTAL_UPDATE and _same_data(old, out)):
+        ng_version[s_id] = ng_version.get(s_id, 0) + 1
+    ng_cache[s_id] = out
+
+
+def _same_data(old, new):
+    """
+    Check if new socket data equals to the old one,
+    so downstream nodes do not have to be processed again.
+    The check is cheap rather than complete: data which contains blender
+    objects or is bigger than SAME_DATA_MAX_ITEMS is always reported as changed.
+    """
+    if old is sentinel or old is new:
+        # the same object may have been changed in place
+        return False
+    return _same_items(old, new, [SAME_DATA_MAX_ITEMS])
+
+
+def _same_items(old, new, budget):
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, bpy.types.bpy_struct):
+        # blender objects compare equal even after the user has edited them
+        return False
+    if isinstance(old, np.ndarray):
+        budget[0] -= old.size
+        if budget[0] < 0 or old.shape != new.shape or old.dtype != new.dtype:
+            return False
+        return bool(np.array_equal(old, new))
+    if isinstance(old, (list, tuple)):
+        if len(old) != len(new):
+            return False
+        budget[0] -= len(old)
+        if budget[0] < 0:
+            return False
+        if old and not isinstance(old[0], (list, tuple, np.ndarray, bpy.types.bpy_struct)):
+            # flat list of numbers, compared in one go
+            try:
+                return bool(old == new)
+            except ValueError:
+                return False
+        return all(_same_items(o, n, budget) for o, n in zip(old, new))
+    try:
+        return bool(old == new)
+    except ValueError:
+        return False
+
+
+def get_socket_version(socket):
+    """
+    Return version of data stored for output socket;
+    0 means that no data was set yet.
+    """
+    return socket_data_version.get(socket.id_data.name, {}).get(socket.socket_id, 0)
+
+
+def has_socket_data(socket):
+    """check if there is data stored for output socket"""
+    return socket.socket_id in socket_data_cache.get(socket.id_data.name, {})
+
+
+def data_checksum(data):
+    """checksum of socket data contents, to detect in-place changes"""
+    if isinstance(data, np.ndarray):
+        return hash((data.shape, data.tobytes()))
+    if isinstance(data, (list, tuple)):
+        return hash(tuple(data_checksum(item) for item in data))
+    return hash(repr(data))
+
+
+def reset_shared_reads():
+    _shared_reads.items = []
+
+
+def check_shared_reads(node):
+    """
+    Raise SvSharedDataMutated if the node has changed data which
+    it got from input sockets with deepcopy=False.
+    """
+    reads = getattr(_shared_reads, "items", [])
+    _shared_reads.items = []
+    changed = [name for name, data, checksum in reads if data_checksum(data) != checksum]
+    if changed:
+        raise SvSharedDataMutated(node, changed)
+
+
+def get_lists_view(other, data):
+    """
+    Return numpy socket data of output socket `other' as plain lists,
+    converting only once per data version.
+    """
+    s_ng = other.id_data.name
+    s_id = other.socket_id
+    version = socket_data_version.get(s_ng, {}).get(s_id, 0)
+    ng_cache = socket_data_lists_cache.setdefault(s_ng, {})
+    cached = ng_cache.get(s_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    out = data_structure.numpy_to_lists(data)
+    ng_cache[s_id] = (version, out)
+    return out
 
 
-def SvGetSocket(socket, deepcopy=True):
+def SvGetSocket(socket, deepcopy=True, allow_numpy=False):
     """gets socket data from socket,
     if deep copy is True a deep copy is make_dep_dict,
     to increase performance if the node doesn't mutate input
-    set to False and increase performance substanstilly
+    set to False and increase performance substanstilly.
+    Data got with deepcopy=False is shared with the producer and
+    with other consumers, so it must be treated as read-only;
+    copy it with sv_deep_copy before changing it in place.
+    If allow_numpy is False, numpy arrays are converted to lists.
     """
     global socket_data_cache
     if socket.is_linked:
@@ -97,9 +228,15 @@ def SvGetSocket(socket, deepcopy=True):
             raise LookupError
         if s_id in socket_data_cache[s_ng]:
             out = socket_data_cache[s_ng][s_id]
+            if not allow_numpy and data_structure.has_numpy_data(out):
+                out = get_lists_view(other, out)
             if deepcopy:
                 return sv_deep_copy(out)
             else:
+                if data_structure.CHECK_SHARED_DATA:
+                    if not hasattr(_shared_reads, "items"):
+                        _shared_reads.items = []
+                    _shared_reads.items.append((socket.name, out, data_checksum(out)))
                 return out
         else:
             if data_structure.DEBUG_MODE:
@@ -161,3 +298,5 @@ def reset_socket_cache(ng):
     """
     global socket_data_cache
     socket_data_cache[ng.name] = {}
+    socket_data_version[ng.name] = {}
+    socket_data_lists_cache[ng.name] = {}
@@ -21,3 +21,15 @@ class SvNotFullyConnected(SvProcessingError):
 
     def __str__(self):
         return self.message
+
+
+class SvSharedDataMutated(SvProcessingError):
+
+    def __init__(self, node, sockets):
+        self.node = node
+        self.sockets = sockets
+        socket_names = ", ".join(sockets)
+        self.message = "Node changed data it got without copy from inputs: " + socket_names
+
+    def __str__(self):
+        return self.message
@@ -17,15 +17,20 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import collections
+import concurrent.futures
+import os
+import threading
 import time
 
 import bpy
 from mathutils import Vector
 
 from sverchok import data_structure
-from sverchok.core.socket_data import SvNoDataError, reset_socket_cache
+from sverchok.core import incremental_update
+from sverchok.core.socket_data import (
+    SvNoDataError, reset_socket_cache, reset_shared_reads, check_shared_reads)
 from sverchok.utils.logging import debug, info, warning, error, exception
-from sverchok.utils.profile import profile
+from sverchok.utils.profile import profile, is_tracing_enabled, start_trace_update, trace_node
 import sverchok
 
 import traceback
@@ -42,6 +47,9 @@ def update_error_colors(self, context):
     no_data_color = self.no_data_color[:]
     exception_color = self.exception_color[:]
 
+# worker threads for parallel update
+_executor = None
+
 # cache node group update trees
 update_cache = {}
 # cache for partial update lists
@@ -253,7 +261,10 @@ def do_update_heat_map(node_list, nodes):
         color_data = {node.name: (node.color[:], node.use_custom_color) for node in nodes}
         nodes.id_data.sv_user_colors = str(color_data)
 
-    times = do_update_general(node_list, nodes)
+    if data_structure.PARALLEL_UPDATE:
+        times = do_update_parallel(node_list, nodes)
+    else:
+        times = do_update_general(node_list, nodes)
     if not times:
         return
     t_max = max(times)
@@ -314,6 +325,12 @@ def do_update_general(node_list, nodes, procesed_nodes=set()):
     graph = []
     total_time = 0
     done_nodes = set(procesed_nodes)
+    incremental = data_structure.INCREMENTAL_UPDATE
+    if incremental:
+        incremental_update.start_update(nodes.id_data)
+    tracing = is_tracing_enabled()
+    if tracing:
+        trace_update = start_trace_update()
 
     for node_name in node_list:
         if node_name in done_nodes:
@@ -321,33 +338,209 @@ def do_update_general(node_list, nodes, procesed_nodes=set()):
         try:
             node = nodes[node_name]
             start = time.perf_counter()
+            cached = False
             if hasattr(node, "process"):
-                node.process()
+                if incremental:
+                    cached, fingerprint = incremental_update.check_node(node)
+                if not cached:
+                    process_node(node)
+                    if incremental:
+                        incremental_update.store_fingerprint(node, fingerprint)
             delta = time.perf_counter() - start
             total_time += delta
             if data_structure.DEBUG_MODE:
-                debug("Processed  %s in: %.4f", node_name, delta)
+                debug("%s  %s in: %.4f", "Reused" if cached else "Processed", node_name, delta)
             timings.append(delta)
             graph.append({"name" : node_name,
                            "bl_idname": node.bl_idname,
                            "start": start,
-                           "duration": delta})
+                           "duration": delta,
+                           "cached": cached})
+            if tracing:
+                trace_node(trace_update, node, start, delta, cached)
 
         except Exception as err:
             ng = nodes.id_data
+            if incremental and node_name in nodes:
+                incremental_update.forget_node(nodes[node_name])
             update_error_nodes(ng, node_name, err)
             #traceback.print_tb(err.__traceback__)
             exception("Node %s had exception: %s", node_name, err)
             return None
     graphs.append(graph)
+    if incremental:
+        incremental_update.report_update_stats(nodes.id_data)
     if data_structure.DEBUG_MODE:
         debug("Node set updated in: %.4f seconds", total_time)
     return timings
 
 
+def is_thread_safe(node):
+    """
+    Check if process() of the node can be run in a worker thread:
+    it must only work with socket data and never read or write blender data.
+    Blender data is not safe to access from other threads, so this is opt-in:
+    only node classes which set sv_thread_safe = True are run in parallel.
+    """
+    return getattr(node, "sv_thread_safe", False)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        workers = data_structure.PARALLEL_THREADS or os.cpu_count() or 1
+        _executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    return _executor
+
+
+def reset_executor():
+    """drop worker threads, to be recreated with new settings on next update"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def process_node(node):
+    """
+    Call node.process(); in CHECK_SHARED_DATA mode also check that the
+    node did not change data shared with other nodes.
+    """
+    if data_structure.CHECK_SHARED_DATA:
+        reset_shared_reads()
+        node.process()
+        check_shared_reads(node)
+    else:
+        node.process()
+
+
+def _process_node(node):
+    start = time.perf_counter()
+    process_node(node)
+    return start, time.perf_counter() - start, threading.get_ident()
+
+
+@profile(section="UPDATE")
+def do_update_parallel(node_list, nodes):
+    """
+    Update node set, walking the dependency graph instead of the flat list.
+    Each node is started as soon as all nodes it depends on are done;
+    thread safe nodes are run on worker threads, other nodes are run
+    on the main thread, one at a time, while the workers keep going.
+    If a node fails, nodes downstream of it are not processed.
+    Returns timings in order of node_list, or None if some node failed.
+    """
+    global graphs
+    ng = nodes.id_data
+    node_set = set(node_list)
+    deps = make_dep_dict(ng)
+    waiting = {name: {dep for dep in deps[name] if dep in node_set} for name in node_list}
+    dependents = collections.defaultdict(set)
+    for name, node_deps in waiting.items():
+        for dep in node_deps:
+            dependents[dep].add(name)
+
+    incremental = data_structure.INCREMENTAL_UPDATE
+    if incremental:
+        incremental_update.start_update(ng)
+    tracing = is_tracing_enabled()
+    if tracing:
+        trace_update = start_trace_update()
+
+    timings = {}
+    graph = []
+    failed = False
+    ready = collections.deque(name for name in node_list if not waiting[name])
+    main_thread_queue = collections.deque()
+    running = {}
+    executor = get_executor()
+    total_start = time.perf_counter()
+
+    def done(name, start, delta, cached=False, thread_id=None):
+        timings[name] = delta
+        graph.append({"name" : name,
+                       "bl_idname": nodes[name].bl_idname,
+                       "start": start,
+                       "duration": delta,
+                       "cached": cached})
+        if tracing:
+            trace_node(trace_update, nodes[name], start, delta, cached, thread_id)
+        if data_structure.DEBUG_MODE:
+            debug("%s  %s in: %.4f", "Reused" if cached else "Processed", name, delta)
+        for other in dependents[name]:
+            waiting[other].discard(name)
+            if not waiting[other]:
+                ready.append(other)
+
+    def fail(name, err):
+        nonlocal failed
+        failed = True
+        if incremental:
+            incremental_update.forget_node(nodes[name])
+        update_error_nodes(ng, name, err)
+        exception("Node %s had exception: %s", name, err)
+
+    while ready or main_thread_queue or running:
+        while ready:
+            name = ready.popleft()
+            node = nodes[name]
+            fingerprint = None
+            if not hasattr(node, "process"):
+                done(name, time.perf_counter(), 0.0)
+                continue
+            if incremental:
+                cached, fingerprint = incremental_update.check_node(node)
+                if cached:
+                    done(name, time.perf_counter(), 0.0, cached=True)
+                    continue
+            if is_thread_safe(node):
+                running[executor.submit(_process_node, node)] = (name, fingerprint)
+            else:
+                main_thread_queue.append((name, fingerprint))
+
+        if main_thread_queue:
+            name, fingerprint = main_thread_queue.popleft()
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(_process_node(nodes[name]))
+            except Exception as err:
+                future.set_exception(err)
+            results = [((name, fingerprint), future)]
+            # pick up workers that finished meanwhile, without waiting for the others
+            results += [(running.pop(future), future) for future in list(running) if future.done()]
+        elif running:
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            results = [(running.pop(future), future) for future in finished]
+        else:
+            break
+
+        for (name, fingerprint), future in results:
+            try:
+                start, delta, thread_id = future.result()
+            except Exception as err:
+                fail(name, err)
+                continue
+            if incremental:
+                incremental_update.store_fingerprint(nodes[name], fingerprint)
+            done(name, start, delta, thread_id=thread_id)
+
+    graphs.append(graph)
+    if incremental:
+        incremental_update.report_update_stats(ng)
+    if data_structure.DEBUG_MODE:
+        debug("Node set updated in parallel in: %.4f seconds", time.perf_counter() - total_start)
+    if failed:
+        return None
+    return [timings.get(name, 0.0) for name in node_list]
+
+
 def do_update(node_list, nodes):
+    # nested updates (monads, switch node) from worker threads stay serial
+    parallel = data_structure.PARALLEL_UPDATE and threading.current_thread() is threading.main_thread()
     if data_structure.HEAT_MAP:
         do_update_heat_map(node_list, nodes)
+    elif parallel:
+        do_update_parallel(node_list, nodes)
     else:
         do_update_general(node_list, nodes)
 
@@ -371,6 +564,7 @@ def build_update_list(ng=None):
         update_cache[ng.name] = out
         partial_update_cache[ng.name] = {}
         reset_socket_cache(ng)
+        incremental_update.reset_fingerprints(ng)
 
 
 def process_to_node(node):
@@ -450,8 +644,13 @@ def process_tree(ng=None):
         if not update_list:
             build_update_list(ng)
             update_list = update_cache.get(ng.name)
-        for l in update_list:
-            do_update(l, ng.nodes)
+        if data_structure.PARALLEL_UPDATE:
+            # separate node sets do not depend on each other,
+            # so they can be processed at the same time
+            do_update([name for l in update_list for name in l], ng.nodes)
+        else:
+            for l in update_list:
+                do_update(l, ng.nodes)
     else:
         pass
 
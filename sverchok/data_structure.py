@@ -29,6 +29,10 @@ from sverchok.utils.logging import info
 
 DEBUG_MODE = False
 HEAT_MAP = False
+INCREMENTAL_UPDATE = False
+PARALLEL_UPDATE = False
+PARALLEL_THREADS = 0
+CHECK_SHARED_DATA = False
 RELOAD_EVENT = False
 
 # this is set correctly later.
@@ -167,6 +171,28 @@ def fullList_deep_copy(l, count):
         l.extend([copy.deepcopy(l[-1]) for _ in range(d)]) 
     return
 
+def numpy_full_list(arr, count):
+    """numpy analog of fullList: returns array of length at least count,
+    padded with the last element of arr"""
+    arr = np.asarray(arr)
+    d = count - len(arr)
+    if d > 0:
+        return np.concatenate([arr, np.repeat(arr[-1:], d, axis=0)])
+    return arr
+
+def numpy_full_cycle(arr, count):
+    """returns array of length count, cycling elements of arr
+    (the way match_long_cycle does)"""
+    arr = np.asarray(arr)
+    if len(arr) == count:
+        return arr
+    return np.resize(arr, (count,) + arr.shape[1:])
+
+def numpy_match_long_repeat(arrays):
+    """numpy analog of match_long_repeat for arrays of one object"""
+    max_l = max(len(a) for a in arrays)
+    return [numpy_full_list(a, max_l) for a in arrays]
+
 def sv_zip(*iterables):
     """zip('ABCD', 'xy') --> Ax By
     like standard zip but list instead of tuple
@@ -183,6 +209,37 @@ def sv_zip(*iterables):
         yield result
 
 
+#####################################################
+############### numpy socket payloads ###############
+#####################################################
+
+# Socket data may keep numpy arrays as objects:
+#   vertices - list of arrays with shape (n, 3)
+#   numbers  - list of arrays with shape (n,)
+# Only the object level may be an array; nodes that are not numpy aware
+# get such data converted to nested lists, see SvGetSocket.
+
+def has_numpy_data(data):
+    """check if socket data keeps its objects as numpy arrays"""
+    if isinstance(data, np.ndarray):
+        return True
+    return isinstance(data, (list, tuple)) and len(data) > 0 and isinstance(data[0], np.ndarray)
+
+def numpy_to_list(arr):
+    """convert one array to sverchok nested lists, innermost level as tuples"""
+    if arr.ndim == 1:
+        return arr.tolist()
+    if arr.ndim == 2:
+        return list(map(tuple, arr.tolist()))
+    return [numpy_to_list(a) for a in arr]
+
+def numpy_to_lists(data):
+    """convert socket data with numpy arrays to plain sverchok data"""
+    if isinstance(data, np.ndarray):
+        return [numpy_to_list(obj) for obj in data]
+    return [numpy_to_list(obj) if isinstance(obj, np.ndarray) else obj for obj in data]
+
+
 #####################################################
 ################# list levels magic #################
 #####################################################
@@ -513,6 +570,10 @@ def setup_init():
     """
     global DEBUG_MODE
     global HEAT_MAP
+    global INCREMENTAL_UPDATE
+    global PARALLEL_UPDATE
+    global PARALLEL_THREADS
+    global CHECK_SHARED_DATA
     global SVERCHOK_NAME
     import sverchok
     SVERCHOK_NAME = sverchok.__name__
@@ -520,6 +581,10 @@ def setup_init():
     if addon:
         DEBUG_MODE = addon.preferences.show_debug
         HEAT_MAP = addon.preferences.heat_map
+        INCREMENTAL_UPDATE = addon.preferences.incremental_update
+        PARALLEL_UPDATE = addon.preferences.parallel_update
+        PARALLEL_THREADS = addon.preferences.parallel_threads
+        CHECK_SHARED_DATA = addon.preferences.check_shared_data
     else:
         print("Setup of preferences failed")
 
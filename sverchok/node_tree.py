@@ -287,9 +287,12 @@ class VerticesSocket(NodeSocket, SvSocketCommon):
         else:
             return {}
 
-    def sv_get(self, default=sentinel, deepcopy=True, implicit_conversions=None):
+    def sv_get(self, default=sentinel, deepcopy=True, implicit_conversions=None, allow_numpy=False):
         if self.is_linked and not self.is_output:
-            source_data = SvGetSocket(self, deepcopy = True if self.needs_data_conversion() else deepcopy)
+            if self.needs_data_conversion():
+                source_data = SvGetSocket(self, deepcopy=True)
+            else:
+                source_data = SvGetSocket(self, deepcopy=deepcopy, allow_numpy=allow_numpy)
             return self.convert_data(source_data, implicit_conversions)
 
         if self.prop_name:
@@ -409,12 +412,12 @@ class StringsSocket(NodeSocket, SvSocketCommon):
         else:
             return {}
 
-    def sv_get(self, default=sentinel, deepcopy=True, implicit_conversions=None):
+    def sv_get(self, default=sentinel, deepcopy=True, implicit_conversions=None, allow_numpy=False):
         # debug("Node %s, socket %s, is_linked: %s, is_output: %s",
         #         self.node.name, self.name, self.is_linked, self.is_output)
 
         if self.is_linked and not self.is_output:
-            return self.convert_data(SvGetSocket(self, deepcopy), implicit_conversions)
+            return self.convert_data(SvGetSocket(self, deepcopy, allow_numpy), implicit_conversions)
         elif self.prop_name:
             # to deal with subtype ANGLE, this solution should be considered temporary...
             _, prop_dict = getattr(self.node.rna_type, self.prop_name, (None, {}))
@@ -191,6 +191,9 @@ class SvImageComponentsNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Image Decompose'
     bl_icon = 'GROUP_VCOL'
 
+    # process() reads pixels from bpy.data.images
+    is_scene_dependent = True
+
     # node storage, reference by the hash of self.
     node_dict = {}
 
@@ -61,6 +61,9 @@ class SvOBJInsolationNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Object ID Insolation'
     bl_icon = 'OUTLINER_OB_EMPTY'
 
+    # process() evaluates the objects with to_mesh()
+    is_scene_dependent = True
+
     mode = BoolProperty(name='input mode', default=False, update=updateNode)
     #mode2 = BoolProperty(name='output mode', default=False, update=updateNode)
     sort_critical = IntProperty(name='sort_critical', default=12, min=1,max=24, update=updateNode)
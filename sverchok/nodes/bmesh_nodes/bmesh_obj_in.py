@@ -29,6 +29,9 @@ class SvBMObjinputNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'BMesh Obj in'
     bl_icon = 'OUTLINER_OB_EMPTY'
 
+    # process() reads the mesh data of the objects
+    is_scene_dependent = True
+
     UseSKey = BoolProperty(name='with_shapekey', default=False, update=updateNode)
     keyIND = IntProperty(name='SHKey_ind', default=0, update=updateNode)
 
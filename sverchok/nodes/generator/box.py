@@ -34,6 +34,7 @@ class SvBoxNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvBoxNode'
     bl_label = 'Box'
     bl_icon = 'MESH_CUBE'
+    sv_thread_safe = True
 
     Divx = IntProperty(
         name='Divx', description='divisions x',
@@ -30,6 +30,7 @@ class SvCircleNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvCircleNode'
     bl_label = 'Circle'
     bl_icon = 'MESH_CIRCLE'
+    sv_thread_safe = True
 
     rad_ = FloatProperty(name='Radius', description='Radius',
                          default=1.0,
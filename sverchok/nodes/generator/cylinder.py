@@ -92,6 +92,7 @@ class CylinderNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'CylinderNode'
     bl_label = 'Cylinder'
     bl_icon = 'MESH_CYLINDER'
+    sv_thread_safe = True
 
     radTop_ = FloatProperty(name='Radius Top',
                             default=1.0,
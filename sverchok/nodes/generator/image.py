@@ -29,6 +29,9 @@ class ImageNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Image'
     bl_icon = 'FILE_IMAGE'
 
+    # process() reads pixels from bpy.data.images
+    is_scene_dependent = True
+
 
     name_image = StringProperty(name='image_name', description='image name', default='', update=updateNode)
 
@@ -47,6 +47,7 @@ class SvLineNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvLineNodeMK2'
     bl_label = 'Line MK2'
     bl_icon = 'GRIP'
+    sv_thread_safe = True
 
     direction = EnumProperty(
         name="Direction", items=directionItems,
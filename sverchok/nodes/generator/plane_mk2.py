@@ -68,6 +68,7 @@ class SvPlaneNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvPlaneNodeMK2'
     bl_label = 'Plane MK2'
     bl_icon = 'MESH_PLANE'
+    sv_thread_safe = True
 
     def update_size_link(self, context):
         self.sizeRatio = self.sizex / self.sizey
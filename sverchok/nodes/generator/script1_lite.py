@@ -100,6 +100,9 @@ class SvScriptNodeLite(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Scripted Node Lite'
     bl_icon = 'SCRIPTPLUGINS'
 
+    # scripts can read anything from bpy
+    is_scene_dependent = True
+
     def custom_enum_func(self, context):
         ND = self.node_dict.get(hash(self))
         if ND:
@@ -67,6 +67,7 @@ class SphereNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SphereNode'
     bl_label = 'Sphere'
     bl_icon = 'MESH_UVSPHERE'
+    sv_thread_safe = True
 
     replacement_nodes = [('SvIcosphereNode', None, dict(Polygons='Faces'))]
 
@@ -125,6 +125,7 @@ class SvTorusNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvTorusNode'
     bl_label = 'Torus'
     bl_icon = 'MESH_TORUS'
+    sv_thread_safe = True
 
     def update_mode(self, context):
         # switch radii input sockets (R,r) <=> (eR,iR)
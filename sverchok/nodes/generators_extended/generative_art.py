@@ -292,6 +292,9 @@ class SvGenerativeArtNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Generative Art'
     bl_icon = 'OUTLINER_OB_EMPTY'
 
+    # process() reads the xml from bpy.data.texts
+    is_scene_dependent = True
+
     def updateNode_filename(self, context):
         self.process_node(context)
         self.read_xml()
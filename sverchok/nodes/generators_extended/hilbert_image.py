@@ -29,6 +29,9 @@ class HilbertImageNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Hilbert image'
     bl_icon = 'OUTLINER_OB_EMPTY'
 
+    # process() reads pixels from bpy.data.images
+    is_scene_dependent = True
+
     name_image = StringProperty(
         name='image_name', description='image name', update=updateNode)
 
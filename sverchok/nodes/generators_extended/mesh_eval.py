@@ -204,6 +204,9 @@ class SvMeshEvalNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Mesh Expression'
     bl_icon = 'OUTLINER_OB_EMPTY'
 
+    # process() reads the json from bpy.data.texts
+    is_scene_dependent = True
+
     def on_update(self, context):
         self.adjust_sockets()
         updateNode(self, context)
@@ -731,6 +731,9 @@ class SvProfileNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Profile Parametric'
     bl_icon = 'SYNTAX_ON'
 
+    # process() reads the profile from bpy.data.texts
+    is_scene_dependent = True
+
     SvLists = bpy.props.CollectionProperty(type=SvListGroup)
     SvSubLists = bpy.props.CollectionProperty(type=SvSublistGroup)
 
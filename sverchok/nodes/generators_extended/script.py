@@ -157,6 +157,9 @@ class SvScriptNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Scripted Node'
     bl_icon = 'SCRIPTPLUGINS'
 
+    # scripts can read anything from bpy
+    is_scene_dependent = True
+
     def avail_templates(self, context):
         fullpath = [sv_path, "node_scripts", "templates"]
         if not self.user_name == 'templates':
@@ -78,6 +78,9 @@ class SvScriptNodeMK3(SvScriptBase, bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Script 3 Node'
     bl_icon = 'SCRIPTPLUGINS'
 
+    # scripts can read anything from bpy
+    is_scene_dependent = True
+
 
     is_loaded = BoolProperty()
     script_name = StringProperty()
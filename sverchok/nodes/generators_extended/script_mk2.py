@@ -115,6 +115,9 @@ class SvScriptNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Script 2'
     bl_icon = 'SCRIPTPLUGINS'
 
+    # scripts can read anything from bpy
+    is_scene_dependent = True
+
     def avail_templates(self, context):
         templates_path = os.path.join(sv_path, "node_scripts", "SN2-templates")
         items = [(t, t, "") for t in next(os.walk(templates_path))[2]]
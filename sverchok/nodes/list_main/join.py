@@ -28,6 +28,7 @@ class ListJoinNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'ListJoinNode'
     bl_label = 'List Join'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     JoinLevel = IntProperty(name='JoinLevel', description='Choose join level of data (see help)',
                             default=1, min=1,
@@ -30,6 +30,7 @@ class ListLengthNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'ListLengthNode'
     bl_label = 'List Length'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     level = IntProperty(name='level_to_count',
                         default=1, min=0,
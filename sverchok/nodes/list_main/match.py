@@ -33,6 +33,7 @@ class ListMatchNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'ListMatchNode'
     bl_label = 'List Match'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     level = IntProperty(name='level', description='Choose level of data (see help)',
                         default=1, min=1,
@@ -19,8 +19,11 @@
 import bpy
 from bpy.props import BoolProperty
 from mathutils import Matrix, Vector
+import numpy as np
+
 from sverchok.node_tree import SverchCustomTreeNode
-from sverchok.data_structure import (Matrix_generate, updateNode)
+from sverchok.data_structure import (Matrix_generate, updateNode,
+                                     has_numpy_data, numpy_to_lists)
 from sverchok.utils.sv_mesh_utils import mesh_join
 
 
@@ -37,6 +40,10 @@ class SvMatrixApplyJoinNode(bpy.types.Node, SverchCustomTreeNode):
 
     do_join = BoolProperty(name='Join', default=True, update=updateNode)
 
+    output_numpy = BoolProperty(name='Output NumPy',
+                                description='Output NumPy arrays instead of lists',
+                                default=False, update=updateNode)
+
     def sv_init(self, context):
         self.inputs.new('VerticesSocket', "Vertices")
         self.inputs.new('StringsSocket', "Edges")
@@ -49,17 +56,27 @@ class SvMatrixApplyJoinNode(bpy.types.Node, SverchCustomTreeNode):
     def draw_buttons(self, context, layout):
         layout.prop(self, "do_join")
 
+    def draw_buttons_ext(self, context, layout):
+        self.draw_buttons(context, layout)
+        layout.prop(self, "output_numpy")
+
     def process(self):
         if not self.inputs['Matrices'].is_linked:
             return
-        vertices = self.inputs['Vertices'].sv_get()
+        vertices = self.inputs['Vertices'].sv_get(deepcopy=False, allow_numpy=True)
         matrices = self.inputs['Matrices'].sv_get()
       #  matrices = Matrix_generate(matrices)
         n = len(matrices)
-        result_vertices = (vertices*n)[:n]
+        result_vertices = (list(vertices)*n)[:n]
+        use_numpy = self.output_numpy or has_numpy_data(vertices)
         outV = []
         for i, i2 in zip(matrices, result_vertices):
-            outV.append([(i*Vector(v))[:] for v in i2])
+            if use_numpy:
+                m = np.array(i)
+                verts = np.asarray(i2, dtype=np.float64).reshape(-1, 3)
+                outV.append(verts @ m[:3, :3].T + m[:3, 3])
+            else:
+                outV.append([(i*Vector(v))[:] for v in i2])
         edges = self.inputs['Edges'].sv_get(default=[[]])
         faces = self.inputs['Faces'].sv_get(default=[[]])
         result_edges = (edges * n)[:n]
@@ -67,6 +84,8 @@ class SvMatrixApplyJoinNode(bpy.types.Node, SverchCustomTreeNode):
         if self.do_join:
             outV, result_edges, result_faces = mesh_join(outV, result_edges, result_faces)
             outV, result_edges, result_faces = [outV], [result_edges], [result_faces]
+        if use_numpy and not self.output_numpy:
+            outV = numpy_to_lists(outV)
         self.outputs['Edges'].sv_set(result_edges)
         self.outputs['Faces'].sv_set(result_faces)
         self.outputs['Vertices'].sv_set(outV)
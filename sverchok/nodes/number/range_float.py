@@ -67,6 +67,7 @@ class SvGenFloatRange(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvGenFloatRange'
     bl_label = 'Range Float'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     start_ = FloatProperty(
         name='start', description='start',
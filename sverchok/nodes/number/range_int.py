@@ -60,6 +60,7 @@ class GenListRangeInt(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'GenListRangeIntNode'
     bl_label = 'Range Int'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     start_ = IntProperty(
         name='start', description='start',
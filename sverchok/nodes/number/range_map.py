@@ -28,6 +28,7 @@ class SvMapRangeNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvMapRangeNode'
     bl_label = 'Map Range'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     old_min = FloatProperty(
         name='Old Min', description='Old Min',
@@ -112,6 +112,7 @@ class SvScalarMathNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     '''Scalar: Add, Sine... '''
     bl_idname = 'SvScalarMathNodeMK2'
     bl_label = 'Math MK2'
+    sv_thread_safe = True
     sv_icon = 'SV_FUNCTION'
 
     def mode_change(self, context):
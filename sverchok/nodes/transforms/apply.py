@@ -17,11 +17,14 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
+from bpy.props import BoolProperty
 from mathutils import Matrix, Vector
+import numpy as np
 
 from sverchok.node_tree import SverchCustomTreeNode, VerticesSocket, MatrixSocket
 from sverchok.data_structure import (Vector_generate, Vector_degenerate,
-                                     Matrix_generate, updateNode)
+                                     Matrix_generate, updateNode,
+                                     has_numpy_data, numpy_to_lists)
 
 
 class MatrixApplyNode(bpy.types.Node, SverchCustomTreeNode):
@@ -30,21 +33,42 @@ class MatrixApplyNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Matrix Apply (verts)'
     bl_icon = 'OUTLINER_OB_EMPTY'
 
+    output_numpy = BoolProperty(name='Output NumPy',
+                                description='Output NumPy arrays instead of lists',
+                                default=False, update=updateNode)
+
     def sv_init(self, context):
         self.inputs.new('VerticesSocket', "Vectors", "Vectors")
         self.inputs.new('MatrixSocket', "Matrixes", "Matrixes")
         self.outputs.new('VerticesSocket', "Vectors", "Vectors")
 
+    def draw_buttons_ext(self, context, layout):
+        layout.prop(self, 'output_numpy')
+
     def process(self):
         if self.outputs['Vectors'].is_linked:
-            vecs_ = self.inputs['Vectors'].sv_get(deepcopy=False)
-            vecs = Vector_generate(vecs_)
-
+            vecs_ = self.inputs['Vectors'].sv_get(deepcopy=False, allow_numpy=True)
             mats = self.inputs['Matrixes'].sv_get(deepcopy=False)
-            vectors_ = self.vecscorrect(vecs, mats)
-            vectors = Vector_degenerate(vectors_)
+
+            if self.output_numpy or has_numpy_data(vecs_):
+                vectors = self.vecscorrect_numpy(vecs_, mats)
+                if not self.output_numpy:
+                    vectors = numpy_to_lists(vectors)
+            else:
+                vecs = Vector_generate(vecs_)
+                vectors_ = self.vecscorrect(vecs, mats)
+                vectors = Vector_degenerate(vectors_)
             self.outputs['Vectors'].sv_set(vectors)
 
+    def vecscorrect_numpy(self, vecs, mats):
+        out = []
+        lengthve = len(vecs) - 1
+        for i, m in enumerate(mats):
+            verts = np.asarray(vecs[min(i, lengthve)], dtype=np.float64).reshape(-1, 3)
+            m = np.array(m)
+            out.append(verts @ m[:3, :3].T + m[:3, 3])
+        return out
+
     def vecscorrect(self, vecs, mats):
         out = []
         lengthve = len(vecs) - 1
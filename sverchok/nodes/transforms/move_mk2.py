@@ -19,8 +19,11 @@
 import bpy
 from mathutils import Vector
 from bpy.props import FloatProperty, BoolProperty
+import numpy as np
+
 from sverchok.node_tree import SverchCustomTreeNode, StringsSocket, VerticesSocket
-from sverchok.data_structure import updateNode
+from sverchok.data_structure import (updateNode, match_long_repeat, numpy_full_cycle,
+                                     has_numpy_data, numpy_to_lists)
 from sverchok.utils.sv_recursive import sv_recursive_transformations
 
 
@@ -38,9 +41,17 @@ class SvMoveNodeMK2(bpy.types.Node, SverchCustomTreeNode):
                             default=False,
                             update=updateNode)
 
+    output_numpy = BoolProperty(name='Output NumPy',
+                                description='Output NumPy arrays instead of lists',
+                                default=False, update=updateNode)
+
     def draw_buttons(self, context, layout):
         layout.prop(self, 'separate')
 
+    def draw_buttons_ext(self, context, layout):
+        self.draw_buttons(context, layout)
+        layout.prop(self, 'output_numpy')
+
     def sv_init(self, context):
         self.inputs.new('VerticesSocket', "vertices", "vertices")
         self.inputs.new('VerticesSocket', "vectors", "vectors")
@@ -49,14 +60,33 @@ class SvMoveNodeMK2(bpy.types.Node, SverchCustomTreeNode):
 
     def process(self):
         # inputs
-        vers = self.inputs['vertices'].sv_get()
-        vecs = self.inputs['vectors'].sv_get(default=[[[0.0, 0.0, 0.0]]])
-        mult = self.inputs['multiplier'].sv_get()
+        vers = self.inputs['vertices'].sv_get(deepcopy=False, allow_numpy=True)
+        vecs = self.inputs['vectors'].sv_get(default=[[[0.0, 0.0, 0.0]]], deepcopy=False, allow_numpy=True)
+        mult = self.inputs['multiplier'].sv_get(deepcopy=False, allow_numpy=True)
 
         if self.outputs[0].is_linked:
-            mov = sv_recursive_transformations(self.moving,vers,vecs,mult,self.separate)
+            use_numpy = self.output_numpy or any(map(has_numpy_data, (vers, vecs, mult)))
+            if use_numpy and not self.separate:
+                mov = self.moving_numpy(vers, vecs, mult)
+                if not self.output_numpy:
+                    mov = numpy_to_lists(mov)
+            else:
+                vers, vecs, mult = [numpy_to_lists(d) if has_numpy_data(d) else d for d in (vers, vecs, mult)]
+                mov = sv_recursive_transformations(self.moving,vers,vecs,mult,self.separate)
             self.outputs['vertices'].sv_set(mov)
 
+    def moving_numpy(self, vers, vecs, mult):
+        out = []
+        for v, c, m in zip(*match_long_repeat([vers, vecs, mult])):
+            v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+            c = np.asarray(c, dtype=np.float64).reshape(-1, 3)
+            m = np.asarray(m, dtype=np.float64).ravel()
+            # shorter lists are cycled, as sv_recursive_transformations does
+            n = max(len(v), len(c), len(m))
+            v, c, m = numpy_full_cycle(v, n), numpy_full_cycle(c, n), numpy_full_cycle(m, n)
+            out.append(v + c * m[:, np.newaxis])
+        return out
+
     def moving(self, v, c, m):
         #print('moving function test',v,c,m)
         return [(Vector(v) + Vector(c)*m)[:]]
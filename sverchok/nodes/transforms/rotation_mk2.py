@@ -142,23 +142,23 @@ class SvRotationNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     def process(self):
         # inputs
         if self.mode == 'AXIS':
-            Vertices = self.inputs['vertices'].sv_get()
-            Angle = self.inputs['angle'].sv_get()
-            Center = self.inputs['center'].sv_get(default=[[[0.0, 0.0, 0.0]]])
-            Axis = self.inputs['axis'].sv_get(default=[[[0.0, 0.0, 1.0]]])
+            Vertices = self.inputs['vertices'].sv_get(deepcopy=False)
+            Angle = self.inputs['angle'].sv_get(deepcopy=False)
+            Center = self.inputs['center'].sv_get(default=[[[0.0, 0.0, 0.0]]], deepcopy=False)
+            Axis = self.inputs['axis'].sv_get(default=[[[0.0, 0.0, 1.0]]], deepcopy=False)
             parameters = match_long_repeat([Vertices, Center, Axis, Angle])
 
         elif self.mode == 'EULER' or self.mode == 'QUAT':
-            Vertices = self.inputs['vertices'].sv_get()
-            X = self.inputs['X'].sv_get()[0]
-            Y = self.inputs['Y'].sv_get()[0]
-            Z = self.inputs['Z'].sv_get()[0]
+            Vertices = self.inputs['vertices'].sv_get(deepcopy=False)
+            X = self.inputs['X'].sv_get(deepcopy=False)[0]
+            Y = self.inputs['Y'].sv_get(deepcopy=False)[0]
+            Z = self.inputs['Z'].sv_get(deepcopy=False)[0]
 
             parameters = match_long_repeat([Vertices, X, Y, Z, [self.order]])
 
             if self.mode == 'QUAT':
                 if 'W' in self.inputs:
-                    W = self.inputs['W'].sv_get()[0]
+                    W = self.inputs['W'].sv_get(deepcopy=False)[0]
                 else:
                     W = [self.w_]
 
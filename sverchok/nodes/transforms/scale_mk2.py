@@ -51,9 +51,9 @@ class SvScaleNodeMK2(bpy.types.Node, SverchCustomTreeNode):
 
     def process(self):
         # inputs
-        vers = self.inputs['vertices'].sv_get()
-        vecs = self.inputs['centers'].sv_get(default=[[[0.0, 0.0, 0.0]]])
-        mult = self.inputs['multiplier'].sv_get()
+        vers = self.inputs['vertices'].sv_get(deepcopy=False)
+        vecs = self.inputs['centers'].sv_get(default=[[[0.0, 0.0, 0.0]]], deepcopy=False)
+        mult = self.inputs['multiplier'].sv_get(deepcopy=False)
 
         # outputs
         if self.outputs[0].is_linked:
@@ -37,6 +37,7 @@ class SvVectorLerp(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvVectorLerp'
     bl_label = 'Vector Lerp'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     factor_ = FloatProperty(
         name='factor', description='Step length',
@@ -94,6 +94,7 @@ class SvVectorMathNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvVectorMathNodeMK2'
     bl_label = 'Vector Math'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    sv_thread_safe = True
 
     def mode_change(self, context):
         self.update_sockets()
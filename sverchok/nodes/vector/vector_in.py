@@ -18,8 +18,10 @@
 
 import bpy
 from bpy.props import FloatProperty, BoolProperty, StringProperty
+import numpy as np
+
 from sverchok.node_tree import SverchCustomTreeNode
-from sverchok.data_structure import updateNode, fullList, fullList_deep_copy
+from sverchok.data_structure import updateNode, fullList, fullList_deep_copy, numpy_match_long_repeat
 from sverchok.utils.sv_itertools import sv_zip_longest
 
 class SvVectorFromCursor(bpy.types.Operator):
@@ -58,6 +60,10 @@ class GenVectorsNode(bpy.types.Node, SverchCustomTreeNode):
     
     advanced_mode = BoolProperty(name='deep copy', update=updateNode)
 
+    output_numpy = BoolProperty(name='Output NumPy',
+                                description='Output NumPy arrays instead of lists',
+                                default=False, update=updateNode)
+
     def sv_init(self, context):
         self.inputs.new('StringsSocket', "X").prop_name = 'x_'
         self.inputs.new('StringsSocket', "Y").prop_name = 'y_'
@@ -73,6 +79,7 @@ class GenVectorsNode(bpy.types.Node, SverchCustomTreeNode):
 
     def draw_buttons_ext(self, context, layout):
         layout.row().prop(self, 'advanced_mode')
+        layout.row().prop(self, 'output_numpy')
         
     def rclick_menu(self, context, layout):
         layout.prop(self, "advanced_mode", text="use deep copy")
@@ -81,6 +88,9 @@ class GenVectorsNode(bpy.types.Node, SverchCustomTreeNode):
         if not self.outputs['Vectors'].is_linked:
             return
         inputs = self.inputs
+        if self.output_numpy:
+            self.process_numpy()
+            return
         X_ = inputs['X'].sv_get()
         Y_ = inputs['Y'].sv_get()
         Z_ = inputs['Z'].sv_get()
@@ -102,6 +112,16 @@ class GenVectorsNode(bpy.types.Node, SverchCustomTreeNode):
 
         self.outputs['Vectors'].sv_set(series_vec)
 
+    def process_numpy(self):
+        inputs = self.inputs
+        data = [inputs[name].sv_get(deepcopy=False, allow_numpy=True) for name in 'XYZ']
+        max_obj = max(map(len, data))
+        series_vec = []
+        for i in range(max_obj):
+            xyz = [np.asarray(d[min(i, len(d) - 1)], dtype=np.float64).ravel() for d in data]
+            series_vec.append(np.column_stack(numpy_match_long_repeat(xyz)))
+        self.outputs['Vectors'].sv_set(series_vec)
+
 
 def register():
     bpy.utils.register_class(GenVectorsNode)
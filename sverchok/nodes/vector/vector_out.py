@@ -17,17 +17,27 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
+from bpy.props import BoolProperty
+import numpy as np
 
 from sverchok.node_tree import SverchCustomTreeNode
-from sverchok.data_structure import dataCorrect
+from sverchok.data_structure import dataCorrect, updateNode, has_numpy_data
 
 
 class VectorsOutNode(bpy.types.Node, SverchCustomTreeNode):
     ''' Vectors out '''
     bl_idname = 'VectorsOutNode'
     bl_label = 'Vector out'
+    sv_thread_safe = True
     sv_icon = 'SV_COMBINE_OUT'
 
+    output_numpy = BoolProperty(name='Output NumPy',
+                                description='Output NumPy arrays instead of lists',
+                                default=False, update=updateNode)
+
+    def draw_buttons_ext(self, context, layout):
+        layout.prop(self, 'output_numpy')
+
     def sv_init(self, context):
         self.inputs.new('VerticesSocket', "Vectors", "Vectors")
         self.outputs.new('StringsSocket', "X", "X")
@@ -37,19 +47,30 @@ class VectorsOutNode(bpy.types.Node, SverchCustomTreeNode):
     def process(self):
         # inputs
         if self.inputs['Vectors'].is_linked:
-            xyz = self.inputs['Vectors'].sv_get(deepcopy=False)
-
-            data = dataCorrect(xyz)
-            X, Y, Z = [], [], []
-            for obj in data:
-                x_, y_, z_ = (list(x) for x in zip(*obj))
-                X.append(x_)
-                Y.append(y_)
-                Z.append(z_)
+            xyz = self.inputs['Vectors'].sv_get(deepcopy=False, allow_numpy=True)
+
+            if has_numpy_data(xyz) or self.output_numpy:
+                X, Y, Z = self.split_numpy(xyz if has_numpy_data(xyz) else dataCorrect(xyz))
+            else:
+                data = dataCorrect(xyz)
+                X, Y, Z = [], [], []
+                for obj in data:
+                    x_, y_, z_ = (list(x) for x in zip(*obj))
+                    X.append(x_)
+                    Y.append(y_)
+                    Z.append(z_)
             for i, name in enumerate(['X', 'Y', 'Z']):
                 if self.outputs[name].is_linked:
                     self.outputs[name].sv_set([X, Y, Z][i])
 
+    def split_numpy(self, data):
+        X, Y, Z = [], [], []
+        for obj in data:
+            arr = np.asarray(obj, dtype=np.float64).reshape(-1, 3)
+            for out, column in zip((X, Y, Z), arr.T):
+                out.append(column if self.output_numpy else column.tolist())
+        return X, Y, Z
+
 
 def register():
     bpy.utils.register_class(VectorsOutNode)
@@ -0,0 +1,18 @@
+#!/bin/bash
+
+# If your blender is not available as just "blender" command, then you need
+# to specify path to blender when running this script, e.g.
+#
+# $ BLENDER=~/soft/blender-2.79/blender ./run_benchmarks.sh
+#
+# Extra arguments are passed to utils/benchmark.py, e.g.
+#
+# $ ./run_benchmarks.sh --repeats 5 --save-baseline
+#
+
+set -e
+
+BLENDER=${BLENDER:-blender}
+
+$BLENDER -b --addons sverchok --python utils/benchmark.py --python-exit-code 1 -- "$@"
+
@@ -7,6 +7,7 @@ from bpy.props import BoolProperty, FloatVectorProperty, EnumProperty, IntProper
 from sverchok import data_structure
 from sverchok.core import handlers
 from sverchok.core import update_system
+from sverchok.core.incremental_update import reset_fingerprints
 from sverchok.utils import sv_panels_tools, logging
 from sverchok.ui import color_def
 
@@ -18,9 +19,21 @@ class SverchokPreferences(AddonPreferences):
     def update_debug_mode(self, context):
         data_structure.DEBUG_MODE = self.show_debug
 
+    def update_check_shared_data(self, context):
+        data_structure.CHECK_SHARED_DATA = self.check_shared_data
+
     def update_heat_map(self, context):
         data_structure.heat_map_state(self.heat_map)
 
+    def update_incremental(self, context):
+        data_structure.INCREMENTAL_UPDATE = self.incremental_update
+        reset_fingerprints()
+
+    def update_parallel(self, context):
+        data_structure.PARALLEL_UPDATE = self.parallel_update
+        data_structure.PARALLEL_THREADS = self.parallel_threads
+        update_system.reset_executor()
+
     def set_frame_change(self, context):
         handlers.set_frame_change(self.frame_change_mode)
 
@@ -44,6 +57,12 @@ class SverchokPreferences(AddonPreferences):
         default=False, subtype='NONE',
         update=update_debug_mode)
 
+    check_shared_data = BoolProperty(
+        name="Check shared data",
+        description="Report nodes which change data got from inputs without copy (slow)",
+        default=False, subtype='NONE',
+        update=update_check_shared_data)
+
     no_data_color = FloatVectorProperty(
         name="No data", description='When a node can not get data',
         size=3, min=0.0, max=1.0,
@@ -73,11 +92,30 @@ class SverchokPreferences(AddonPreferences):
         size=3, min=0.0, max=1.0,
         default=(1, 1, 1), subtype='COLOR')
 
+    incremental_update = BoolProperty(
+        name="Incremental update",
+        description="Skip processing of nodes whose inputs and properties did not change since last update",
+        default=False, subtype='NONE',
+        update=update_incremental)
+
+    parallel_update = BoolProperty(
+        name="Parallel update",
+        description="Process independent nodes, which do not touch blender data, on several threads",
+        default=False, subtype='NONE',
+        update=update_parallel)
+
+    parallel_threads = IntProperty(
+        name="Threads",
+        description="Number of worker threads for parallel update, 0 means number of CPU cores",
+        default=0, min=0, max=256,
+        update=update_parallel)
+
     # Profiling settings
     profiling_sections = [
         ("NONE", "Disable", "Disable profiling", 0),
         ("MANUAL", "Marked methods only", "Profile only methods that are marked with @profile decorator", 1),
-        ("UPDATE", "Node tree update", "Profile whole node tree update process", 2)
+        ("UPDATE", "Node tree update", "Profile whole node tree update process", 2),
+        ("TRACE", "Per-node trace", "Record time, output sizes and cache hits of each node", 3)
     ]
 
     profile_mode = EnumProperty(name = "Profiling mode",
@@ -240,7 +278,13 @@ class SverchokPreferences(AddonPreferences):
             col2box.label(text="Debug:")
             col2box.prop(self, "profile_mode")
             col2box.prop(self, "show_debug")
+            col2box.prop(self, "check_shared_data")
             col2box.prop(self, "heat_map")
+            col2box.prop(self, "incremental_update")
+            parallel_row = col2box.row()
+            parallel_row.prop(self, "parallel_update")
+            if self.parallel_update:
+                parallel_row.prop(self, "parallel_threads")
             col2box.prop(self, "developer_mode")
 
             log_box = col2.box()
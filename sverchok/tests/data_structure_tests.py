@@ -33,6 +33,22 @@ class DataStructureTests(SverchokTestCase):
         fullList_deep_copy(data, 7)
         self.assertEquals(data, [[3], [2], [1], [1], [1], [1], [1]])    
 
+    def test_numpy_full_list(self):
+        data = np.array([[1, 2], [3, 4]])
+        output = numpy_full_list(data, 4)
+        self.assert_numpy_arrays_equal(output, np.array([[1, 2], [3, 4], [3, 4], [3, 4]]))
+
+    def test_numpy_full_cycle(self):
+        output = numpy_full_cycle(np.array([10, 11]), 5)
+        self.assert_numpy_arrays_equal(output, np.array([10, 11, 10, 11, 10]))
+
+    def test_numpy_to_lists(self):
+        data = [np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]), np.array([[7.0, 8.0, 9.0]])]
+        self.assertTrue(has_numpy_data(data))
+        output = numpy_to_lists(data)
+        self.assertEquals(output, [[(1.0, 2.0, 3.0), (4.0, 5.0, 6.0)], [(7.0, 8.0, 9.0)]])
+        self.assertFalse(has_numpy_data(output))
+
     def test_get_data_nesting_level_1(self):
         self.subtest_assert_equals(get_data_nesting_level(1), 0)
         self.subtest_assert_equals(get_data_nesting_level([]), 1)
@@ -0,0 +1,88 @@
+
+from sverchok.utils.testing import *
+from sverchok.utils.logging import debug, info
+from sverchok import data_structure
+from sverchok.core.incremental_update import node_fingerprint, is_cacheable, get_update_stats
+from sverchok.core.socket_data import _same_data
+from sverchok.core.update_system import do_update_general, make_update_list
+
+class IncrementalUpdateTests(EmptyTreeTestCase):
+
+    def test_fingerprint_follows_properties(self):
+        node = create_node("SvBoxNode", self.tree.name)
+        before = node_fingerprint(node)
+        self.assertEqual(before, node_fingerprint(node))
+
+        node.Divx = 3
+        self.assertNotEqual(before, node_fingerprint(node))
+
+    def test_viewer_is_not_cacheable(self):
+        box = create_node("SvBoxNode", self.tree.name)
+        viewer = create_node("ViewerNode2", self.tree.name)
+        self.assertTrue(is_cacheable(box))
+        self.assertFalse(is_cacheable(viewer))
+
+    def test_bpy_reading_nodes_are_not_cacheable(self):
+        for bl_idname in ["ImageNode", "SvScriptNodeLite", "SvScriptNodeMK2", "SvProfileNodeMK2"]:
+            with self.subTest(node=bl_idname):
+                node = create_node(bl_idname, self.tree.name)
+                self.assertFalse(is_cacheable(node))
+
+    def test_same_data(self):
+        self.assertTrue(_same_data([[1, 2, 3]], [[1, 2, 3]]))
+        self.assertFalse(_same_data([[1, 2, 3]], [[1, 2, 4]]))
+        self.assertFalse(_same_data([[1, 2, 3]], [[1, 2]]))
+
+        obj = bpy.data.objects.new("incremental_update_test", None)
+        try:
+            # the object may have been edited since the last update
+            self.assertFalse(_same_data([obj], [obj]))
+        finally:
+            bpy.data.objects.remove(obj)
+
+    def make_chain(self):
+        box = create_node("SvBoxNode", self.tree.name)
+        length = create_node("ListLengthNode", self.tree.name)
+        note = create_node("NoteNode", self.tree.name)
+        self.tree.links.new(box.outputs["Vers"], length.inputs["Data"])
+        self.tree.links.new(length.outputs["Length"], note.inputs[0])
+        return box, length
+
+    def update(self):
+        with unittest.mock.patch.object(data_structure, "INCREMENTAL_UPDATE", True):
+            do_update_general(make_update_list(self.tree), self.tree.nodes)
+
+    def count_process_calls(self, node, replacement=None):
+        cls = type(node)
+        side_effect = replacement or cls.process
+        return unittest.mock.patch.object(cls, "process", autospec=True, side_effect=side_effect)
+
+    def test_unchanged_upstream_skips_downstream(self):
+        box, length = self.make_chain()
+        self.update()
+
+        with self.count_process_calls(length) as process:
+            self.update()
+            process.assert_not_called()
+        hits, misses = get_update_stats(self.tree)
+        self.assertEqual(hits, 2)
+
+    def test_property_change_reprocesses_downstream(self):
+        box, length = self.make_chain()
+        self.update()
+
+        box.Divx = box.Divx + 1
+        with self.count_process_calls(length) as process:
+            self.update()
+            self.assertEqual(process.call_count, 1)
+
+    def test_bpy_reading_node_is_always_processed(self):
+        image = create_node("ImageNode", self.tree.name)
+        note = create_node("NoteNode", self.tree.name)
+        self.tree.links.new(image.outputs["vecs"], note.inputs[0])
+
+        with self.count_process_calls(image, lambda node: None) as process:
+            self.update()
+            self.update()
+            self.assertEqual(process.call_count, 2)
+
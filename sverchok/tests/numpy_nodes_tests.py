@@ -0,0 +1,102 @@
+
+import numpy as np
+from mathutils import Matrix
+
+from sverchok.utils.testing import *
+from sverchok.data_structure import numpy_to_lists
+
+# Nodes with a numpy code path must give the same results as
+# with plain lists: each test processes the node with list input,
+# then with "Output NumPy" on and with numpy arrays as input.
+
+VERTICES = [[(1.0, 2.0, 3.0), (4.0, 5.0, 6.0), (-1.0, 0.5, 2.0)], [(0.0, 0.0, 1.0)]]
+MATRICES = [Matrix.Translation((1.0, 0.0, 0.0)),
+            Matrix.Rotation(0.5, 4, 'Z') * Matrix.Scale(2.0, 4),
+            Matrix.Translation((0.0, 0.0, -2.0))]
+
+# source node and output socket for each type of input socket
+SOURCES = {"VerticesSocket": ("SvBoxNode", "Vers"),
+           "StringsSocket": ("SvBoxNode", "Edgs"),
+           "MatrixSocket": ("SvMatrixGenNodeMK2", "Matrix")}
+
+def as_numpy(data):
+    return [np.array(obj, dtype=np.float64) for obj in data]
+
+class NumpyPathTestCase(NodeProcessTestCase):
+
+    def set_input(self, input_name, data):
+        socket = self.node.inputs[input_name]
+        if not socket.is_linked:
+            node_type, output_name = SOURCES[socket.bl_idname]
+            source = create_node(node_type, self.tree.name)
+            self.tree.links.new(source.outputs[output_name], socket)
+        socket.other.sv_set(data)
+
+    def process(self, output_numpy, **inputs):
+        self.node.output_numpy = output_numpy
+        for name, data in inputs.items():
+            self.set_input(name, data)
+        self.node.process()
+        return {name: self.get_output_data(name) for name in self.connect_output_sockets}
+
+    def assert_same_data(self, data, expected):
+        data, expected = numpy_to_lists(data), numpy_to_lists(expected)
+        self.assertEqual(len(data), len(expected))
+        for obj, expected_obj in zip(data, expected):
+            self.assertTrue(np.allclose(np.array(obj, dtype=np.float64), np.array(expected_obj, dtype=np.float64)),
+                            "{} != {}".format(obj, expected_obj))
+
+    def assert_same_outputs(self, **inputs):
+        expected = self.process(False, **inputs)
+        numpy_inputs = {name: as_numpy(data) if name in self.numpy_inputs else data for name, data in inputs.items()}
+        for output_numpy, node_inputs in ((True, inputs), (False, numpy_inputs), (True, numpy_inputs)):
+            with self.subTest(output_numpy=output_numpy, numpy_input=node_inputs is numpy_inputs):
+                result = self.process(output_numpy, **node_inputs)
+                for name in self.connect_output_sockets:
+                    self.assert_same_data(result[name], expected[name])
+
+class MatrixApplyNumpyTest(NumpyPathTestCase):
+    node_bl_idname = "MatrixApplyNode"
+    connect_output_sockets = ["Vectors"]
+    numpy_inputs = ["Vectors"]
+
+    def test_numpy_path(self):
+        self.assert_same_outputs(Vectors=VERTICES, Matrixes=MATRICES)
+
+class MatrixApplyJoinNumpyTest(NumpyPathTestCase):
+    node_bl_idname = "SvMatrixApplyJoinNode"
+    connect_output_sockets = ["Vertices"]
+    numpy_inputs = ["Vertices"]
+
+    def test_numpy_path(self):
+        for do_join in (True, False):
+            with self.subTest(do_join=do_join):
+                self.node.do_join = do_join
+                self.assert_same_outputs(Vertices=VERTICES, Matrices=MATRICES)
+
+class MoveNumpyTest(NumpyPathTestCase):
+    node_bl_idname = "SvMoveNodeMK2"
+    connect_output_sockets = ["vertices"]
+    numpy_inputs = ["vertices", "vectors", "multiplier"]
+
+    def test_numpy_path(self):
+        self.assert_same_outputs(vertices=VERTICES,
+                                 vectors=[[(1.0, 0.0, 0.0), (0.0, 1.0, 0.0)]],
+                                 multiplier=[[1.0, 2.0, 0.5]])
+
+class VectorInNumpyTest(NumpyPathTestCase):
+    node_bl_idname = "GenVectorsNode"
+    connect_output_sockets = ["Vectors"]
+    numpy_inputs = ["X", "Y", "Z"]
+
+    def test_numpy_path(self):
+        self.assert_same_outputs(X=[[1.0, 2.0, 3.0], [5.0]], Y=[[4.0]], Z=[[0.0, 1.0]])
+
+class VectorOutNumpyTest(NumpyPathTestCase):
+    node_bl_idname = "VectorsOutNode"
+    connect_output_sockets = ["X", "Y", "Z"]
+    numpy_inputs = ["Vectors"]
+
+    def test_numpy_path(self):
+        self.assert_same_outputs(Vectors=VERTICES)
+
@@ -0,0 +1,46 @@
+
+import numpy as np
+
+from sverchok.utils.testing import *
+from sverchok import data_structure
+from sverchok.core.update_system import process_node
+from sverchok.core.sv_custom_exceptions import SvSharedDataMutated
+
+class SharedDataCheckTests(EmptyTreeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.box = create_node("SvBoxNode", self.tree.name)
+        self.reader = create_node("SvVectorMathNodeMK2", self.tree.name)
+        self.tree.links.new(self.box.outputs["Vers"], self.reader.inputs["A"])
+        self.box.process()
+
+    def process_reader(self, process):
+        # runs process(node) instead of the reader's process(), with the check enabled
+        with unittest.mock.patch.object(data_structure, "CHECK_SHARED_DATA", True):
+            with unittest.mock.patch.object(type(self.reader), "process", autospec=True, side_effect=process):
+                process_node(self.reader)
+
+    def test_read_only_access_passes(self):
+        self.process_reader(lambda node: node.inputs["A"].sv_get(deepcopy=False))
+
+    def test_mutated_shared_output_is_detected(self):
+        def process(node):
+            node.inputs["A"].sv_get(deepcopy=False)[0].reverse()
+
+        with self.assertRaises(SvSharedDataMutated) as ctx:
+            self.process_reader(process)
+        self.assertEqual(ctx.exception.sockets, ["A"])
+
+    def test_mutated_shared_array_is_detected(self):
+        self.box.outputs["Vers"].sv_set([np.zeros((8, 3))])
+
+        def process(node):
+            node.inputs["A"].sv_get(deepcopy=False, allow_numpy=True)[0][0, 0] = 1.0
+
+        with self.assertRaises(SvSharedDataMutated):
+            self.process_reader(process)
+
+    def test_copied_data_can_be_changed(self):
+        self.process_reader(lambda node: node.inputs["A"].sv_get()[0].reverse())
+
@@ -0,0 +1,73 @@
+
+import csv
+import json
+import os
+import tempfile
+
+from sverchok.utils.testing import *
+from sverchok.utils import profile
+from sverchok.core import update_system
+from sverchok.core.update_system import do_update_general, make_update_list
+
+class TraceExportTests(EmptyTreeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        box = self.box = create_node("SvBoxNode", self.tree.name)
+        length = create_node("ListLengthNode", self.tree.name)
+        note = create_node("NoteNode", self.tree.name)
+        self.tree.links.new(box.outputs["Vers"], length.inputs["Data"])
+        self.tree.links.new(length.outputs["Length"], note.inputs[0])
+
+        profile.reset_trace()
+        with unittest.mock.patch.object(update_system, "is_tracing_enabled", return_value=True):
+            do_update_general(make_update_list(self.tree), self.tree.nodes)
+
+    def tearDown(self):
+        profile.reset_trace()
+        super().tearDown()
+
+    def saved_trace(self, save, suffix):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        try:
+            save(path)
+            with open(path, newline='') as f:
+                if suffix == ".csv":
+                    return list(csv.DictReader(f))
+                return json.load(f)
+        finally:
+            os.remove(path)
+
+    def test_chrome_trace(self):
+        trace = self.saved_trace(profile.save_chrome_trace, ".json")
+        self.assertEqual(trace["displayTimeUnit"], "ms")
+        events = {event["cat"]: event for event in trace["traceEvents"]}
+        self.assertEqual(set(events), {"SvBoxNode", "ListLengthNode", "NoteNode"})
+
+        box = events["SvBoxNode"]
+        self.assertEqual(box["ph"], "X")
+        self.assertEqual(box["name"], self.box.name)
+        self.assertGreaterEqual(box["ts"], 0)
+        self.assertGreaterEqual(box["dur"], 0)
+        self.assertEqual(set(box["args"]), {"tree", "update", "cached", "elements", "bytes"})
+        self.assertEqual(box["args"]["tree"], self.tree.name)
+        self.assertEqual(box["args"]["update"], 1)
+        self.assertFalse(box["args"]["cached"])
+        # at least the 8 vertices of the box, 3 coordinates each
+        self.assertGreaterEqual(box["args"]["elements"], 8 * 3)
+        self.assertGreater(box["args"]["bytes"], 0)
+
+    def test_csv_trace(self):
+        rows = self.saved_trace(profile.save_csv_trace, ".csv")
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(list(rows[0]), ["update", "tree", "node", "bl_idname", "start", "duration",
+                                         "cached", "elements", "bytes", "thread"])
+        # rows are in update order
+        self.assertEqual([row["bl_idname"] for row in rows], ["SvBoxNode", "ListLengthNode", "NoteNode"])
+        length = rows[1]
+        self.assertEqual(length["update"], "1")
+        self.assertGreater(int(length["elements"]), 0)
+        self.assertEqual(length["cached"], "False")
+        self.assertGreaterEqual(float(length["duration"]), 0)
+
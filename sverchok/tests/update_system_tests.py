@@ -1,10 +1,12 @@
 
 import collections
+import threading
 import unittest
 
 from sverchok.utils.testing import *
 from sverchok.utils.logging import debug, info
-from sverchok.core.update_system import make_dep_dict, make_update_list
+from sverchok.core.update_system import make_dep_dict, make_update_list, do_update_general, do_update_parallel
+from sverchok.core.socket_data import get_output_socket_data, reset_socket_cache
 #from sverchok.tests.mocks import *
 
 class UpdateSystemTests(ReferenceTreeTestCase):
@@ -35,3 +37,56 @@ class UpdateSystemTests(ReferenceTreeTestCase):
                 dep_idx = result.index(dep)
                 self.assertTrue(dep_idx < node_idx)
 
+class ParallelUpdateTests(EmptyTreeTestCase):
+
+    def make_tree(self):
+        # thread safe nodes around ListReverseNode, which has to run on the main thread
+        box = create_node("SvBoxNode", self.tree.name)
+        circle = create_node("SvCircleNode", self.tree.name)
+        line = create_node("SvLineNodeMK2", self.tree.name)
+        add = create_node("SvVectorMathNodeMK2", self.tree.name)
+        reverse = create_node("ListReverseNode", self.tree.name)
+        length = create_node("ListLengthNode", self.tree.name)
+        box_length = create_node("ListLengthNode", self.tree.name)
+        links = self.tree.links
+        links.new(circle.outputs["Vertices"], add.inputs["A"])
+        links.new(line.outputs["Vertices"], add.inputs["B"])
+        links.new(add.outputs["Out"], reverse.inputs["data"])
+        links.new(reverse.outputs["data"], length.inputs["Data"])
+        links.new(box.outputs["Vers"], box_length.inputs["Data"])
+        for node in (length, box_length):
+            note = create_node("NoteNode", self.tree.name)
+            links.new(node.outputs["Length"], note.inputs[0])
+
+    def get_outputs(self):
+        result = {}
+        for node in self.tree.nodes:
+            for socket in node.outputs:
+                if socket.is_linked:
+                    result[(node.name, socket.name)] = get_output_socket_data(node, socket.name)
+        return result
+
+    def test_parallel_update_matches_serial(self):
+        self.make_tree()
+        node_list = make_update_list(self.tree)
+        do_update_general(node_list, self.tree.nodes)
+        expected = self.get_outputs()
+        self.assertEqual(len(expected), 7)
+
+        reset_socket_cache(self.tree)
+        self.assertIsNotNone(do_update_parallel(node_list, self.tree.nodes))
+        self.assertEqual(self.get_outputs(), expected)
+
+    def test_unsafe_node_runs_on_main_thread(self):
+        self.make_tree()
+        reverse = [node for node in self.tree.nodes if node.bl_idname == "ListReverseNode"][0]
+        threads = []
+
+        def process(node):
+            threads.append(threading.current_thread())
+            original(node)
+
+        original = type(reverse).process
+        with unittest.mock.patch.object(type(reverse), "process", autospec=True, side_effect=process):
+            do_update_parallel(make_update_list(self.tree), self.tree.nodes)
+        self.assertEqual(threads, [threading.main_thread()])
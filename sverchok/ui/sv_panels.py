@@ -292,6 +292,10 @@ class SverchokToolsMenu(bpy.types.Panel):
                 row.operator("node.sverchok_profile_dump", text="Dump data", icon="TEXT")
                 row.operator("node.sverchok_profile_save", text="Save data", icon="SAVE_AS")
                 profile_col.operator("node.sverchok_profile_reset", text="Reset data", icon="X")
+            if profile.have_trace_events():
+                row = profile_col.row(align=True)
+                row.operator("node.sverchok_trace_save", text="Save trace", icon="SAVE_AS")
+                row.operator("node.sverchok_trace_reset", text="Reset trace", icon="X")
 
         row = layout.row(align=True)
         col = row.column(align=True)
@@ -0,0 +1,220 @@
+# This file is part of project Sverchok. It's copyrighted by the contributors
+# recorded in the version control history of the file, available from
+# its original location https://github.com/nortikin/sverchok/commit/master
+#
+# SPDX-License-Identifier: GPL3
+# License-Filename: LICENSE
+
+"""
+Headless benchmark of node tree evaluation speed.
+
+Every layout from json_examples is imported into a temporary tree and
+evaluated several times:
+
+* cold - socket cache and update lists are rebuilt before each run,
+* warm - the tree is processed again with caches (and incremental
+  update) left in place.
+
+Median timings per tree and per node are compared against a stored
+baseline, and trees that got slower than the threshold are reported.
+Usage (see also run_benchmarks.sh):
+
+    blender -b --addons sverchok --python utils/benchmark.py -- \
+        [--repeats N] [--threshold 0.2] [--baseline path] [--save-baseline]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from os.path import basename, dirname, join
+from pathlib import Path
+
+import bpy
+
+import sverchok
+from sverchok import data_structure
+from sverchok.core import update_system
+from sverchok.utils.logging import info, warning, exception
+from sverchok.utils.sv_IO_panel_tools import import_tree
+from sverchok.utils.sv_examples_utils import examples_paths
+
+# examples which need .blend data or 3rd party modules,
+# the same as in tests/tree_import_tests.py
+BENCHMARK_BLACKLIST = [
+    "GreacePencil_injection.json",
+    "pointsONface_gather_lines.json",
+    "Generative_Art_Lsystem.json",
+    "Elfnor_topology_nodes.json",
+    "l-systems.json"
+]
+
+BENCHMARK_TREE_NAME = "BenchmarkTree"
+
+# timings shorter than this are too noisy to be compared
+MIN_COMPARED_TIME = 0.005
+
+
+def get_default_baseline_path():
+    return join(dirname(sverchok.__file__), "tests", "references", "benchmark_baseline.json")
+
+
+def list_examples():
+    """
+    Yield (name, path) of all JSON examples.
+    """
+    for category in sorted(examples_paths):
+        for path in sorted(Path(examples_paths[category]).iterdir()):
+            name = basename(str(path))
+            if not name.endswith(".json") or name in BENCHMARK_BLACKLIST:
+                continue
+            yield "{}/{}".format(category, name), str(path)
+
+
+def node_timings():
+    """
+    Return {node name: duration} of the last update,
+    taken from update_system.graphs.
+    """
+    result = {}
+    for graph in update_system.graphs:
+        for record in graph:
+            result[record["name"]] = result.get(record["name"], 0.0) + record["duration"]
+    return result
+
+
+def run_once(tree, cold):
+    if cold:
+        update_system.build_update_list(tree)
+    start = time.perf_counter()
+    update_system.process_tree(tree)
+    return time.perf_counter() - start, node_timings()
+
+
+def summarize(runs):
+    """
+    Median of total times and of per-node times for a list of runs.
+    """
+    total = statistics.median(t for t, _ in runs)
+    node_names = set()
+    for _, nodes in runs:
+        node_names.update(nodes.keys())
+    nodes = {name: statistics.median(n.get(name, 0.0) for _, n in runs) for name in node_names}
+    return {"total": total, "nodes": nodes}
+
+
+def benchmark_tree(path, repeats):
+    """
+    Import one JSON layout and time its evaluation.
+    """
+    tree = bpy.data.node_groups.new(name=BENCHMARK_TREE_NAME, type="SverchCustomTreeType")
+    try:
+        tree.sv_process = False
+        import_tree(tree, path)
+        tree.sv_process = True
+
+        cold_runs = [run_once(tree, cold=True) for _ in range(repeats)]
+        warm_runs = [run_once(tree, cold=False) for _ in range(repeats)]
+        return {"cold": summarize(cold_runs), "warm": summarize(warm_runs)}
+    finally:
+        bpy.data.node_groups.remove(tree)
+
+
+def run_benchmarks(repeats=3):
+    """
+    Benchmark all JSON examples.
+    Returns {example name: {"cold": ..., "warm": ...}}.
+    """
+    results = {}
+    saved_incremental = data_structure.INCREMENTAL_UPDATE
+    data_structure.INCREMENTAL_UPDATE = True
+    try:
+        for name, path in list_examples():
+            info("Benchmarking: %s", name)
+            try:
+                results[name] = benchmark_tree(path, repeats)
+            except Exception as e:
+                exception("Benchmark of %s failed: %s", name, e)
+    finally:
+        data_structure.INCREMENTAL_UPDATE = saved_incremental
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Compare results with baseline.
+    Returns list of (example, mode, node or None, baseline time, current time)
+    for everything that got slower by more than threshold (0.2 means 20%).
+    """
+    regressions = []
+
+    def check(name, mode, node, old, new):
+        if max(old, new) < MIN_COMPARED_TIME:
+            return
+        if new > old * (1.0 + threshold):
+            regressions.append((name, mode, node, old, new))
+
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for mode in ("cold", "warm"):
+            old, new = baseline[name][mode], result[mode]
+            check(name, mode, None, old["total"], new["total"])
+            for node, new_time in sorted(new["nodes"].items()):
+                if node in old["nodes"]:
+                    check(name, mode, node, old["nodes"][node], new_time)
+    return regressions
+
+
+def report(results, regressions):
+    lines = ["{:<60} {:>10} {:>10}".format("Example", "cold, ms", "warm, ms")]
+    for name, result in sorted(results.items()):
+        lines.append("{:<60} {:>10.2f} {:>10.2f}".format(
+            name, result["cold"]["total"] * 1000, result["warm"]["total"] * 1000))
+    info("Benchmark results:\n%s", "\n".join(lines))
+
+    for name, mode, node, old, new in regressions:
+        what = name if node is None else "{} / node {}".format(name, node)
+        warning("Regression (%s): %s: %.2f ms -> %.2f ms", mode, what, old * 1000, new * 1000)
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    info("Benchmark baseline saved to %s", path)
+
+
+def parse_args(argv):
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    else:
+        argv = []
+    parser = argparse.ArgumentParser(description="Sverchok node tree evaluation benchmark")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of runs of each tree")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown (0.2 means 20%%)")
+    parser.add_argument("--baseline", default=get_default_baseline_path(), help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as new baseline")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        args = parse_args(sys.argv)
+        results = run_benchmarks(args.repeats)
+        regressions = find_regressions(results, load_baseline(args.baseline), args.threshold)
+        report(results, regressions)
+        if args.save_baseline:
+            save_baseline(args.baseline, results)
+        sys.exit(1 if regressions and not args.save_baseline else 0)
+    except Exception as e:
+        print(e)
+        sys.exit(1)
@@ -17,12 +17,19 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import cProfile
+import csv
+import json
 import pstats
+import sys
+import threading
 from io import StringIO
 
+import numpy as np
+
 import bpy
 from bpy.props import BoolProperty, EnumProperty
 
+from sverchok.core.socket_data import socket_data_cache
 from sverchok.utils.logging import info, debug
 from sverchok.utils.context_managers import sv_preferences
 
@@ -32,6 +39,10 @@ _global_profile = None
 _profile_nesting = 0
 # Whether the profiling is enabled by "Start profiling" toggle
 is_currently_enabled = False
+# Per-node records gathered in "TRACE" profiling mode
+_trace_events = []
+# Number of node set updates traced so far
+_trace_update_count = 0
 
 def get_global_profile():
     """
@@ -151,6 +162,116 @@ def have_gathered_stats():
     else:
         return False
 
+def is_tracing_enabled():
+    """
+    Check if per-node tracing is active.
+    """
+    return is_profiling_enabled("TRACE")
+
+def data_size(data):
+    """
+    Return number of leaf elements and approximate size in bytes
+    of socket data.
+    """
+    if isinstance(data, np.ndarray):
+        return data.size, data.nbytes
+    if isinstance(data, (list, tuple)):
+        count, size = 0, sys.getsizeof(data)
+        for item in data:
+            item_count, item_size = data_size(item)
+            count += item_count
+            size += item_size
+        return count, size
+    return 1, sys.getsizeof(data)
+
+def start_trace_update():
+    """
+    Mark start of update of one node set; returns index of the update.
+    """
+    global _trace_update_count
+    _trace_update_count += 1
+    return _trace_update_count
+
+def trace_node(update_index, node, start, duration, cached=False, thread_id=None):
+    """
+    Record one processed (or reused) node.
+    """
+    tree_name = node.id_data.name
+    tree_cache = socket_data_cache.get(tree_name, {})
+    elements, size = 0, 0
+    for socket in node.outputs:
+        data = tree_cache.get(socket.socket_id)
+        if data is not None:
+            socket_elements, socket_size = data_size(data)
+            elements += socket_elements
+            size += socket_size
+    _trace_events.append({
+            "update": update_index,
+            "tree": tree_name,
+            "node": node.name,
+            "bl_idname": node.bl_idname,
+            "start": start,
+            "duration": duration,
+            "cached": cached,
+            "elements": elements,
+            "bytes": size,
+            "thread": thread_id if thread_id is not None else threading.get_ident()
+        })
+
+def have_trace_events():
+    return len(_trace_events) > 0
+
+def reset_trace():
+    global _trace_update_count
+    _trace_events.clear()
+    _trace_update_count = 0
+
+def save_chrome_trace(path):
+    """
+    Save recorded trace in Chrome trace-event format,
+    to be opened in chrome://tracing or similar viewers.
+    """
+    if not _trace_events:
+        info("There are no trace records yet")
+        return
+    origin = min(event["start"] for event in _trace_events)
+    events = []
+    for event in _trace_events:
+        events.append({
+                "name": event["node"],
+                "cat": event["bl_idname"],
+                "ph": "X",
+                "ts": (event["start"] - origin) * 1e6,
+                "dur": event["duration"] * 1e6,
+                "pid": 1,
+                "tid": event["thread"],
+                "args": {
+                    "tree": event["tree"],
+                    "update": event["update"],
+                    "cached": event["cached"],
+                    "elements": event["elements"],
+                    "bytes": event["bytes"]
+                }
+            })
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    info("Trace of %s node updates saved to %s.", len(events), path)
+
+def save_csv_trace(path):
+    """
+    Save recorded trace as flat CSV table, one row per node update.
+    """
+    if not _trace_events:
+        info("There are no trace records yet")
+        return
+    fields = ["update", "tree", "node", "bl_idname", "start", "duration",
+              "cached", "elements", "bytes", "thread"]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(_trace_events)
+    info("Trace of %s node updates saved to %s.", len(_trace_events), path)
+
 class SvProfilingToggle(bpy.types.Operator):
     """Toggle profiling on/off"""
     bl_idname = "node.sverchok_profile_toggle"
@@ -223,7 +344,50 @@ class SvProfileReset(bpy.types.Operator):
         info("Profiling statistics data cleared.")
         return {'FINISHED'}
     
-classes = [SvProfilingToggle, SvProfileDump, SvProfileSave, SvProfileReset]
+class SvTraceSave(bpy.types.Operator):
+    """Save per-node trace to file"""
+    bl_idname = "node.sverchok_trace_save"
+    bl_label = "Save per-node trace"
+    bl_options = {'INTERNAL'}
+
+    formats = [
+            ("CHROME", "Chrome trace", "Chrome trace-event JSON, for chrome://tracing", 0),
+            ("CSV", "CSV", "Flat CSV table", 1)
+        ]
+
+    format = EnumProperty(name = "Format",
+            description = "File format",
+            items = formats,
+            default = "CHROME")
+
+    filepath = bpy.props.StringProperty(subtype="FILE_PATH")
+
+    def draw(self, context):
+        self.layout.prop(self, "format")
+
+    def execute(self, context):
+        if self.format == "CSV":
+            save_csv_trace(self.filepath)
+        else:
+            save_chrome_trace(self.filepath)
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class SvTraceReset(bpy.types.Operator):
+    """Reset per-node trace"""
+    bl_idname = "node.sverchok_trace_reset"
+    bl_label = "Reset per-node trace"
+    bl_options = {'INTERNAL'}
+
+    def execute(self, context):
+        reset_trace()
+        info("Trace data cleared.")
+        return {'FINISHED'}
+
+classes = [SvProfilingToggle, SvProfileDump, SvProfileSave, SvProfileReset, SvTraceSave, SvTraceReset]
 
 def register():
     for class_name in classes:
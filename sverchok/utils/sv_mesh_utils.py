@@ -16,6 +16,8 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+import numpy as np
+
 def mesh_join(vertices_s, edges_s, faces_s):
     '''Given list of meshes represented by lists of vertices, edges and faces,
     produce one joined mesh.'''
@@ -24,13 +26,20 @@ def mesh_join(vertices_s, edges_s, faces_s):
     result_vertices = []
     result_edges = []
     result_faces = []
+    # numpy arrays of vertices are joined into one array
+    use_numpy = len(vertices_s) > 0 and all(isinstance(v, np.ndarray) for v in vertices_s)
     if len(edges_s) == 0:
         edges_s = [[]] * len(faces_s)
     for vertices, edges, faces in zip(vertices_s, edges_s, faces_s):
-        result_vertices.extend(vertices)
+        if use_numpy:
+            result_vertices.append(vertices)
+        else:
+            result_vertices.extend(vertices)
         new_edges = [tuple(i + offset for i in edge) for edge in edges]
         new_faces = [[i + offset for i in face] for face in faces]
         result_edges.extend(new_edges)
         result_faces.extend(new_faces)
         offset += len(vertices)
+    if use_numpy:
+        result_vertices = np.concatenate(result_vertices) if result_vertices else np.empty((0, 3))
     return result_vertices, result_edges, result_faces
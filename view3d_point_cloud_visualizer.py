@@ -30,10 +30,8 @@ bl_info = {"name": "Point Cloud Visualizer",
 
 import os
 import math
-import struct
 import uuid
 import numpy
-import random
 
 import bpy
 import bgl
@@ -96,6 +94,63 @@ def clamp(f, t, l):
     return f, t
 
 
+def _part1by2(a):
+    # spread the lower 21 bits of each value so that there are two zero bits between them
+    a = a & 0x1fffff
+    a = (a | a << 32) & 0x1f00000000ffff
+    a = (a | a << 16) & 0x1f0000ff0000ff
+    a = (a | a << 8) & 0x100f00f00f00f00f
+    a = (a | a << 4) & 0x10c30c30c30c30c3
+    a = (a | a << 2) & 0x1249249249249249
+    return a
+
+
+def octree_lod_order(vertices, seed=0, ):
+    """Order points so that any prefix of the result is spread evenly in space.
+    
+    Points are sorted into an octree deep enough to have about one point per leaf. Level 0 takes one point
+    from the root, level 1 one point from each occupied child node, and so on, each level taking one point
+    from every node that still has points left. Points that are left after the deepest level form the last
+    level. Points within a level are shuffled, so a prefix that ends in the middle of a level is uniform too.
+    
+    Returns (order, levels), order is an index array into vertices, levels are the number of points in each level.
+    """
+    n = len(vertices)
+    if(n == 0):
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+    
+    rnd = numpy.random.RandomState(seed)
+    depth = min(max(int(math.ceil(math.log(n, 8))), 1), 21)
+    cells = 2 ** depth
+    lo = vertices.min(axis=0)
+    size = float((vertices.max(axis=0) - lo).max())
+    if(size <= 0.0):
+        size = 1.0
+    c = ((vertices - lo) * (cells / size)).astype(numpy.int64)
+    numpy.clip(c, 0, cells - 1, out=c)
+    c = c.astype(numpy.uint64)
+    key = _part1by2(c[:, 0]) | (_part1by2(c[:, 1]) << numpy.uint64(1)) | (_part1by2(c[:, 2]) << numpy.uint64(2))
+    del c
+    
+    # random order of points inside of each node decides which one represents it
+    s = numpy.lexsort((rnd.permutation(n), key, ))
+    key = key[s]
+    level = numpy.full(n, depth + 1, dtype=numpy.int8)
+    remaining = numpy.arange(n)
+    for l in range(depth + 1):
+        node = key[remaining] >> numpy.uint64(3 * (depth - l))
+        first = numpy.ones(len(remaining), dtype=bool)
+        first[1:] = node[1:] != node[:-1]
+        level[remaining[first]] = l
+        remaining = remaining[~first]
+        if(len(remaining) == 0):
+            break
+    
+    order = s[numpy.lexsort((rnd.permutation(n), level, ))]
+    levels = numpy.bincount(level, minlength=depth + 2)
+    return order, levels[levels > 0]
+
+
 class BinPlyPointCloudReader():
     def __init__(self, path, ):
         log("{}:".format(self.__class__.__name__), 0)
@@ -107,23 +162,28 @@ class BinPlyPointCloudReader():
         
         log("reading header..", 1)
         self._header()
-        log("reading data:", 1)
-        self._data()
         
         self._stream.close()
         
-        props = ['x', 'y', 'z', 'red', 'green', 'blue', ]
-        es = self._elements
-        for e in es:
-            if(e['name'] == 'vertex'):
-                ps = e['properties']
-        q = []
-        for i, n in enumerate(props):
-            for j, p in enumerate(ps):
-                if(n == p[0]):
-                    q.append(j)
+        log("reading data:", 1)
+        self._data()
+        
         vd = self.data['vertex']
-        self.points = [(i[q[0]], i[q[1]], i[q[2]], i[q[3]], i[q[4]], i[q[5]], ) for i in vd]
+        props = vd.dtype.names
+        for n in ('x', 'y', 'z', 'red', 'green', 'blue', ):
+            if(n not in props):
+                raise ValueError("vertex property '{}' is missing".format(n))
+        
+        self.vertices = numpy.empty((len(vd), 3), dtype=numpy.float32)
+        self.colors = numpy.empty((len(vd), 3), dtype=numpy.float32)
+        for i, n in enumerate(('x', 'y', 'z', )):
+            self.vertices[:, i] = vd[n]
+        for i, n in enumerate(('red', 'green', 'blue', )):
+            self.colors[:, i] = vd[n]
+        self.colors /= 255
+        
+        log("ordering by octree levels..", 1)
+        self.order, self.levels = self._lod()
         
         log("done.", 1)
     
@@ -197,25 +257,69 @@ class BinPlyPointCloudReader():
         self._endianness = _endianness
         self._elements = _elements
     
+    def _dtype(self, element):
+        _types = {'c': 'i1',
+                  'B': 'u1',
+                  'h': 'i2',
+                  'H': 'u2',
+                  'i': 'i4',
+                  'I': 'u4',
+                  'f': 'f4',
+                  'd': 'f8', }
+        f = []
+        for p in element['properties']:
+            if(len(p) != 2):
+                return None
+            f.append((p[0], self._endianness + _types[p[1]]))
+        return numpy.dtype(f)
+    
     def _data(self):
+        # map vertex element directly from file, elements before it must have fixed size to know where it starts
         self.data = {}
+        offset = self._header_length
         for i, d in enumerate(self._elements):
             nm = d['name']
+            dt = self._dtype(d)
             if(nm != 'vertex'):
                 # read only vertices
+                if(dt is None):
+                    raise ValueError("element '{}' with list properties before vertices is not supported".format(nm))
+                offset += dt.itemsize * d['count']
                 continue
-            a = []
-            f = self._endianness
-            f += ''.join([i[1] for i in d['properties']])
+            if(dt is None):
+                raise ValueError("vertex element with list properties is not supported")
             c = d['count']
-            sz = struct.calcsize(f)
-            log("reading {} {} elements..".format(c, nm), 2)
-            self._stream.seek(self._header_length)
-            for i in range(c):
-                r = self._stream.read(sz)
-                v = struct.unpack(f, r)
-                a.append(v)
-            self.data[nm] = a
+            log("mapping {} {} elements..".format(c, nm), 2)
+            if(c == 0):
+                self.data[nm] = numpy.zeros(0, dtype=dt)
+            else:
+                self.data[nm] = numpy.memmap(self.path, dtype=dt, mode='r', offset=offset, shape=(c, ), )
+            return
+        raise ValueError("no vertex element in file")
+    
+    def _lod(self):
+        # octree order is cached next to ply file and used while ply file is not changed
+        cache = "{}.lod.npz".format(self.path)
+        st = os.stat(self.path)
+        stamp = numpy.array([len(self.vertices), st.st_size, st.st_mtime_ns, ], dtype=numpy.int64)
+        if(os.path.exists(cache)):
+            try:
+                with numpy.load(cache) as f:
+                    if(numpy.array_equal(f['stamp'], stamp)):
+                        log("using cached levels from '{}'".format(cache), 2)
+                        return f['order'], f['levels']
+            except Exception as e:
+                log("invalid cache: {}".format(e), 2)
+        
+        order, levels = octree_lod_order(self.vertices)
+        if(len(self.vertices) < 2 ** 32):
+            order = order.astype(numpy.uint32)
+        try:
+            with open(cache, 'wb') as f:
+                numpy.savez(f, order=order, levels=levels, stamp=stamp, )
+        except OSError as e:
+            log("unable to write cache: {}".format(e), 2)
+        return order, levels
 
 
 class PCVCache():
@@ -362,22 +466,15 @@ class PCVLoader(Operator):
             self.report({'WARNING'}, "File does not exist")
             return {'CANCELLED'}
         
-        points = BinPlyPointCloudReader(p).points
-        
-        rnd = random.Random()
-        random.shuffle(points, rnd.random)
+        r = BinPlyPointCloudReader(p)
         
-        # process points
-        vertices = []
-        colors = []
-        for i, p in enumerate(points):
-            v = Vector(p[:3])
-            vertices.extend(v.to_tuple())
-            c = [v / 255 for v in p[3:]]
-            colors.extend(c)
+        # points ordered by octree levels, any number of points from start are evenly distributed
+        vertices = numpy.ascontiguousarray(r.vertices[r.order], dtype=numpy.float32).ravel()
+        colors = numpy.ascontiguousarray(r.colors[r.order], dtype=numpy.float32).ravel()
         
         # make buffers
-        length = len(points)
+        length = len(r.order)
+        # contiguous float32 arrays are copied into buffers at once, without a list of python floats
         vertex_buffer = bgl.Buffer(bgl.GL_FLOAT, len(vertices), vertices)
         color_buffer = bgl.Buffer(bgl.GL_FLOAT, len(colors), colors)
         